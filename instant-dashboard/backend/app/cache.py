@@ -0,0 +1,220 @@
+"""Content-addressed cache for generated dashboards"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app import json_backend
+from app.shared_state import connect
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(json_data: Any, user_prompt: str, model: str, temperature: float,
+                   prompt_variant: str = "full", data_format: str = "pretty") -> str:
+    """
+    Build a content hash for a generation request
+    
+    The JSON is canonicalized (sorted keys, no whitespace) so that payloads
+    differing only in formatting or key order share an entry.
+    
+    Args:
+        json_data: Parsed JSON data
+        user_prompt: User's design instructions
+        model: Model name
+        temperature: Effective temperature
+        prompt_variant: System prompt variant the result was generated with
+        data_format: DATA section encoding of the prompt ('pretty', 'minified', 'columnar')
+    
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = json_backend.dumps(json_data, sort_keys=True)
+    digest = hashlib.sha256()
+    for part in (canonical, user_prompt.strip(), model, repr(float(temperature)), prompt_variant,
+                 data_format):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of generation results
+    
+    The memory tier is an LRU bounded by entry count and total HTML size,
+    with a TTL. The optional disk tier is a SQLite file that survives
+    restarts and can be shared by several worker processes; disk hits
+    are promoted back into memory.
+    
+    The tiers have separate locks, so a memory lookup never waits behind
+    a disk read or write that is queued on another worker's SQLite lock.
+    Async callers use aget and set(..., background=True), which keep the
+    disk tier off the event loop.
+    """
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600, db_path: str = ""):
+        """
+        Args:
+            max_entries: Maximum entries kept in memory
+            max_bytes: Maximum total size of cached HTML kept in memory
+            ttl_seconds: Entry lifetime in both tiers
+            db_path: SQLite file for the disk tier ('' disables it)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+    
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a cached result
+        
+        Args:
+            key: Key from make_cache_key
+        
+        Returns:
+            Cached result dict, or None on a miss
+        """
+        value = self._memory_get(key)
+        if value is None:
+            value = self._disk_load(key)
+        return value
+    
+    async def aget(self, key: str) -> Optional[dict]:
+        """Async variant of get: the memory tier is read inline, the disk tier on a worker thread"""
+        value = self._memory_get(key)
+        if value is None:
+            # Without a disk tier _disk_load only counts the miss
+            value = await asyncio.to_thread(self._disk_load, key) if self._db is not None else self._disk_load(key)
+        return value
+    
+    def set(self, key: str, value: dict, background: bool = False) -> None:
+        """
+        Store a result in both tiers
+        
+        Args:
+            key: Key from make_cache_key
+            value: JSON-serializable result dict with an 'html' entry
+            background: Write the disk tier on a worker thread without waiting for it
+                (call from the event loop; the memory tier is updated at once either way)
+        """
+        with self._lock:
+            self._insert(key, value)
+        if self._db is None:
+            return
+        if background:
+            asyncio.get_running_loop().run_in_executor(None, self._disk_set, key, value)
+        else:
+            self._disk_set(key, value)
+    
+    def stats(self) -> dict:
+        """Return hit/miss counters and current memory usage"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_enabled': self._db is not None,
+            }
+    
+    def _memory_get(self, key: str) -> Optional[dict]:
+        """Live entry from the memory tier (counted as a hit), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+            return None
+    
+    def _disk_load(self, key: str) -> Optional[dict]:
+        """Disk-tier lookup after a memory miss: promotes a hit into memory and counts the outcome"""
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._insert(key, value)
+        return value
+    
+    def _insert(self, key: str, value: dict) -> None:
+        """Add to the memory tier and evict LRU entries over the limits (caller holds self._lock)"""
+        size = len(value.get('html', ''))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.time() + self.ttl_seconds, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        """Drop a key from the memory tier"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+    
+    def _disk_get(self, key: str) -> Optional[dict]:
+        """Read a live entry from the disk tier"""
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value FROM responses WHERE key = ? AND expires_at > ?",
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Disk cache read failed: {str(e)}")
+            return None
+        return json.loads(row[0]) if row else None
+    
+    def _disk_set(self, key: str, value: dict) -> None:
+        """Write an entry to the disk tier"""
+        data = json.dumps(value)
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, data, time.time() + self.ttl_seconds)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Disk cache write failed: {str(e)}")
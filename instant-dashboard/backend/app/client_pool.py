@@ -0,0 +1,77 @@
+"""Bounded pool of ready-to-use LangChain chains keyed by (model, temperature)"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+
+
+class ChainPool:
+    """
+    LRU pool of chains, so temperature overrides don't rebuild a client per request
+    
+    The factory builds a chain for a (model, temperature) key. Building a
+    ChatGroq client validates settings and creates Groq SDK clients, so
+    reusing one saves that setup on every request. A max_size of 0
+    disables pooling: every get() builds a fresh chain.
+    """
+    
+    def __init__(self, factory: Callable[[str, float], Any], max_size: int = 8):
+        """
+        Args:
+            factory: Callable (model, temperature) -> chain
+            max_size: Maximum number of chains kept
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self._chains: "OrderedDict[Tuple[str, float], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, model: str, temperature: float) -> Tuple[Any, bool]:
+        """
+        Return a chain for the key, building (and caching) it on a miss
+        
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+        
+        Returns:
+            (chain, reused) - reused is True when the chain came from the pool
+        """
+        key = (model, float(temperature))
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                self._chains.move_to_end(key)
+                self.hits += 1
+                return chain, True
+            self.misses += 1
+        
+        chain = self.factory(model, temperature)
+        
+        if self.max_size > 0:
+            with self._lock:
+                self._chains[key] = chain
+                self._chains.move_to_end(key)
+                while len(self._chains) > self.max_size:
+                    self._chains.popitem(last=False)
+                    self.evictions += 1
+        return chain, False
+    
+    def contains(self, model: str, temperature: float) -> bool:
+        """True if a chain for the key is pooled, so get() would not build one"""
+        with self._lock:
+            return (model, float(temperature)) in self._chains
+    
+    def stats(self) -> dict:
+        """Return pool size and hit/miss counters"""
+        with self._lock:
+            return {
+                'size': len(self._chains),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
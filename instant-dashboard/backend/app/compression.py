@@ -0,0 +1,153 @@
+"""
+Response compression: brotli (when the `brotli` package is installed) or gzip
+
+Dashboards are tens of KB of HTML with inline CSS and compress several
+times over. The middleware picks the best encoding the client accepts,
+compresses whole bodies in one go and streamed bodies chunk by chunk
+(flushing each chunk, so streaming still delivers bytes as they come).
+"""
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Encodings offered, most preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Media types never compressed: event streams are read message by message, and
+# per-message flushes would cost more than they save
+SKIP_MEDIA_TYPES = ("text/event-stream",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the response encoding from an Accept-Encoding header
+    
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+    
+    Returns:
+        The first of ENCODINGS the client accepts (q > 0), or None for identity
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    """Incremental compressor for one response body"""
+    
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk; flushed so the client can decode it now, or finished if final"""
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies of at least minimum_size bytes
+    
+    Responses that already have a Content-Encoding, event streams and bodies
+    below minimum_size are passed through. A streamed body is compressed
+    whatever its size, since its size is not known up front.
+    """
+    
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        """
+        Args:
+            app: ASGI app to wrap
+            minimum_size: Smallest whole body worth compressing, in bytes
+            gzip_level: zlib level 1-9
+            brotli_quality: brotli quality 0-11
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start_message = None
+        compressor = None  # set once the body is being compressed
+        
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if start_message is not None:
+                # First body message: decide whether to compress
+                start, start_message = start_message, None
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                headers = [(name, value) for name, value in start["headers"]]
+                content_type = next((value for name, value in headers if name == b"content-type"), b"")
+                if (any(name == b"content-encoding" for name, _ in headers)
+                        or content_type.decode("latin-1").startswith(SKIP_MEDIA_TYPES)
+                        or (not more_body and len(body) < self.minimum_size)):
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                body = compressor.compress(body, final=not more_body)
+                # Same content, different bytes: a strong ETag becomes weak (as nginx does)
+                headers = [(name, b"W/" + value if name == b"etag" and not value.startswith(b"W/") else value)
+                           for name, value in headers if name != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    headers.append((b"content-length", str(len(body)).encode()))
+                vary = [index for index, (name, _) in enumerate(headers) if name == b"vary"]
+                if vary:
+                    name, value = headers[vary[0]]
+                    if b"accept-encoding" not in value.lower():
+                        headers[vary[0]] = (name, value + b", Accept-Encoding")
+                else:
+                    headers.append((b"vary", b"Accept-Encoding"))
+                await send({**start, "headers": headers})
+                await send({**message, "body": body})
+                return
+            if compressor is None:
+                await send(message)
+                return
+            more_body = message.get("more_body", False)
+            await send({**message, "body": compressor.compress(message.get("body", b""), final=not more_body)})
+        
+        await self.app(scope, receive, send_compressed)
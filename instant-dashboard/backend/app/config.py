@@ -10,18 +10,131 @@ class Settings:
     # Groq API Configuration
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+    # Override the Groq API endpoint (e.g. a local stub server); empty = Groq cloud
+    GROQ_API_BASE: str = os.getenv("GROQ_API_BASE", "")
+    
+    # LLM Backend Configuration
+    # groq: Groq cloud (or GROQ_API_BASE); fake: local canned-HTML model, no key or network needed
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "groq")
+    # Fake backend pacing: seconds before the first token, then output tokens per second (0 = instant)
+    FAKE_LLM_LATENCY: float = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+    FAKE_LLM_TOKENS_PER_SECOND: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0"))
+    # Import LangChain and build the chat model on a background thread at startup;
+    # false = build it on the first request that needs the LLM
+    LLM_WARMUP: bool = os.getenv("LLM_WARMUP", "true").lower() == "true"
     
     # Server Configuration
     BACKEND_PORT: int = int(os.getenv("BACKEND_PORT", "8000"))
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
+    # Worker processes started by `python -m app.main`; 1 = development server with
+    # auto-reload, more = production mode sharing one SQLite file, 0 = one per CPU core
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    # SQLite file holding the Groq back-off deadline and RPM/TPM budget shared by all workers; empty = per process
+    RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "")
     
     # API Configuration
-    MAX_TOKENS: int = 4096
+    # Output tokens per LLM call
+    MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "4096"))
     TEMPERATURE: float = 0.3
+    # Output tokens per generation across the first call and its continuations;
+    # output cut off at MAX_TOKENS is resumed while budget is left (<= MAX_TOKENS disables)
+    OUTPUT_TOKEN_BUDGET: int = int(os.getenv("OUTPUT_TOKEN_BUDGET", "8192"))
+    
+    # Prompt Budget Configuration
+    # Max tokens for the DATA section; larger payloads get their big arrays profiled
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+    PROFILE_ARRAY_THRESHOLD: int = int(os.getenv("PROFILE_ARRAY_THRESHOLD", "50"))
+    PROFILE_SAMPLE_ROWS: int = int(os.getenv("PROFILE_SAMPLE_ROWS", "5"))
+    PROFILE_TOP_K: int = int(os.getenv("PROFILE_TOP_K", "5"))
+    # Encoding of the DATA section: pretty (indent=2), minified or columnar
+    PROMPT_DATA_FORMAT: str = os.getenv("PROMPT_DATA_FORMAT", "pretty")
+    # System prompt: full (detailed rules and design guide) or lean (about a third of the tokens)
+    PROMPT_VARIANT: str = os.getenv("PROMPT_VARIANT", "full")
+    
+    # Token Counting Configuration
+    # Context window of GROQ_MODEL; prompts that cannot fit MAX_TOKENS of output are rejected
+    MODEL_CONTEXT_WINDOW: int = int(os.getenv("MODEL_CONTEXT_WINDOW", "131072"))
+    # Optional local tokenizer.json (HuggingFace `tokenizers`) for exact counts
+    TOKENIZER_PATH: str = os.getenv("TOKENIZER_PATH", "")
+    # Optional tiktoken encoding (e.g. cl100k_base); must already be in the local tiktoken cache
+    TIKTOKEN_ENCODING: str = os.getenv("TIKTOKEN_ENCODING", "")
+    
+    # Concurrency Configuration
+    # Maximum number of LLM calls in flight per worker process
+    MAX_CONCURRENT_GENERATIONS: int = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "16"))
+    # Chains kept per (model, temperature) for temperature overrides; 0 disables pooling
+    LLM_CLIENT_POOL_SIZE: int = int(os.getenv("LLM_CLIENT_POOL_SIZE", "8"))
+    # Generations allowed to wait for a slot per worker; more are turned away with
+    # 429 and Retry-After (0 = wait without limit)
+    LLM_QUEUE_MAX: int = int(os.getenv("LLM_QUEUE_MAX", "64"))
+    
+    # Batch Configuration
+    # Maximum items accepted by /generate-dashboards/batch
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+    # Items of one batch generated at once (MAX_CONCURRENT_GENERATIONS still applies)
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+    # Retries per item after a rate-limit (429) response from Groq
+    BATCH_RATE_LIMIT_RETRIES: int = int(os.getenv("BATCH_RATE_LIMIT_RETRIES", "3"))
+    
+    # Rate Limit Configuration
+    # Groq limits of the API key, spent client-side before each call (0 = no limit);
+    # a call costs its prompt tokens plus the output tokens it may use
+    GROQ_RPM_LIMIT: int = int(os.getenv("GROQ_RPM_LIMIT", "0"))
+    GROQ_TPM_LIMIT: int = int(os.getenv("GROQ_TPM_LIMIT", "0"))
+    # Retries of an LLM call after a 429, 5xx, timeout or connection error, with
+    # jittered exponential backoff (Retry-After wins for a 429); 0 disables
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+    # Seconds before an LLM call is abandoned as timed out (and retried); 0 = no timeout
+    LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+    
+    # Rendering Configuration
+    # llm: always call the LLM; auto: known data shapes (KPIs, label/value lists, time series,
+    # tables) skip the LLM, at the cost of ignoring instructions other than a dark theme;
+    # template: templates only (other shapes are rejected)
+    RENDER_MODE: str = os.getenv("RENDER_MODE", "llm")
+    
+    # Upload Configuration
+    # Largest body accepted by /generate-dashboard/upload
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Uploads larger than this are parsed incrementally, profiling large arrays as they stream in
+    UPLOAD_STREAM_THRESHOLD: int = int(os.getenv("UPLOAD_STREAM_THRESHOLD", str(1024 * 1024)))
+    
+    # Logging Configuration
+    # verbose: step-by-step INFO lines; structured: one JSON record per request, written off-thread
+    LOG_MODE: str = os.getenv("LOG_MODE", "verbose")
+    
+    # Response Cache Configuration
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # SQLite file for the on-disk tier; leave empty to keep the cache in memory only
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "")
+    
+    # Layout Reuse Configuration
+    # Reuse LLM layouts for payloads with the same JSON schema and prompt, refilling only the values
+    LAYOUT_REUSE_ENABLED: bool = os.getenv("LAYOUT_REUSE_ENABLED", "false").lower() == "true"
+    # Layouts share CACHE_MAX_ENTRIES, CACHE_MAX_BYTES and CACHE_DB_PATH but live longer than responses
+    LAYOUT_TTL_SECONDS: int = int(os.getenv("LAYOUT_TTL_SECONDS", str(7 * 24 * 3600)))
+    
+    # Response Compression Configuration
+    # Bodies of at least this many bytes are sent brotli- (with the `brotli` package) or
+    # gzip-compressed when the client accepts it; 0 disables compression
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "5"))
+    
+    # Request Coalescing Configuration
+    # Identical generations in flight at the same time share one LLM call
+    SINGLEFLIGHT_ENABLED: bool = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
     
     def validate(self):
         """Validate that required settings are present"""
-        if not self.GROQ_API_KEY:
+        if self.LLM_BACKEND not in ("groq", "fake"):
+            raise ValueError(f"LLM_BACKEND must be groq or fake, got: {self.LLM_BACKEND}")
+        if self.LLM_BACKEND == "groq" and not self.GROQ_API_KEY:
             raise ValueError(
                 "GROQ_API_KEY is required. Please set it in your .env file.\n"
                 "Get your API key from: https://console.groq.com/keys"
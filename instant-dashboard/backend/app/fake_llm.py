@@ -0,0 +1,100 @@
+"""Fake chat model for running the app offline (LLM_BACKEND=fake)"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Characters per output token assumed by the fake backend (BPE on HTML averages about 4)
+FAKE_CHARS_PER_TOKEN = 4
+
+FAKE_HTML = """```html
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Offline Dashboard</title>
+<style>
+body { font-family: system-ui, sans-serif; margin: 0; background: #f8fafc; color: #0f172a; }
+header { padding: 2rem; background: linear-gradient(135deg, #6366f1, #8b5cf6); color: #fff; }
+main { display: grid; grid-template-columns: repeat(auto-fit, minmax(220px, 1fr)); gap: 1.5rem; padding: 2rem; }
+.card { background: #fff; border-radius: 12px; padding: 1.5rem; box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1); }
+</style>
+</head>
+<body>
+<header><h1>Offline Dashboard</h1><p>Generated by the fake LLM backend.</p></header>
+<main>
+<div class="card"><h2>Backend</h2><p>LLM_BACKEND=fake</p></div>
+<div class="card"><h2>Network</h2><p>No calls leave this machine.</p></div>
+</main>
+</body>
+</html>
+```"""
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers every prompt with canned HTML, paced like an LLM
+    
+    Waits `latency` seconds before the first token, then produces output at
+    `tokens_per_second` (0 = all at once). The async methods use
+    asyncio.sleep, so concurrent calls overlap the way network-bound calls
+    to a real provider do; the sync methods block.
+    """
+    
+    response: str = FAKE_HTML
+    latency: float = 0.5
+    tokens_per_second: float = 0.0
+    # Tokens per streamed chunk
+    chunk_tokens: int = 8
+    calls: int = 0
+    
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency + self._generation_seconds(self.response))
+        return self._result()
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency + self._generation_seconds(self.response))
+        return self._result()
+    
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        time.sleep(self.latency)
+        for chunk in self._chunks():
+            time.sleep(self._generation_seconds(chunk))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+    
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks():
+            await asyncio.sleep(self._generation_seconds(chunk))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+    
+    def _result(self) -> ChatResult:
+        """The canned response as a chat result"""
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+    
+    def _generation_seconds(self, text: str) -> float:
+        """Time to produce text at tokens_per_second"""
+        if not self.tokens_per_second:
+            return 0.0
+        return len(text) / FAKE_CHARS_PER_TOKEN / self.tokens_per_second
+    
+    def _chunks(self) -> List[str]:
+        """Split the canned response into stream chunks"""
+        size = self.chunk_tokens * FAKE_CHARS_PER_TOKEN
+        return [self.response[i:i + size] for i in range(0, len(self.response), size)] or [""]
@@ -0,0 +1,303 @@
+"""HTML extraction helpers for LLM output"""
+from typing import Optional, Tuple
+
+FENCE = "```"
+DOCTYPE = "<!DOCTYPE html>\n"
+
+# Number of leading characters inspected when deciding whether a DOCTYPE is needed
+DOCTYPE_WINDOW = 100
+# Number of trailing characters searched for the closing </html> tag
+END_WINDOW = 256
+# Longest repeat of the previous output looked for at the start of a continuation
+CONTINUATION_OVERLAP = 400
+# Shorter matches are treated as coincidence rather than repetition
+MIN_OVERLAP = 16
+# finish_reason values meaning the output limit cut the answer off (Groq/OpenAI say "length")
+LIMIT_FINISH_REASONS = frozenset({"length", "max_tokens"})
+
+
+class LLMText(str):
+    """
+    Text of one LLM call, plus what the API reported about it
+    
+    finish_reason is None if the API reported none; usage is the message's
+    usage_metadata ({'input_tokens': ..., 'output_tokens': ...}) or None.
+    """
+    
+    def __new__(cls, text: str, finish_reason: Optional[str] = None, usage: Optional[dict] = None):
+        self = super().__new__(cls, text)
+        self.finish_reason = finish_reason
+        self.usage = usage
+        return self
+
+
+def cut_off(finish_reason: Optional[str], complete: bool) -> bool:
+    """
+    Whether an LLM answer was cut off by the output limit
+    
+    The API's finish_reason decides when there is one: a model that
+    stopped on its own is done even if it left out </html> (e.g. it wrote a
+    fragment). Only for backends that report no finish_reason is a missing
+    closing fence or </html> taken as the sign.
+    
+    Args:
+        finish_reason: finish_reason of the last call, or None
+        complete: Second value returned by extract_html (or HtmlStreamExtractor.complete)
+    
+    Returns:
+        bool: True if the answer hit the output limit
+    """
+    if finish_reason:
+        return finish_reason.lower() in LIMIT_FINISH_REASONS
+    return not complete
+
+
+def needs_doctype(head: str) -> bool:
+    """
+    Check whether HTML starting with `head` needs a DOCTYPE prepended
+    
+    Only the first DOCTYPE_WINDOW characters are inspected, matching the
+    validation step in LLMService.
+    
+    Args:
+        head: Leading part of the (already stripped) HTML document
+    
+    Returns:
+        bool: True if no DOCTYPE / <html> tag is present near the start
+    """
+    head_lower = head[:DOCTYPE_WINDOW].lower()
+    return not (head_lower.startswith('<!doctype') or '<html' in head_lower)
+
+
+def has_closing_tag(tail: str) -> bool:
+    """
+    Check whether a document ending with `tail` has its closing </html> tag
+    
+    Only the last END_WINDOW characters are inspected, so a comment or a
+    stray newline after the tag still counts as a finished document.
+    
+    Args:
+        tail: Trailing part of the (already stripped) HTML document
+    
+    Returns:
+        bool: True if </html> appears near the end
+    """
+    return '</html' in tail[-END_WINDOW:].lower()
+
+
+def extract_html(content: str) -> Tuple[str, bool]:
+    """
+    Extract the HTML document from a complete LLM response in one pass
+    
+    Handles fenced output (```html ... ```, with or without chatter around
+    the fence and with any language tag), unfenced output, and output cut
+    off before the closing fence. Only str.find calls and two slices of
+    the body are involved, so the cost is linear in the response size.
+    
+    A document counts as complete when its fence was closed or it ends
+    with </html>. Whether an incomplete one was cut off by MAX_TOKENS is
+    up to the call's finish_reason, when the API reports one (see cut_off).
+    
+    Args:
+        content: Raw content from LLM
+        
+    Returns:
+        (HTML stripped of the fence and surrounding whitespace, complete)
+    """
+    fence_at = content.find(FENCE)
+    if fence_at == -1:
+        body = content.strip()
+        return body, has_closing_tag(body)
+    
+    # Skip the language tag after the opening fence, unless the document
+    # starts on the fence line itself ("```<!DOCTYPE html>")
+    body_start = fence_at + len(FENCE)
+    newline_at = content.find("\n", body_start)
+    line_end = newline_at if newline_at != -1 else len(content)
+    tag_at = content.find("<", body_start, line_end)
+    if tag_at != -1:
+        body_start = tag_at
+    else:
+        body_start = line_end
+    
+    close_at = content.find(FENCE, body_start)
+    if close_at != -1:
+        return content[body_start:close_at].strip(), True
+    body = content[body_start:].strip()
+    return body, has_closing_tag(body)
+
+
+def stitch_continuation(previous: str, continuation: str) -> Optional[str]:
+    """
+    Clean up a continuation of a truncated output so it can be appended
+    
+    Models asked to resume sometimes open a new code fence or repeat the
+    last few lines before going on; both are dropped. A continuation that
+    starts the document over cannot be stitched.
+    
+    Args:
+        previous: Raw output so far (ends where the output limit cut it off)
+        continuation: Raw output of the continuation call, or its first
+            CONTINUATION_OVERLAP characters when streaming
+    
+    Returns:
+        Text to append to previous, or None if the model restarted the document
+    """
+    stripped = continuation.lstrip()
+    if stripped.startswith(FENCE):
+        newline_at = stripped.find("\n")
+        continuation = stripped[newline_at + 1:] if newline_at != -1 else ""
+        stripped = continuation.lstrip()
+    head_lower = stripped[:DOCTYPE_WINDOW].lower()
+    if head_lower.startswith('<!doctype') or head_lower.startswith('<html'):
+        return None
+    
+    for size in range(min(len(previous), len(continuation), CONTINUATION_OVERLAP), MIN_OVERLAP - 1, -1):
+        if previous.endswith(continuation[:size]):
+            return continuation[size:]
+    return continuation
+
+
+class HtmlStreamExtractor:
+    """
+    Incremental counterpart of extract_html for streamed output
+    
+    Feed raw LLM chunks in order and forward whatever feed() returns. The
+    markdown fence (```html ... ```) and any chatter before it are stripped
+    as they arrive, surrounding whitespace is trimmed, and a DOCTYPE is
+    prepended when the document does not start with one.
+    
+    Only three small buffers are kept: text before the document starts,
+    the first DOCTYPE_WINDOW characters of the document, and trailing
+    whitespace/backticks that might turn out to be the closing fence.
+    """
+    
+    def __init__(self):
+        self._preamble = ""      # raw text seen before the document body starts
+        self._head = ""          # first characters of the body, held for the DOCTYPE check
+        self._tail = ""          # held-back whitespace/backticks at the end of the body
+        self._started = False    # body start located
+        self._head_flushed = False
+        self._end = ""           # last END_WINDOW characters emitted, for the </html> check
+        self._done = False       # closing fence seen; ignore the rest
+        self.fenced = False
+        self.complete = False    # set by finish(): closing fence or </html> seen
+        self.emitted_chars = 0
+    
+    def feed(self, chunk: str) -> str:
+        """
+        Consume a raw chunk from the LLM
+        
+        Args:
+            chunk: Next piece of raw LLM output
+        
+        Returns:
+            HTML text that is safe to send to the client now (may be empty)
+        """
+        if self._done or not chunk:
+            return ""
+        
+        if not self._started:
+            self._preamble += chunk
+            chunk = self._locate_body()
+            if not self._started:
+                return ""
+        
+        return self._emit_body(chunk)
+    
+    def finish(self) -> str:
+        """
+        Flush held-back text once the LLM stream has ended
+        
+        Returns:
+            Remaining HTML text to send
+        
+        Raises:
+            ValueError: If the stream contained no HTML at all
+        """
+        out = ""
+        if not self._started:
+            # Never saw a fence or a tag; treat everything as the body
+            body = self._preamble.strip()
+            self._preamble = ""
+            self._started = True
+            out = self._emit_body(body)
+        
+        if not self._head_flushed:
+            out += self._flush_head()
+        
+        # Trailing whitespace and a dangling partial fence are dropped
+        self._tail = ""
+        self.complete = self._done or has_closing_tag(self._end)
+        self._done = True
+        return out
+    
+    def _locate_body(self) -> str:
+        """Find where the document starts in the preamble; return body text so far"""
+        text = self._preamble
+        fence_at = text.find(FENCE)
+        tag_at = text.find("<")
+        
+        if fence_at != -1 and (tag_at == -1 or fence_at < tag_at):
+            # Fenced output: drop everything up to the end of the opening fence line
+            after = text[fence_at + len(FENCE):]
+            newline_at = after.find("\n")
+            if newline_at == -1:
+                # Language tag may still be arriving ("```ht")
+                stripped = after.lstrip()
+                if stripped.startswith("<"):
+                    body = stripped
+                else:
+                    return ""
+            else:
+                body = after[newline_at + 1:]
+            self.fenced = True
+        elif tag_at != -1:
+            body = text[tag_at:]
+        else:
+            return ""
+        
+        self._started = True
+        self._preamble = ""
+        return body.lstrip()
+    
+    def _emit_body(self, chunk: str) -> str:
+        """Append body text, holding back the head window and a possible closing fence"""
+        text = self._tail + chunk
+        self._tail = ""
+        
+        fence_at = text.find(FENCE)
+        if fence_at != -1:
+            text = text[:fence_at].rstrip()
+            self._done = True
+        else:
+            # Hold back trailing whitespace and backticks: they are either
+            # stripped at the end or belong to the closing fence
+            keep = len(text.rstrip(" \t\r\n`"))
+            text, self._tail = text[:keep], text[keep:]
+        
+        if not self._head_flushed:
+            self._head += text
+            # Wait for the full window only while the DOCTYPE decision is open
+            if len(self._head) < DOCTYPE_WINDOW and not self._done and needs_doctype(self._head):
+                return ""
+            return self._flush_head()
+        
+        self.emitted_chars += len(text)
+        self._end = (self._end + text)[-END_WINDOW:]
+        return text
+    
+    def _flush_head(self) -> str:
+        """Release the head buffer, prepending a DOCTYPE if it is missing"""
+        head = self._head
+        self._head = ""
+        self._head_flushed = True
+        
+        if needs_doctype(head):
+            if not ("<" in head and ">" in head):
+                raise ValueError("Generated content is not valid HTML")
+            head = DOCTYPE + head
+        
+        self.emitted_chars += len(head)
+        self._end = head[-END_WINDOW:]
+        return head
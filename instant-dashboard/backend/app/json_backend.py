@@ -0,0 +1,68 @@
+"""JSON encode/decode with an optional fast backend (orjson)"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Name of the backend in use, reported in logs and benchmarks
+BACKEND = "orjson" if orjson is not None else "json"
+
+# orjson.JSONDecodeError subclasses this, so callers only need one except clause
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document
+    
+    orjson is used when installed. It rejects a few inputs the stdlib
+    accepts (NaN/Infinity literals, integers wider than 64 bits); those
+    fall back to json.loads so behaviour and error messages stay the same.
+    
+    Args:
+        data: JSON text as str or UTF-8 bytes
+    
+    Returns:
+        Parsed Python object
+    
+    Raises:
+        JSONDecodeError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: int = None, sort_keys: bool = False) -> str:
+    """
+    Serialize to JSON text (non-ASCII characters are kept as-is)
+    
+    Args:
+        obj: Object to serialize
+        indent: None for compact output, or 2 for pretty-printed output
+        sort_keys: Sort object keys
+    
+    Returns:
+        JSON string
+    """
+    if orjson is not None and indent in (None, 2):
+        option = 0
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, option=option).decode('utf-8')
+        except TypeError:
+            # Big ints, non-str keys, etc. - let the stdlib handle them
+            pass
+    
+    separators = (',', ':') if indent is None else None
+    return json.dumps(obj, indent=indent, sort_keys=sort_keys,
+                      separators=separators, ensure_ascii=False)
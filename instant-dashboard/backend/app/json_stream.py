@@ -0,0 +1,374 @@
+"""Incremental JSON parsing with bounded memory for very large uploads"""
+import asyncio
+import codecs
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from app import json_backend
+from app.profiling import ArrayProfiler, count_profiles, summarize_data
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters that can follow a complete number
+_TERMINATORS = frozenset(",:]} \t\n\r")
+
+# Largest single value (row, string, number) kept in the buffer while waiting
+# for it to complete; objects larger than this are walked key by key instead
+ELEMENT_LIMIT = 1024 * 1024
+
+# A value that is not complete yet is decoded again from its start only once
+# the buffer past it has doubled, or grown by this much: without the gate a
+# value arriving in small chunks costs time quadratic in its size
+DECODE_RETRY_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload is over the configured size limit"""
+
+
+class _ListFrame:
+    """An open array: its items, until it grows past the threshold and is profiled"""
+    
+    def __init__(self):
+        self.items = []
+        self.profiler = None
+        self.expect = "first"  # first | value | separator
+
+
+class _DictFrame:
+    """An open object being filled key by key"""
+    
+    def __init__(self):
+        self.obj = {}
+        self.key = None
+        self.expect = "first"  # first | key | colon | value | separator
+
+
+class IncrementalJSONParser:
+    """
+    Parse a JSON document from chunks, profiling large arrays on the fly
+    
+    Arrays are walked element by element. Each element is decoded with the
+    C-accelerated json decoder as soon as it is complete, and once an array
+    has more than array_threshold items it is fed to an ArrayProfiler and
+    its items are dropped. Memory is therefore bounded by the non-array
+    parts of the document, array_threshold items per open array and one
+    element in flight, not by the size of the upload.
+    
+    close() returns what summarize_data would produce from the fully parsed
+    document, except where long arrays nest: arrays are profiled bottom-up
+    as they close, while summarize_data works top-down. An array inside a
+    profiled array therefore reaches the outer profile as its own profile
+    (when long) instead of a list, and the sample rows of profiles made
+    while streaming are summarized too. Values decoded in one piece (objects
+    up to ELEMENT_LIMIT) are summarized top-down like summarize_data.
+    benchmarks/bench_json_stream.py checks both against json.loads.
+    
+    Usage:
+        parser = IncrementalJSONParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        data = parser.close()
+    """
+    
+    def __init__(self, array_threshold: int = 50, sample_rows: int = 5, top_k: int = 5):
+        self.array_threshold = array_threshold
+        self.sample_rows = sample_rows
+        self.top_k = top_k
+        
+        self.bytes_read = 0
+        self.profiled_arrays = 0  # set by close()
+        
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._result = None
+        self._done = False
+        self._eof = False
+        self._retry_at = 0  # characters needed past the cursor before decoding again
+    
+    def feed(self, chunk: bytes) -> None:
+        """
+        Consume the next chunk of the document
+        
+        Args:
+            chunk: Raw bytes (UTF-8)
+        
+        Raises:
+            ValueError: If the data is not valid JSON
+        """
+        self.bytes_read += len(chunk)
+        try:
+            text = self._decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Invalid JSON: body is not UTF-8 ({str(e)})")
+        if text:
+            self._buffer = self._buffer[self._pos:] + text
+            self._pos = 0
+            if len(self._buffer) < self._retry_at:
+                return
+            self._retry_at = 0
+            self._parse()
+    
+    def close(self) -> Any:
+        """
+        Finish parsing and return the (summarized) document
+        
+        Raises:
+            ValueError: If the document is empty, truncated or invalid
+        """
+        try:
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Invalid JSON: body is not UTF-8 ({str(e)})")
+        self._pos = 0
+        self._eof = True
+        self._parse()
+        self._skip_whitespace()
+        if not self._done:
+            raise ValueError("Invalid JSON: unexpected end of data")
+        # Values decoded in one piece may still contain long arrays
+        summary = summarize_data(self._result, self.array_threshold, self.sample_rows, self.top_k)
+        self.profiled_arrays = count_profiles(summary)
+        return summary
+    
+    def _skip_whitespace(self) -> None:
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+    
+    def _error(self, message: str, pos: int = None) -> ValueError:
+        pos = self._pos if pos is None else pos
+        return ValueError(f"Invalid JSON: {message} at offset {self.bytes_read - len(self._buffer) + pos}")
+    
+    def _parse(self) -> None:
+        """Advance through the buffer as far as complete values allow"""
+        while True:
+            self._skip_whitespace()
+            if self._pos >= len(self._buffer):
+                return
+            char = self._buffer[self._pos]
+            
+            if not self._stack:
+                if self._done:
+                    raise self._error("extra data after the document")
+                if not self._parse_value():
+                    return
+                continue
+            
+            frame = self._stack[-1]
+            if frame.expect == "separator":
+                closer = "]" if isinstance(frame, _ListFrame) else "}"
+                if char == ",":
+                    self._pos += 1
+                    frame.expect = "value" if isinstance(frame, _ListFrame) else "key"
+                elif char == closer:
+                    self._pos += 1
+                    self._close_frame()
+                else:
+                    raise self._error(f"expected ',' or '{closer}'")
+            elif isinstance(frame, _ListFrame):
+                if frame.profiler is not None and char not in "[]":
+                    self._scan_rows(frame)
+                    if frame.expect == "separator" or self._pos >= len(self._buffer):
+                        continue
+                    # Whatever stopped the fast path is handled below
+                    char = self._buffer[self._pos]
+                if frame.expect == "first" and char == "]":
+                    self._pos += 1
+                    self._close_frame()
+                elif not self._parse_value():
+                    return
+            elif frame.expect in ("first", "key"):
+                if frame.expect == "first" and char == "}":
+                    self._pos += 1
+                    self._close_frame()
+                    continue
+                if char != '"':
+                    raise self._error("expected an object key")
+                key = self._decode()
+                if key is None:
+                    return
+                frame.key = key[0]
+                frame.expect = "colon"
+            elif frame.expect == "colon":
+                if char != ":":
+                    raise self._error("expected ':'")
+                self._pos += 1
+                frame.expect = "value"
+            elif not self._parse_value():
+                return
+    
+    def _scan_rows(self, frame: _ListFrame) -> None:
+        """
+        Fast path over the rows of a profiled array (the bulk of a large upload)
+        
+        Decodes 'row, row, ...' in a tight loop and stops at anything that
+        needs the general state machine: a nested array, the closing
+        bracket, a row that is not complete yet or invalid data.
+        """
+        buffer = self._buffer
+        length = len(buffer)
+        decode = self._json.raw_decode
+        skip = _WHITESPACE.match
+        add = frame.profiler.add
+        pos = self._pos
+        try:
+            while buffer[pos] not in "[]":
+                value, end = decode(buffer, pos)
+                if end >= length or buffer[end] not in _TERMINATORS:
+                    break
+                add(value)
+                frame.expect = "separator"
+                pos = skip(buffer, end).end()
+                if pos >= length or buffer[pos] != ",":
+                    break
+                pos = skip(buffer, pos + 1).end()
+                frame.expect = "value"
+                if pos >= length:
+                    break
+        except json.JSONDecodeError:
+            pass
+        self._pos = pos
+    
+    def _parse_value(self) -> bool:
+        """Start or decode the value at the cursor; False means more data is needed"""
+        char = self._buffer[self._pos]
+        if char == "[":
+            self._pos += 1
+            self._stack.append(_ListFrame())
+            return True
+        
+        value = self._decode()
+        if value is not None:
+            self._deliver(value[0])
+            return True
+        if char == "{" and len(self._buffer) - self._pos > ELEMENT_LIMIT:
+            # Too big to decode in one piece: walk it key by key
+            self._retry_at = 0
+            self._pos += 1
+            self._stack.append(_DictFrame())
+            return True
+        return False
+    
+    def _decode(self) -> Optional[tuple]:
+        """
+        Decode one complete value at the cursor with the C decoder
+        
+        Returns:
+            (value,) on success, None if the value is not complete yet
+        """
+        try:
+            value, end = self._json.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError as e:
+            if self._eof:
+                raise self._error(e.msg, e.pos)
+            if len(self._buffer) - self._pos > ELEMENT_LIMIT and self._buffer[self._pos] != "{":
+                raise self._error(f"invalid value or value larger than {ELEMENT_LIMIT:,} characters")
+            self._wait_for_more()
+            return None
+        # A number cut by a chunk boundary ("12|34", "1.|5", "2e|3") decodes to a
+        # prefix: only accept it once the character after it can end it
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if is_number and not self._eof and (end >= len(self._buffer) or self._buffer[end] not in _TERMINATORS):
+            if len(self._buffer) - self._pos > ELEMENT_LIMIT:
+                raise self._error(f"invalid value or value larger than {ELEMENT_LIMIT:,} characters")
+            self._wait_for_more()
+            return None
+        self._pos = end
+        return (value,)
+    
+    def _wait_for_more(self) -> None:
+        """Hold off decoding the incomplete value at the cursor until enough new data is in (see DECODE_RETRY_BYTES)"""
+        pending = len(self._buffer) - self._pos
+        self._retry_at = pending + min(pending, DECODE_RETRY_BYTES)
+    
+    def _deliver(self, value: Any) -> None:
+        """Hand a finished value to the enclosing array/object (or make it the result)"""
+        if not self._stack:
+            self._result = value
+            self._done = True
+            return
+        
+        frame = self._stack[-1]
+        if isinstance(frame, _DictFrame):
+            frame.obj[frame.key] = value
+        elif frame.profiler is not None:
+            frame.profiler.add(value)
+        else:
+            frame.items.append(value)
+            if len(frame.items) > self.array_threshold:
+                frame.profiler = ArrayProfiler(self.sample_rows, self.top_k).extend(frame.items)
+                frame.items = None
+        frame.expect = "separator"
+    
+    def _close_frame(self) -> None:
+        frame = self._stack.pop()
+        if isinstance(frame, _DictFrame):
+            self._deliver(frame.obj)
+        elif frame.profiler is not None:
+            self._deliver(frame.profiler.profile())
+        else:
+            self._deliver(frame.items)
+
+
+async def parse_upload(chunks: AsyncIterator[bytes], max_bytes: int, stream_threshold: int,
+                       array_threshold: int = 50, sample_rows: int = 5, top_k: int = 5) -> Tuple[Any, dict]:
+    """
+    Parse an uploaded JSON body, switching to incremental parsing once it is large
+    
+    Bodies up to stream_threshold bytes are buffered and parsed in one go
+    (the same as /generate-dashboard). Past that, chunks go through an
+    IncrementalJSONParser as they arrive, off the event loop, and the
+    body is never held in memory as a whole.
+    
+    Args:
+        chunks: Body as an async iterator of byte chunks
+        max_bytes: Uploads larger than this are rejected
+        stream_threshold: Bodies larger than this are parsed incrementally
+        array_threshold: Arrays with more items than this are profiled while streaming
+        sample_rows: Sample rows kept per profiled array
+        top_k: Most frequent values reported per field
+    
+    Returns:
+        (data, info) - the parsed data (large arrays profiled if streamed) and
+        a dict with bytes, ingest_ms (read + parse), streamed and profiled_arrays
+    
+    Raises:
+        UploadTooLargeError: If the body is larger than max_bytes
+        ValueError: If the body is not valid JSON
+    """
+    start = time.time()
+    size = 0
+    buffered = []
+    parser = None
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Upload is larger than the {max_bytes:,}-byte limit")
+        if parser is None:
+            buffered.append(chunk)
+            if size <= stream_threshold:
+                continue
+            parser = IncrementalJSONParser(array_threshold, sample_rows, top_k)
+            chunk = b"".join(buffered)
+            buffered = None
+        await asyncio.to_thread(parser.feed, chunk)
+    
+    if parser is None:
+        try:
+            data = json_backend.loads(b"".join(buffered))
+        except (json_backend.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid JSON: {str(e)}")
+        profiled_arrays = 0
+    else:
+        data = await asyncio.to_thread(parser.close)
+        profiled_arrays = parser.profiled_arrays
+    
+    return data, {
+        'bytes': size,
+        'ingest_ms': round((time.time() - start) * 1000, 2),
+        'streamed': parser is not None,
+        'profiled_arrays': profiled_arrays,
+    }
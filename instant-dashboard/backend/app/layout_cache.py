@@ -0,0 +1,225 @@
+"""Schema-keyed layout reuse: refill an LLM-generated dashboard with new values"""
+import bisect
+import hashlib
+import html
+import json
+import logging
+import re
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Payloads with more leaf values than this are not recorded (the prompt
+# profiles them, so most values never reach the HTML anyway)
+MAX_LAYOUT_VALUES = 2000
+
+# Values whose text is shorter than this ("1", "0", "Q1") are only refilled
+# where they make up a whole text node, and only if the page does not show
+# them more often than the data holds them: otherwise they may just as well
+# be a page number or part of a heading
+MIN_INLINE_VALUE_CHARS = 4
+
+# Regions of a document: comments and <style> never hold data; <script>
+# bodies and tag markup (attributes, inline styles) may depend on it
+_MARKUP = re.compile(r"<!--.*?-->|<(style|script)\b[^>]*>.*?</\1\s*>|<[^>]*>", re.DOTALL | re.IGNORECASE)
+_NUMBER = re.compile(r"(?<![\w.\-])-?\d+(?:[.,]\d+)*(?!\w)")
+
+
+def describe(data: Any) -> Tuple[str, list]:
+    """
+    Fingerprint the shape of parsed JSON and list its leaf values
+    
+    The fingerprint covers keys, nesting, array lengths and value types
+    (string, number, boolean, null) but not the values themselves, so two
+    refreshes of the same report share it. Keys are walked in sorted order,
+    which makes leaf positions stable across payloads with the same
+    fingerprint.
+    
+    Args:
+        data: Parsed JSON data
+    
+    Returns:
+        (hex SHA-256 fingerprint, leaf values in walk order)
+    """
+    parts = []
+    values = []
+    
+    def walk(value: Any) -> None:
+        if isinstance(value, dict):
+            parts.append("{")
+            for key in sorted(value):
+                parts.append(json.dumps(key) + ":")
+                walk(value[key])
+            parts.append("}")
+        elif isinstance(value, list):
+            parts.append("[")
+            for item in value:
+                walk(item)
+            parts.append("]")
+        else:
+            parts.append("b" if isinstance(value, bool) else "n" if isinstance(value, (int, float))
+                         else "s" if isinstance(value, str) else "z")
+            values.append(value)
+    
+    walk(data)
+    return hashlib.sha256("".join(parts).encode('utf-8')).hexdigest(), values
+
+
+def make_layout_key(fingerprint: str, user_prompt: str, model: str, temperature: float,
+                    prompt_variant: str = "full") -> str:
+    """
+    Build the layout cache key for a (schema, prompt, model, temperature, prompt variant) combination
+    
+    Args:
+        fingerprint: Fingerprint from describe
+        user_prompt: User's design instructions
+        model: Model that generated the layout
+        temperature: Effective temperature it was generated with
+        prompt_variant: System prompt variant it was generated with
+    
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in ("layout", fingerprint, user_prompt.strip(), model, repr(float(temperature)), prompt_variant):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def value_text(value: Any) -> str:
+    """A leaf value as the LLM is told to print it: verbatim, HTML-escaped"""
+    if isinstance(value, str):
+        return html.escape(value, quote=False)
+    return json.dumps(value)
+
+
+def build_layout(html_content: str, values: list, user_instructions: str = "") -> Optional[dict]:
+    """
+    Record where each leaf value appears in a generated dashboard
+    
+    Every occurrence of a value's text in a text node becomes a slot that
+    can be refilled later; short values (see MIN_INLINE_VALUE_CHARS) only
+    when each occurrence is a whole text node and there are no more of
+    them than the data has such values. Values that also appear in a <script> body or
+    inside a tag (chart data, bar widths) are pinned: the layout may only
+    be reused while they stay the same. A document with numbers in its
+    text that match no value and are not in the user's instructions most
+    likely shows derived figures (totals, averages) that a refill would
+    leave stale, so it is not recorded at all.
+    
+    Args:
+        html_content: Final HTML from the LLM
+        values: Leaf values from describe, for the data the HTML was generated from
+        user_instructions: User's design instructions (their numbers are not data)
+    
+    Returns:
+        JSON-serializable layout dict, or None if the document cannot be reused
+    """
+    if not values or len(values) > MAX_LAYOUT_VALUES:
+        return None
+    
+    texts = [value_text(value) for value in values]
+    by_text = {}
+    for index, text in enumerate(texts):
+        if text:
+            by_text.setdefault(text, []).append(index)
+    if not by_text:
+        return None
+    # Longest alternatives first, so "North America" wins over "America"
+    alternatives = "|".join(re.escape(text) for text in sorted(by_text, key=len, reverse=True))
+    pattern = re.compile(rf"(?<![\w.\-])(?:{alternatives})(?!\w|[.,]\d)")
+    allowed_numbers = set(_NUMBER.findall(user_instructions))
+    
+    found = []  # (start, end, text, whole text node) of every value text in the text nodes
+    pinned = set()
+    for start, end, kind in _regions(html_content):
+        if kind == 'ignored':
+            continue
+        if kind == 'markup':
+            for match in pattern.finditer(html_content, start, end):
+                pinned.update(by_text[match.group()])
+            continue
+        
+        first_found = len(found)
+        for match in pattern.finditer(html_content, start, end):
+            whole = not html_content[start:match.start()].strip() and not html_content[match.end():end].strip()
+            found.append((match.start(), match.end(), match.group(), whole))
+        found_starts = [entry[0] for entry in found[first_found:]]
+        for match in _NUMBER.finditer(html_content, start, end):
+            at = bisect.bisect_right(found_starts, match.start()) - 1
+            covered = at >= 0 and match.start() < found[first_found + at][1]
+            if not covered and match.group() not in allowed_numbers:
+                logger.debug("   Layout not recorded: unexplained number %r in the text", match.group())
+                return None
+    
+    # Short values left unbound count as not shown: changing one makes fill_layout give up
+    occurrences = {}
+    for _, _, text, whole in found:
+        if len(text) < MIN_INLINE_VALUE_CHARS:
+            occurrences.setdefault(text, []).append(whole)
+    unbound = {text for text, wholes in occurrences.items()
+               if not all(wholes) or len(wholes) > len(by_text[text])}
+    slots = [[start, end, by_text[text]] for start, end, text, _ in found if text not in unbound]
+    if not slots:
+        return None
+    return {'html': html_content, 'texts': texts, 'slots': slots, 'pinned': sorted(pinned)}
+
+
+def fill_layout(layout: dict, values: list) -> Optional[str]:
+    """
+    Substitute new leaf values into a recorded layout
+    
+    Validates the mapping first: every value that changed must sit in at
+    least one text slot, must not be pinned, and must not share a slot
+    with another value that now has different text. Otherwise the layout
+    cannot be trusted for this data and the caller should regenerate.
+    
+    Args:
+        layout: dict from build_layout
+        values: Leaf values from describe, for data with the layout's fingerprint
+    
+    Returns:
+        HTML with the new values, or None if the mapping is ambiguous
+    """
+    texts = [value_text(value) for value in values]
+    if len(texts) != len(layout['texts']):
+        return None
+    changed = [index for index, (old, new) in enumerate(zip(layout['texts'], texts)) if old != new]
+    if not changed:
+        return layout['html']
+    
+    pinned = set(layout['pinned'])
+    bound = {index for _, _, indices in layout['slots'] for index in indices}
+    for index in changed:
+        if index in pinned or index not in bound:
+            logger.debug("   Layout not reusable: value #%s changed but is %s", index,
+                         'pinned' if index in pinned else 'not bound to a text node')
+            return None
+    
+    source = layout['html']
+    pieces: List[str] = []
+    position = 0
+    for start, end, indices in layout['slots']:
+        replacements = {texts[index] for index in indices}
+        if len(replacements) > 1:
+            logger.debug("   Layout not reusable: values %s shared a node and now differ", indices)
+            return None
+        pieces.append(source[position:start])
+        pieces.append(replacements.pop())
+        position = end
+    pieces.append(source[position:])
+    return "".join(pieces)
+
+
+def _regions(html_content: str):
+    """Yield (start, end, kind) spans covering the document; kind is text, markup or ignored"""
+    position = 0
+    for match in _MARKUP.finditer(html_content):
+        if match.start() > position:
+            yield position, match.start(), 'text'
+        is_markup = not match.group().startswith("<!--") and (match.group(1) or "").lower() != "style"
+        yield match.start(), match.end(), 'markup' if is_markup else 'ignored'
+        position = match.end()
+    if position < len(html_content):
+        yield position, len(html_content), 'text'
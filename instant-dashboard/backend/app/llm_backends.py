@@ -0,0 +1,125 @@
+"""
+Chat model backends behind LLMService: Groq, or a local fake for offline runs
+
+Creating a backend is cheap: LangChain, langchain_groq and httpx are only
+imported when the first chat model is built, so app.main starts without them.
+"""
+import threading
+
+from app.config import settings
+
+
+class GroqBackend:
+    """
+    Groq cloud, or any Groq-compatible server at GROQ_API_BASE
+    
+    Owns the keep-alive HTTP clients shared by every ChatGroq instance, so
+    temperature overrides reuse open connections instead of new TLS sessions.
+    They are created with the first client.
+    """
+    
+    name = "groq"
+    
+    def __init__(self):
+        self.http_client = None
+        self.http_async_client = None
+        self._lock = threading.Lock()
+    
+    def configured(self) -> bool:
+        """True when an API key is set"""
+        return bool(settings.GROQ_API_KEY)
+    
+    def build(self, model: str, temperature: float):
+        """
+        Create a ChatGroq client
+        
+        Pooled clients share the backend's keep-alive HTTP clients. With
+        pooling disabled (LLM_CLIENT_POOL_SIZE=0) each client gets its own,
+        which matches the old per-request behaviour. The SDK's own retries
+        are off: LLMService retries with the shared back-off and budget.
+        
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+        
+        Returns:
+            Configured ChatGroq instance
+        """
+        from langchain_groq import ChatGroq
+        
+        shared = settings.LLM_CLIENT_POOL_SIZE > 0
+        if shared:
+            self._open_http_clients()
+        return ChatGroq(
+            api_key=settings.GROQ_API_KEY,
+            model_name=model,
+            temperature=temperature,
+            max_tokens=settings.MAX_TOKENS,
+            base_url=settings.GROQ_API_BASE or None,
+            timeout=settings.LLM_REQUEST_TIMEOUT or None,
+            max_retries=0,
+            http_client=self.http_client if shared else None,
+            http_async_client=self.http_async_client if shared else None,
+        )
+    
+    def _open_http_clients(self) -> None:
+        """Create the shared keep-alive HTTP clients on first use"""
+        with self._lock:
+            if self.http_client is not None:
+                return
+            import httpx
+            
+            limits = httpx.Limits(
+                max_connections=settings.MAX_CONCURRENT_GENERATIONS * 2,
+                max_keepalive_connections=settings.MAX_CONCURRENT_GENERATIONS,
+            )
+            self.http_client = httpx.Client(limits=limits)
+            self.http_async_client = httpx.AsyncClient(limits=limits)
+
+
+class FakeBackend:
+    """Local stand-in for Groq: no key, no network, latency and token rate from settings"""
+    
+    name = "fake"
+    
+    def configured(self) -> bool:
+        """Always ready"""
+        return True
+    
+    def build(self, model: str, temperature: float):
+        """
+        Create a FakeChatModel paced by FAKE_LLM_LATENCY and FAKE_LLM_TOKENS_PER_SECOND
+        
+        Args:
+            model: Model name (ignored)
+            temperature: Sampling temperature (ignored)
+        
+        Returns:
+            FakeChatModel instance
+        """
+        from app.fake_llm import FakeChatModel
+        
+        return FakeChatModel(latency=settings.FAKE_LLM_LATENCY,
+                             tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND)
+
+
+BACKENDS = {"groq": GroqBackend, "fake": FakeBackend}
+
+
+def create_backend(name: str = None):
+    """
+    Instantiate an LLM backend by name
+    
+    Args:
+        name: Key of BACKENDS; defaults to settings.LLM_BACKEND
+    
+    Returns:
+        Backend with `name`, configured() and build(model, temperature)
+    
+    Raises:
+        ValueError: If the name is unknown
+    """
+    name = name or settings.LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}. Expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,29 @@
+"""
+LangChain output parser that keeps the finish_reason of each LLM call
+
+Imported when the LLM stack is built, like app.fake_llm, since it needs LangChain.
+"""
+from typing import List
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.outputs import Generation
+
+from app.html_extract import LLMText
+
+
+class FinishReasonParser(StrOutputParser):
+    """
+    StrOutputParser returning LLMText: the text plus the call's finish_reason and usage
+    
+    Groq reports the finish_reason in the message's response_metadata ("stop",
+    or "length" when MAX_TOKENS cut the answer off) and the token counts in
+    its usage_metadata; when streaming, only the last chunk of a call
+    carries them.
+    """
+    
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> LLMText:
+        generation = result[0]
+        message = getattr(generation, 'message', None)
+        metadata = getattr(message, 'response_metadata', None) or {}
+        finish_reason = metadata.get('finish_reason') or (generation.generation_info or {}).get('finish_reason')
+        return LLMText(generation.text, finish_reason, getattr(message, 'usage_metadata', None))
@@ -1,139 +1,1429 @@
 """LLM Service for dashboard generation using LangChain + Groq"""
-import json
-import re
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional
+from app import json_backend, metrics
 from app.config import settings
-from app.prompts import SYSTEM_PROMPT, build_user_prompt
+from app.logging_config import log_request
+from app.prompts import CONTINUE_PROMPT, build_user_prompt, system_prompt
+from app.html_extract import (CONTINUATION_OVERLAP, DOCTYPE, HtmlStreamExtractor, cut_off, extract_html,
+                              needs_doctype, stitch_continuation)
+from app.cache import ResponseCache, make_cache_key
+from app.client_pool import ChainPool
+from app.llm_backends import create_backend
+from app.layout_cache import build_layout, describe, fill_layout, make_layout_key
+from app.rate_limiter import (PRIORITY_BATCH, PRIORITY_INTERACTIVE, AdmissionQueue, QueueFullError, TokenBuckets,
+                              backoff_delay, transient_error_reason)
+from app.shared_state import RateLimitState
+from app.singleflight import SingleFlight
+from app.template_renderer import RENDER_MODES, TemplateNotApplicableError, render_dashboard
+from app.tokenizer import count_tokens, tokenizer_name, tokens_estimated
+
+logger = logging.getLogger(__name__)
+
+# Continuations with less output budget than this left are not worth a call
+MIN_CONTINUATION_TOKENS = 256
+
+# Attributes built on first use by LLMService._init_llm_stack (they need LangChain)
+LLM_STACK_ATTRIBUTES = frozenset({'llm', 'prompt_template', 'continuation_template', 'output_parser', 'chain'})
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt cannot fit the model's context window"""
+
+
+def rate_limit_delay(error: BaseException, attempt: int = 0) -> Optional[float]:
+    """
+    Seconds to wait before retrying if error was caused by a 429 from the API
+    or a full LLM queue (QueueFullError)
+    
+    Walks the exception chain, since generation errors wrap the Groq SDK
+    error. Honours the Retry-After header (or the error's retry_after) and
+    falls back to exponential backoff (1s, 2s, 4s, ...) when it is missing.
+    
+    Args:
+        error: Exception raised by a generation
+        attempt: Number of rate-limited attempts so far (0 for the first)
+    
+    Returns:
+        Delay in seconds, or None if the error is not a rate limit
+    """
+    while error is not None:
+        if getattr(error, 'status_code', None) == 429:
+            retry_after = getattr(error, 'retry_after', None)
+            if retry_after is None:
+                response = getattr(error, 'response', None)
+                retry_after = response.headers.get('retry-after') if response is not None else None
+            try:
+                return max(0.0, float(retry_after))
+            except (TypeError, ValueError):
+                return float(2 ** attempt)
+        error = error.__cause__ or error.__context__
+    return None
+
 
 class LLMService:
-    """Service for interacting with Groq API using LangChain"""
+    """Service for generating dashboards with LangChain and the configured LLM backend"""
     
     def __init__(self):
-        """Initialize LangChain ChatGroq client"""
-        # Initialize ChatGroq with LangChain
-        self.llm = ChatGroq(
-            api_key=settings.GROQ_API_KEY,
-            model_name=settings.GROQ_MODEL,
-            temperature=settings.TEMPERATURE,
-            max_tokens=settings.MAX_TOKENS,
-        )
-        
-        # Create prompt template
-        self.prompt_template = ChatPromptTemplate.from_messages([
-            SystemMessagePromptTemplate.from_template(SYSTEM_PROMPT),
-            HumanMessagePromptTemplate.from_template("{user_prompt}")
-        ])
-        
-        # Create output parser
-        self.output_parser = StrOutputParser()
-        
-        # Create the LangChain chain
-        self.chain = self.prompt_template | self.llm | self.output_parser
+        """
+        Set up the service without touching LangChain
+        
+        The chat model, prompt templates and chain (LLM_STACK_ATTRIBUTES)
+        are built by _init_llm_stack on first access, or ahead of time by
+        warm_up, so importing app.main stays fast.
+        """
+        # Groq, or a local fake for offline runs (see app.llm_backends)
+        self.backend = create_backend(settings.LLM_BACKEND)
+        
+        # The system message is a fixed message, not a template, so every
+        # request starts with the same bytes (prefix caching)
+        self.prompt_variant = settings.PROMPT_VARIANT
+        self.system_prompt = system_prompt(self.prompt_variant)
         
         self.model = settings.GROQ_MODEL
+        
+        # Guards the one-time build of the LangChain stack
+        self._llm_stack_lock = threading.Lock()
+        
+        # Pool of chains for per-request temperature overrides
+        self.chain_pool = ChainPool(self._build_chain, max_size=settings.LLM_CLIENT_POOL_SIZE)
+        
+        # Token count of the static system prompt, filled on first use
+        self._system_tokens = None
+        
+        # Concurrency limit and bounded wait line for the async path (created lazily per event loop)
+        self._queue = None
+        self._queue_loop = None
+        metrics.QUEUED.set_function(lambda: self._queue.waiting if self._queue is not None else 0)
+        
+        # Response cache keyed on (data, prompt, model, temperature, prompt variant)
+        self.cache = ResponseCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+            ttl_seconds=settings.CACHE_TTL_SECONDS,
+            db_path=settings.CACHE_DB_PATH,
+        ) if settings.CACHE_ENABLED else None
+        if self.cache is not None:
+            metrics.CACHE_ENTRIES.set_function(lambda: self.cache.stats()['entries'])
+            metrics.CACHE_BYTES.set_function(lambda: self.cache.stats()['bytes'])
+    
+        # LLM layouts keyed on (schema fingerprint, prompt, model), refilled with new values
+        self.layouts = ResponseCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+            ttl_seconds=settings.LAYOUT_TTL_SECONDS,
+            db_path=settings.CACHE_DB_PATH,
+        ) if settings.LAYOUT_REUSE_ENABLED else None
     
-    def generate_dashboard(self, json_data_str: str, user_instructions: str, temperature: float = None) -> dict:
+        # Identical generations in flight at the same time share one LLM call
+        self.flights = SingleFlight() if settings.SINGLEFLIGHT_ENABLED else None
+        
+        # Back-off after a 429, shared with the other workers through RATE_LIMIT_DB_PATH
+        self.rate_limits = RateLimitState(settings.RATE_LIMIT_DB_PATH)
+        
+        # Per-minute request and token budget of the API key, also shared through RATE_LIMIT_DB_PATH
+        self.budget = TokenBuckets({'requests': settings.GROQ_RPM_LIMIT, 'tokens': settings.GROQ_TPM_LIMIT},
+                                   settings.RATE_LIMIT_DB_PATH)
+    
+    def __getattr__(self, name: str) -> Any:
+        """Build the LangChain stack the first time one of its attributes is needed"""
+        if name not in LLM_STACK_ATTRIBUTES:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        self._init_llm_stack()
+        return self.__dict__[name]
+    
+    def _init_llm_stack(self) -> None:
+        """Import LangChain and build the default chat model, prompt templates and chain (once)"""
+        with self._llm_stack_lock:
+            if 'chain' in self.__dict__:
+                return
+            init_start = time.time()
+            from langchain_core.messages import SystemMessage
+            from langchain_core.prompts import (AIMessagePromptTemplate, ChatPromptTemplate,
+                                                HumanMessagePromptTemplate)
+            from app.llm_output import FinishReasonParser
+            
+            # Initialize the default chat model with LangChain
+            llm = self._build_llm(settings.GROQ_MODEL, settings.TEMPERATURE)
+            
+            prompt_template = ChatPromptTemplate.from_messages([
+                SystemMessage(content=self.system_prompt),
+                HumanMessagePromptTemplate.from_template("{user_prompt}")
+            ])
+            
+            # Same conversation with the cut-off answer as the assistant turn, for
+            # resuming output that hit MAX_TOKENS
+            continuation_template = ChatPromptTemplate.from_messages([
+                SystemMessage(content=self.system_prompt),
+                HumanMessagePromptTemplate.from_template("{user_prompt}"),
+                AIMessagePromptTemplate.from_template("{partial}"),
+                HumanMessagePromptTemplate.from_template(CONTINUE_PROMPT),
+            ])
+            
+            # Plain strings that also carry the call's finish_reason (see _continuation)
+            output_parser = FinishReasonParser()
+            
+            # Attributes already assigned from outside (e.g. a benchmark stub) win
+            built = {
+                'llm': llm,
+                'prompt_template': prompt_template,
+                'continuation_template': continuation_template,
+                'output_parser': output_parser,
+            }
+            for name, value in built.items():
+                self.__dict__.setdefault(name, value)
+            # Create the LangChain chain last: its presence marks the stack as built
+            self.__dict__.setdefault('chain', self.prompt_template | self.llm | self.output_parser)
+            logger.info("🔌 LLM stack ready in %.0fms (%s backend)", (time.time() - init_start) * 1000,
+                        self.backend.name)
+    
+    def llm_ready(self) -> bool:
+        """True once the LangChain stack is built (checking does not build it)"""
+        return 'chain' in self.__dict__
+    
+    def warm_up(self) -> None:
+        """
+        Build the LangChain stack ahead of the first request
+        
+        Meant to run on a background thread at startup; requests that arrive
+        earlier wait for it instead of building a second stack.
+        """
+        try:
+            self._init_llm_stack()
+        except Exception as e:
+            # The first request will retry and report the error properly
+            logger.warning(f"⚠️  LLM warm-up failed: {str(e)}")
+    
+    def generate_dashboard(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                           parsed_data: Any = None, data_format: str = None,
+                           render_mode: str = None) -> dict:
         """
         Generate dashboard HTML from JSON data and user instructions using LangChain
         
+        Identical requests already in flight (from other threads) share one
+        LLM call; see app.singleflight.
+        
         Args:
             json_data_str: JSON data as string
             user_instructions: User's design instructions
             temperature: Optional temperature override (0.0-2.0)
+            parsed_data: json_data_str already parsed (e.g. by DashboardRequest); skips re-parsing
+            data_format: DATA section encoding ('pretty', 'minified', 'columnar'); defaults to settings
+            render_mode: 'auto', 'llm' or 'template' (see app.template_renderer); defaults to settings
             
         Returns:
             dict with 'html', 'tokens_used', and 'model' keys
         """
-        import time
-        import logging
+        if self.flights is None:
+            return self._generate_dashboard(json_data_str, user_instructions, temperature,
+                                            parsed_data, data_format, render_mode)
         
-        logger = logging.getLogger(__name__)
+        parsed_data = self._parse_for_flight(json_data_str, parsed_data)
+        key = self._request_key(parsed_data, user_instructions, temperature, data_format, render_mode)
+        result, shared_by, leader = self.flights.do(key, lambda: self._generate_dashboard(
+            json_data_str, user_instructions, temperature, parsed_data, data_format, render_mode, key[0]))
+        return self._flight_result(result, shared_by, leader)
+    
+    def _generate_dashboard(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                            parsed_data: Any = None, data_format: str = None,
+                            render_mode: str = None, cache_key: str = None) -> dict:
+        """Uncoalesced body of generate_dashboard (cache_key: see _prepare_generation)"""
         start_time = time.time()
         
         try:
-            # Step 1: Parse JSON
-            logger.info("🔍 Step 1: Parsing JSON data...")
-            parse_start = time.time()
-            json_data = json.loads(json_data_str)
-            parse_time = time.time() - parse_start
-            logger.info(f"✅ JSON parsed successfully in {parse_time*1000:.2f}ms")
-            logger.debug(f"   Data keys: {list(json_data.keys())}")
-            
-            # Step 2: Build prompt
-            logger.info("📝 Step 2: Building user prompt...")
-            prompt_start = time.time()
-            user_prompt = build_user_prompt(json_data, user_instructions)
-            prompt_time = time.time() - prompt_start
-            prompt_length = len(user_prompt)
-            logger.info(f"✅ Prompt built in {prompt_time*1000:.2f}ms ({prompt_length} chars)")
-            logger.debug(f"   Prompt preview: {user_prompt[:200]}...")
+            state = self._prepare_generation(json_data_str, user_instructions, temperature,
+                                             parsed_data, data_format, render_mode, cache_key)
+            if 'cached' in state:
+                return self._cached_generation(state, start_time)
+            if 'rendered' in state:
+                return self._rendered_generation(state, start_time)
+            if 'reused' in state:
+                return self._layout_generation(state, start_time)
+            self._select_chain(state)
             
-            # Step 3: Configure temperature
-            temp = temperature if temperature is not None else settings.TEMPERATURE
-            logger.info(f"🌡️  Step 3: Temperature set to {temp}")
-            
-            # Step 4: Create/select chain
-            logger.info("🔗 Step 4: Preparing LangChain...")
-            chain_start = time.time()
-            if temperature is not None:
-                logger.debug(f"   Creating custom LLM instance with temp={temp}")
-                llm = ChatGroq(
-                    api_key=settings.GROQ_API_KEY,
-                    model_name=settings.GROQ_MODEL,
-                    temperature=temp,
-                    max_tokens=settings.MAX_TOKENS,
-                )
-                chain = self.prompt_template | llm | self.output_parser
+            # Step 5: Invoke LLM (after any back-off or RPM/TPM wait, retrying transient errors)
+            logger.info("🤖 Step 5: Calling the %s backend (model: %s)...", self.backend.name, self.model)
+            llm_start = time.time()
+            queue_time = state['queue_time']
+            metrics.LLM_IN_FLIGHT.inc()
+            try:
+                response = self._invoke(state['chain'], {
+                    "user_prompt": state['user_prompt']
+                }, state, state['prompt_tokens'] + settings.MAX_TOKENS)
+                # Resume output cut off at MAX_TOKENS, within OUTPUT_TOKEN_BUDGET
+                step = self._continuation(state, response)
+                while step is not None:
+                    chain, inputs, tokens = step
+                    response, stitched = self._stitch(state, response, self._invoke(chain, inputs, state, tokens))
+                    step = self._continuation(state, response) if stitched else None
+            finally:
+                metrics.LLM_IN_FLIGHT.dec()
+            # Back-off, budget and retry waits count as queueing, not LLM time
+            state['llm_time'] = time.time() - llm_start - (state['queue_time'] - queue_time)
+            
+            return self._finalize_generation(state, response, start_time)
+            
+        except json_backend.JSONDecodeError as e:
+            metrics.ERRORS.inc(type='invalid_json')
+            logger.error(f"❌ JSON Parse Error: {str(e)}")
+            raise ValueError(f"Invalid JSON data: {str(e)}")
+        except PromptTooLargeError:
+            metrics.ERRORS.inc(type='prompt_too_large')
+            raise
+        except TemplateNotApplicableError:
+            metrics.ERRORS.inc(type='template_not_applicable')
+            raise
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"❌ Generation Error: {str(e)}")
+            logger.exception("Full traceback:")
+            raise Exception(f"Error generating dashboard: {str(e)}") from e
+    
+    async def agenerate_dashboard(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                                  parsed_data: Any = None, data_format: str = None,
+                                  render_mode: str = None, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        """
+        Async variant of generate_dashboard that awaits the chain via ainvoke
+        
+        The LLM call no longer blocks the event loop, so a single worker can
+        serve many generations at once. At most settings.MAX_CONCURRENT_GENERATIONS
+        LLM calls are in flight per process; extra requests wait for a slot in
+        priority order, and beyond settings.LLM_QUEUE_MAX waiting they are
+        turned away with QueueFullError. Identical requests already in flight
+        are coalesced onto one call.
+        
+        Args:
+            json_data_str: JSON data as string
+            user_instructions: User's design instructions
+            temperature: Optional temperature override (0.0-2.0)
+            parsed_data: json_data_str already parsed (e.g. by DashboardRequest); skips re-parsing
+            data_format: DATA section encoding ('pretty', 'minified', 'columnar'); defaults to settings
+            render_mode: 'auto', 'llm' or 'template' (see app.template_renderer); defaults to settings
+            priority: Place in the LLM queue, PRIORITY_INTERACTIVE or PRIORITY_BATCH (served later)
+            
+        Returns:
+            dict with 'html', 'tokens_used', and 'model' keys
+        
+        Raises:
+            QueueFullError: If the LLM queue is full (respond with 429 and Retry-After)
+        """
+        if self.flights is None:
+            return await self._agenerate_dashboard(json_data_str, user_instructions, temperature,
+                                                   parsed_data, data_format, render_mode, priority)
+        
+        parsed_data = self._parse_for_flight(json_data_str, parsed_data)
+        key = self._request_key(parsed_data, user_instructions, temperature, data_format, render_mode)
+        result, shared_by, leader = await self.flights.ado(key, lambda: self._agenerate_dashboard(
+            json_data_str, user_instructions, temperature, parsed_data, data_format, render_mode, priority,
+            key[0]))
+        return self._flight_result(result, shared_by, leader)
+    
+    async def _agenerate_dashboard(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                                   parsed_data: Any = None, data_format: str = None,
+                                   render_mode: str = None, priority: int = PRIORITY_INTERACTIVE,
+                                   cache_key: str = None) -> dict:
+        """Uncoalesced body of agenerate_dashboard (cache_key: see _prepare_generation)"""
+        start_time = time.time()
+        
+        try:
+            state = await self._aprepare_generation(json_data_str, user_instructions, temperature,
+                                                    parsed_data, data_format, render_mode, cache_key)
+            if 'cached' in state:
+                return self._cached_generation(state, start_time)
+            if 'rendered' in state:
+                return self._rendered_generation(state, start_time)
+            if 'reused' in state:
+                return self._layout_generation(state, start_time)
+            await self._aselect_chain(state)
+            
+            # Step 5: Invoke LLM (bounded by the concurrency limit and the RPM/TPM budget)
+            async with self._llm_slot(state, priority):
+                logger.info("🤖 Step 5: Calling the %s backend (model: %s)...", self.backend.name, self.model)
+                llm_start = time.time()
+                queue_time = state['queue_time']
+                response = await self._ainvoke(state['chain'], {
+                    "user_prompt": state['user_prompt']
+                }, state, state['prompt_tokens'] + settings.MAX_TOKENS)
+                # Resume output cut off at MAX_TOKENS, within OUTPUT_TOKEN_BUDGET
+                step = self._continuation(state, response)
+                while step is not None:
+                    chain, inputs, tokens = step
+                    response, stitched = self._stitch(state, response, await self._ainvoke(chain, inputs, state, tokens))
+                    step = self._continuation(state, response) if stitched else None
+                # Back-off, budget and retry waits count as queueing, not LLM time
+                state['llm_time'] = time.time() - llm_start - (state['queue_time'] - queue_time)
+            
+            return self._finalize_generation(state, response, start_time, background_store=True)
+            
+        except json_backend.JSONDecodeError as e:
+            metrics.ERRORS.inc(type='invalid_json')
+            logger.error(f"❌ JSON Parse Error: {str(e)}")
+            raise ValueError(f"Invalid JSON data: {str(e)}")
+        except PromptTooLargeError:
+            metrics.ERRORS.inc(type='prompt_too_large')
+            raise
+        except TemplateNotApplicableError:
+            metrics.ERRORS.inc(type='template_not_applicable')
+            raise
+        except QueueFullError:
+            raise
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"❌ Generation Error: {str(e)}")
+            logger.exception("Full traceback:")
+            raise Exception(f"Error generating dashboard: {str(e)}") from e
+    
+    async def astream_dashboard(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                                parsed_data: Any = None, data_format: str = None,
+                                render_mode: str = None) -> AsyncIterator[str]:
+        """
+        Stream dashboard HTML chunks as the LLM produces them
+        
+        Uses chain.astream and strips the markdown fence / adds the DOCTYPE
+        incrementally, so the first bytes reach the client after the first
+        tokens instead of after the whole completion. Output cut off at
+        MAX_TOKENS is continued in the same stream. A call that fails before
+        its first token is retried like in agenerate_dashboard; once output
+        has been sent, errors end the stream.
+        
+        Args:
+            json_data_str: JSON data as string
+            user_instructions: User's design instructions
+            temperature: Optional temperature override (0.0-2.0)
+            parsed_data: json_data_str already parsed (e.g. by DashboardRequest); skips re-parsing
+            data_format: DATA section encoding ('pretty', 'minified', 'columnar'); defaults to settings
+            render_mode: 'auto', 'llm' or 'template' (see app.template_renderer); defaults to settings
+            
+        Yields:
+            Cleaned HTML chunks
+        """
+        start_time = time.time()
+        
+        try:
+            state = await self._aprepare_generation(json_data_str, user_instructions, temperature,
+                                                    parsed_data, data_format, render_mode)
+        except json_backend.JSONDecodeError as e:
+            metrics.ERRORS.inc(type='invalid_json')
+            logger.error(f"❌ JSON Parse Error: {str(e)}")
+            raise ValueError(f"Invalid JSON data: {str(e)}")
+        except PromptTooLargeError:
+            metrics.ERRORS.inc(type='prompt_too_large')
+            raise
+        except TemplateNotApplicableError:
+            metrics.ERRORS.inc(type='template_not_applicable')
+            raise
+        
+        if 'cached' in state:
+            yield self._cached_generation(state, start_time)['html']
+            return
+        if 'rendered' in state:
+            yield self._rendered_generation(state, start_time)['html']
+            return
+        if 'reused' in state:
+            yield self._layout_generation(state, start_time)['html']
+            return
+        
+        extractor = HtmlStreamExtractor()
+        first_chunk_time = None
+        html_chunks = []
+        
+        try:
+            await self._aselect_chain(state)
+            async with self._llm_slot(state):
+                logger.info("🤖 Step 5: Streaming from the %s backend (model: %s)...", self.backend.name, self.model)
+                llm_start = time.time()
+                queue_time = state['queue_time']
+                async for piece in self._astream_raw(state):
+                    html_chunk = extractor.feed(piece)
+                    if html_chunk:
+                        if first_chunk_time is None:
+                            first_chunk_time = time.time() - llm_start
+                            logger.info("⚡ First HTML chunk after %.2fms", first_chunk_time*1000)
+                        html_chunks.append(html_chunk)
+                        yield html_chunk
+                state['llm_time'] = time.time() - llm_start - (state['queue_time'] - queue_time)
+        
+            html_chunk = extractor.finish()
+        except QueueFullError:
+            raise
+        except Exception as e:
+            self._record_error(e)
+            raise
+        truncated = cut_off(state['finish_reason'], extractor.complete)
+        if truncated:
+            self._record_truncation(extractor.emitted_chars)
+        if html_chunk:
+            html_chunks.append(html_chunk)
+            yield html_chunk
+        
+        html_content = "".join(html_chunks)
+        prompt_tokens, completion_tokens, tokenizer, estimated = self._token_counts(state, html_content)
+        result = {
+            'html': html_content,
+            'tokens_used': prompt_tokens + completion_tokens,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokenizer': tokenizer,
+            'tokens_estimated': estimated,
+            'model': self.model,
+            'renderer': 'llm',
+            'temperature': state['temperature'],
+            'truncated': truncated,
+            'continuations': state['continuations'],
+        }
+        self._cache_store(state, result, background=True)
+        
+        total_time = time.time() - start_time
+        self._record_generation(state, total_time, html_content, completion_tokens, outcome='streamed')
+        log_request('streamed', {
+            **result,
+            'latency': {
+                'total_ms': round(total_time * 1000, 2),
+                'first_chunk_ms': round(first_chunk_time * 1000, 2) if first_chunk_time is not None else None,
+                'queue_ms': round(state['queue_time'] * 1000, 2),
+                'llm_ms': round(state['llm_time'] * 1000, 2),
+            }
+        })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("=" * 60)
+            logger.info("🎉 DASHBOARD STREAM COMPLETE")
+            logger.info(f"⏱️  Total Time: {total_time*1000:.2f}ms ({total_time:.2f}s)")
+            if first_chunk_time is not None:
+                logger.info(f"   ├─ Time to First Chunk: {first_chunk_time*1000:.2f}ms")
+            logger.info(f"   └─ LLM Stream: {state['llm_time']*1000:.2f}ms")
+            logger.info(f"📄 Output Size: {extractor.emitted_chars:,} chars")
+            logger.info("=" * 60)
+    
+    async def agenerate_batch(self, items: List[dict], max_concurrency: int = None) -> List[dict]:
+        """
+        Generate several dashboards with bounded parallelism
+        
+        Identical items (same data, prompt, temperature, data format and render mode) are
+        generated once and share the result. Items queue behind interactive
+        requests (PRIORITY_BATCH). When Groq still answers with a rate limit
+        after the per-call retries, or the LLM queue is full, the whole batch
+        holds off new calls until Retry-After has passed, then the item is
+        retried (up to settings.BATCH_RATE_LIMIT_RETRIES).
+        A failing item never fails the batch; its error is returned instead.
+        
+        Args:
+            items: dicts of agenerate_dashboard keyword arguments (json_data_str,
+                   user_instructions, and optionally temperature, parsed_data, data_format, render_mode)
+            max_concurrency: Items generated at once; defaults to settings.BATCH_MAX_CONCURRENCY
+        
+        Returns:
+            One dict per item, in input order, with 'success', 'result' or 'error',
+            'attempts' and 'duplicate_of' (index of the item whose result was reused)
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.BATCH_MAX_CONCURRENCY))
+        resume_at = 0.0  # loop.time() before which no new LLM call may start
+        
+        # Group identical items; only the first of each group is generated
+        groups = {}
+        for index, item in enumerate(items):
+            groups.setdefault(self._batch_key(item), []).append(index)
+        logger.info("📚 Batch: %s items, %s unique", len(items), len(groups))
+        
+        async def run(item: dict) -> dict:
+            nonlocal resume_at
+            async with semaphore:
+                attempt = 0
+                while True:
+                    wait = resume_at - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    attempt += 1
+                    try:
+                        result = await self.agenerate_dashboard(**item, priority=PRIORITY_BATCH)
+                        return {'success': True, 'result': result, 'attempts': attempt}
+                    except Exception as e:
+                        delay = rate_limit_delay(e, attempt - 1)
+                        if delay is None or attempt > settings.BATCH_RATE_LIMIT_RETRIES:
+                            return {'success': False, 'error': e, 'attempts': attempt}
+                        logger.warning("⏳ Rate limited, pausing batch for %.2fs (attempt %s)", delay, attempt)
+                        resume_at = max(resume_at, loop.time() + delay)
+        
+        indices = list(groups.values())
+        outcomes = await asyncio.gather(*[run(items[group[0]]) for group in indices])
+        
+        results = [None] * len(items)
+        for group, outcome in zip(indices, outcomes):
+            results[group[0]] = {**outcome, 'duplicate_of': None}
+            for index in group[1:]:
+                results[index] = {**outcome, 'attempts': 0, 'duplicate_of': group[0]}
+        return results
+    
+    def _batch_key(self, item: dict) -> tuple:
+        """
+        Identity of a batch item for deduplication
+        
+        Items whose JSON does not parse are keyed on the raw string so they
+        fail individually.
+        """
+        json_data = item.get('parsed_data')
+        if json_data is None:
+            try:
+                # Kept on the item so agenerate_dashboard does not parse it again
+                json_data = item['parsed_data'] = json_backend.loads(item['json_data_str'])
+            except json_backend.JSONDecodeError:
+                return ('invalid', item['json_data_str'], item['user_instructions'])
+        return self._request_key(json_data, item['user_instructions'], item.get('temperature'),
+                                 item.get('data_format'), item.get('render_mode'))
+    
+    def _request_key(self, json_data: Any, user_instructions: str, temperature: float = None,
+                     data_format: str = None, render_mode: str = None) -> tuple:
+        """
+        Identity of a generation: the cache key (data, prompt, model,
+        temperature, prompt variant, data format) plus the render mode, which
+        decides whether the LLM is called at all
+        """
+        temp = temperature if temperature is not None else settings.TEMPERATURE
+        return (make_cache_key(json_data, user_instructions, self.model, temp, self.prompt_variant,
+                               data_format or settings.PROMPT_DATA_FORMAT),
+                render_mode or settings.RENDER_MODE)
+    
+    def _parse_for_flight(self, json_data_str: str, parsed_data: Any) -> Any:
+        """Parse the request JSON up front so it can be keyed (once; reused downstream)"""
+        if parsed_data is not None:
+            return parsed_data
+        try:
+            return json_backend.loads(json_data_str)
+        except json_backend.JSONDecodeError as e:
+            metrics.ERRORS.inc(type='invalid_json')
+            logger.error(f"❌ JSON Parse Error: {str(e)}")
+            raise ValueError(f"Invalid JSON data: {str(e)}")
+    
+    def _flight_result(self, result: dict, shared_by: int, leader: bool) -> dict:
+        """Copy of a (possibly shared) result annotated with coalescing info"""
+        result = {**result, 'coalesced': not leader, 'coalesced_requests': shared_by}
+        if not leader:
+            metrics.COALESCED.inc()
+            logger.info("🔗 Coalesced onto an in-flight generation (%s requests shared it)", shared_by)
+            log_request('coalesced', result)
+        return result
+    
+    def _record_error(self, error: Exception) -> None:
+        """Count a failed generation in /metrics by error type; a 429 also sets the shared back-off"""
+        delay = rate_limit_delay(error)
+        if delay is not None:
+            metrics.ERRORS.inc(type='rate_limited')
+            self.rate_limits.back_off(delay)
+        elif isinstance(error, ValueError):
+            metrics.ERRORS.inc(type='invalid_output')
+        else:
+            metrics.ERRORS.inc(type='llm_error')
+    
+    def _continuation(self, state: dict, response: str) -> Optional[tuple]:
+        """
+        Prepare a call that resumes a response cut off at MAX_TOKENS
+        
+        The continuation gets the original conversation plus the partial
+        answer, and at most the output budget that is left.
+        
+        Args:
+            state: dict returned by _prepare_generation
+            response: Raw LLM output so far
+            
+        Returns:
+            (chain, inputs, tokens the call may use) for the next call, or None if the model
+            stopped on its own or OUTPUT_TOKEN_BUDGET / the context window leaves no room for another call
+        """
+        # Only the API's finish_reason triggers a continuation: a missing </html>
+        # alone (e.g. a fragment) is not worth another LLM call
+        if not cut_off(state['finish_reason'], complete=True):
+            return None
+        used = count_tokens(response)
+        max_tokens = min(settings.MAX_TOKENS, settings.OUTPUT_TOKEN_BUDGET - used)
+        prompt_tokens = state['prompt_tokens'] + used + count_tokens(CONTINUE_PROMPT)
+        if max_tokens < MIN_CONTINUATION_TOKENS or prompt_tokens + max_tokens > settings.MODEL_CONTEXT_WINDOW:
+            logger.info("✂️  Output cut off after %s tokens; no budget left for a continuation", used)
+            return None
+        
+        state['continuations'] += 1
+        state['continuation_prompt_tokens'] += prompt_tokens
+        metrics.CONTINUATIONS.inc()
+        logger.info("✂️  Output cut off after %s tokens; continuation %s (up to %s more tokens)",
+                    used, state['continuations'], max_tokens)
+        _, llm, parser = state['chain'].steps
+        chain = self.continuation_template | llm.bind(max_tokens=max_tokens) | parser
+        return chain, {"user_prompt": state['user_prompt'], "partial": response}, prompt_tokens + max_tokens
+    
+    def _stitch(self, state: dict, response: str, continuation: str) -> tuple:
+        """
+        Append a continuation to the output so far
+        
+        Returns:
+            (stitched output, False if the continuation was empty or restarted the document)
+        """
+        piece = stitch_continuation(response, continuation)
+        if not piece:
+            logger.warning("⚠️  Continuation %s; keeping the cut-off output",
+                           "added nothing" if piece == "" else "started the document over")
+            # What is kept still ends where the output limit cut it off
+            state['finish_reason'] = 'length'
+            return response, False
+        return response + piece, True
+    
+    def _budget_wait(self, tokens: int) -> float:
+        """
+        Seconds the next LLM call has to wait: a 429 back-off first, then the RPM/TPM budget
+        
+        Args:
+            tokens: Tokens the call may use (prompt plus output limit)
+        
+        Returns:
+            0.0 once the call may start (its budget is then spent), else seconds to wait
+        """
+        wait = self.rate_limits.wait_seconds()
+        if wait > 0:
+            return wait
+        wait = self.budget.reserve({'requests': 1, 'tokens': tokens})
+        if wait > 0:
+            metrics.RATE_LIMIT_WAITS.inc()
+        return wait
+    
+    def _wait_for_budget(self, state: dict, tokens: int) -> None:
+        """Block until the next LLM call may start (see _budget_wait), adding the wait to state['queue_time']"""
+        start = time.time()
+        wait = self._budget_wait(tokens)
+        while wait > 0:
+            logger.info("⏳ Rate limited; holding this call for %.2fs", wait)
+            time.sleep(wait)
+            wait = self._budget_wait(tokens)
+        state['queue_time'] += time.time() - start
+    
+    async def _await_budget(self, state: dict, tokens: int) -> None:
+        """Wait until the next LLM call may start (see _budget_wait), adding the wait to state['queue_time']"""
+        start = time.time()
+        wait = await self._shared_state_call(self._budget_wait, tokens)
+        while wait > 0:
+            logger.info("⏳ Rate limited; holding this call for %.2fs", wait)
+            await asyncio.sleep(wait)
+            wait = await self._shared_state_call(self._budget_wait, tokens)
+        state['queue_time'] += time.time() - start
+    
+    async def _shared_state_call(self, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call a back-off / budget method from the event loop without blocking it
+        
+        With RATE_LIMIT_DB_PATH set these run a SQLite transaction that can
+        wait up to SQLITE_BUSY_TIMEOUT for another worker's write lock, so
+        they go to a worker thread; the in-memory state is read inline.
+        """
+        if settings.RATE_LIMIT_DB_PATH:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying a failed LLM call, or None to give up
+        
+        Retries 429s, 5xx, timeouts and connection errors up to
+        settings.LLM_MAX_RETRIES times with jittered exponential backoff. A
+        429 also sets the shared back-off to Retry-After and empties the
+        RPM/TPM buckets, so every call holds off, not just this one.
+        
+        Args:
+            error: Exception raised by the call
+            attempt: Retries of this call so far
+        
+        Returns:
+            Delay in seconds, or None if the error is not transient or retries are used up
+        """
+        reason = transient_error_reason(error)
+        if reason is None or attempt >= settings.LLM_MAX_RETRIES:
+            return None
+        if reason == 'rate_limited':
+            self.rate_limits.back_off(rate_limit_delay(error, attempt))
+            self.budget.drain()
+        delay = backoff_delay(attempt, settings.LLM_RETRY_BASE_DELAY, settings.LLM_RETRY_MAX_DELAY)
+        metrics.LLM_RETRIES.inc(reason=reason)
+        logger.warning("🔁 LLM call failed (%s); retry %s/%s in %.2fs: %s",
+                       reason, attempt + 1, settings.LLM_MAX_RETRIES, delay, error)
+        return delay
+    
+    def _invoke(self, chain, inputs: dict, state: dict, tokens: int) -> str:
+        """
+        Run one LLM call once the back-off and RPM/TPM budget allow, retrying transient errors
+        
+        Args:
+            chain: Runnable to call
+            inputs: Its inputs
+            state: dict returned by _prepare_generation (waits are added to state['queue_time'],
+                the call's finish_reason is stored in state['finish_reason'] and its
+                usage_metadata appended to state['usage'])
+            tokens: Tokens the call may use (prompt plus output limit)
+            
+        Returns:
+            The chain's output
+        """
+        attempt = 0
+        while True:
+            self._wait_for_budget(state, tokens)
+            try:
+                output = chain.invoke(inputs)
+                state['finish_reason'] = getattr(output, 'finish_reason', None)
+                state['usage'].append(getattr(output, 'usage', None))
+                return output
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            attempt += 1
+            time.sleep(delay)
+            state['queue_time'] += delay
+    
+    async def _ainvoke(self, chain, inputs: dict, state: dict, tokens: int) -> str:
+        """Async variant of _invoke"""
+        attempt = 0
+        while True:
+            await self._await_budget(state, tokens)
+            try:
+                output = await chain.ainvoke(inputs)
+                state['finish_reason'] = getattr(output, 'finish_reason', None)
+                state['usage'].append(getattr(output, 'usage', None))
+                return output
+            except Exception as e:
+                delay = await self._shared_state_call(self._retry_delay, e, attempt)
+                if delay is None:
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+            state['queue_time'] += delay
+    
+    async def _astream_call(self, chain, inputs: dict, state: dict, tokens: int) -> AsyncIterator[str]:
+        """
+        Stream one LLM call like _ainvoke runs one: after the back-off and
+        budget, retrying transient errors until the first piece arrives
+        
+        Args:
+            chain: Runnable to stream
+            inputs: Its inputs
+            state: dict returned by _prepare_generation (waits are added to state['queue_time'],
+                the finish_reason of the last piece is stored in state['finish_reason'] and
+                the call's usage_metadata in state['usage'])
+            tokens: Tokens the call may use (prompt plus output limit)
+            
+        Yields:
+            Raw output pieces, in order
+        """
+        state['finish_reason'] = None
+        attempt = 0
+        while True:
+            await self._await_budget(state, tokens)
+            pieces = chain.astream(inputs)
+            try:
+                first = await pieces.__anext__()
+                break
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                delay = await self._shared_state_call(self._retry_delay, e, attempt)
+                if delay is None:
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+            state['queue_time'] += delay
+        
+        async with contextlib.aclosing(pieces):
+            state['finish_reason'] = getattr(first, 'finish_reason', None)
+            state['usage'].append(getattr(first, 'usage', None))
+            yield first
+            async for piece in pieces:
+                state['finish_reason'] = getattr(piece, 'finish_reason', None) or state['finish_reason']
+                state['usage'][-1] = getattr(piece, 'usage', None) or state['usage'][-1]
+                yield piece
+    
+    async def _astream_raw(self, state: dict) -> AsyncIterator[str]:
+        """
+        Raw streamed LLM output, continued past MAX_TOKENS within OUTPUT_TOKEN_BUDGET
+        
+        The start of each continuation is held back until CONTINUATION_OVERLAP
+        characters have arrived, so a repeated tail or a new fence can be
+        dropped before anything reaches the client.
+        
+        Args:
+            state: dict returned by _prepare_generation
+            
+        Yields:
+            Raw output pieces, in order
+        """
+        response = ""
+        first_call = self._astream_call(state['chain'], {"user_prompt": state['user_prompt']}, state,
+                                        state['prompt_tokens'] + settings.MAX_TOKENS)
+        async with contextlib.aclosing(first_call) as pieces:
+            async for piece in pieces:
+                response += piece
+                yield piece
+        
+        step = self._continuation(state, response)
+        while step is not None:
+            chain, inputs, tokens = step
+            head = ""  # start of the continuation, not yet stitched
+            stitched = True
+            async with contextlib.aclosing(self._astream_call(chain, inputs, state, tokens)) as pieces:
+                async for piece in pieces:
+                    if head is None:
+                        response += piece
+                        yield piece
+                        continue
+                    head += piece
+                    if len(head) >= CONTINUATION_OVERLAP:
+                        previous = response
+                        response, stitched = self._stitch(state, response, head)
+                        head = None
+                        if not stitched:
+                            break
+                        yield response[len(previous):]
+            if head is not None:
+                previous = response
+                response, stitched = self._stitch(state, response, head)
+                yield response[len(previous):]
+            step = self._continuation(state, response) if stitched else None
+    
+    def _record_truncation(self, html_chars: int) -> None:
+        """Count and log an output cut off by the output limit (see html_extract.cut_off)"""
+        metrics.TRUNCATED.inc()
+        logger.warning("⚠️  Output cut off at the output limit after %s chars; "
+                       "MAX_TOKENS=%s may be too low", html_chars, settings.MAX_TOKENS)
+    
+    def _record_generation(self, state: dict, total_time: float, html_content: str, completion_tokens: int,
+                           outcome: str = 'generated', **stage_times: float) -> None:
+        """
+        Feed a finished generation into the /metrics histograms and counters
+        
+        Args:
+            state: dict returned by _prepare_generation, with step timings filled in
+            total_time: End-to-end seconds
+            html_content: Final HTML
+            completion_tokens: Tokens in the LLM output
+            outcome: 'generated' or 'streamed'
+            stage_times: Extra stage timings in seconds (e.g. extract=..., validate=...)
+        """
+        for stage in ('parse', 'cache_lookup', 'prompt', 'chain', 'queue', 'llm'):
+            metrics.STAGE_SECONDS.observe(state[f'{stage}_time'], stage=stage)
+        for stage, seconds in stage_times.items():
+            metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+        metrics.GENERATION_SECONDS.observe(total_time, outcome=outcome)
+        metrics.TOKENS.inc(state['prompt_tokens'] + state['continuation_prompt_tokens'], kind='prompt')
+        metrics.TOKENS.inc(completion_tokens, kind='completion')
+        metrics.HTML_CHARS.observe(len(html_content))
+    
+    def stats(self) -> dict:
+        """Backend name plus cache, chain pool, single-flight and rate-limit counters for /stats"""
+        return {
+            'backend': self.backend.name,
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'chain_pool': self.chain_pool.stats(),
+            'singleflight': self.flights.stats() if self.flights is not None else None,
+            'layouts': self.layouts.stats() if self.layouts is not None else None,
+            'rate_limits': {**self.rate_limits.stats(), 'budget': self.budget.stats()},
+            'queue': self._queue.stats() if self._queue is not None else None,
+        }
+    
+    @contextlib.asynccontextmanager
+    async def _llm_slot(self, state: dict, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Hold one concurrency slot for an LLM call
+        
+        Waiting generations get free slots lowest priority first. Records the
+        wait in state['queue_time'] and keeps the in-flight gauge of /metrics
+        up to date (the queued gauge reads the queue directly).
+        
+        Args:
+            state: dict returned by _prepare_generation
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BATCH
+        
+        Raises:
+            QueueFullError: If settings.LLM_QUEUE_MAX generations are already waiting
+        """
+        queue = self._get_queue()
+        queue_start = time.time()
+        try:
+            await queue.acquire(priority)
+        except QueueFullError as e:
+            metrics.REJECTED.inc()
+            logger.warning("🚦 LLM queue full (%s waiting); turning the request away, retry after %ss",
+                           e.waiting, e.retry_after)
+            raise
+        slot_start = time.time()
+        state['queue_time'] = slot_start - queue_start
+        metrics.LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            metrics.LLM_IN_FLIGHT.dec()
+            queue.release(time.time() - slot_start)
+    
+    def _get_queue(self) -> AdmissionQueue:
+        """
+        Return the LLM admission queue for the running event loop
+        
+        asyncio primitives are bound to the loop they are first used on, so
+        a fresh queue is created whenever the service is driven from a
+        different loop (e.g. successive asyncio.run calls in scripts).
+        
+        Returns:
+            AdmissionQueue limiting concurrent and waiting LLM calls
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._queue_loop is not loop:
+            self._queue = AdmissionQueue(settings.MAX_CONCURRENT_GENERATIONS, settings.LLM_QUEUE_MAX)
+            self._queue_loop = loop
+        return self._queue
+    
+    def _build_llm(self, model: str, temperature: float):
+        """
+        Create a chat model with the configured backend
+        
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            
+        Returns:
+            LangChain chat model (ChatGroq for the groq backend)
+        """
+        return self.backend.build(model, temperature)
+    
+    def _build_chain(self, model: str, temperature: float):
+        """Build a prompt | llm | parser chain for a (model, temperature) pool key"""
+        return self.prompt_template | self._build_llm(model, temperature) | self.output_parser
+    
+    def _cache_store(self, state: dict, result: dict, background: bool = False) -> None:
+        """
+        Store a fresh result under the request's cache key and its layout under the layout key, if enabled
+        
+        Args:
+            state: dict returned by _prepare_generation
+            result: Result dict to cache
+            background: Write the disk tier without waiting for it (set on the event loop)
+        """
+        if result.get('truncated'):
+            # A retry should get a new generation, not the same cut-off document
+            return
+        if self.cache is not None and state.get('cache_key'):
+            self.cache.set(state['cache_key'], result, background=background)
+        if self.layouts is not None and state.get('layout_key'):
+            layout = build_layout(result['html'], state['layout_values'], state['user_instructions'])
+            if layout is not None:
+                self.layouts.set(state['layout_key'], layout, background=background)
             else:
-                logger.debug("   Using default chain")
-                chain = self.chain
-            chain_time = time.time() - chain_start
-            logger.info(f"✅ Chain ready in {chain_time*1000:.2f}ms")
+                logger.info("🧱 Layout not recorded: values cannot be mapped onto the HTML unambiguously")
+    
+    def _layout_generation(self, state: dict, start_time: float) -> dict:
+        """
+        Build the response for a dashboard refilled from a cached layout
+        
+        Args:
+            state: dict returned by _prepare_generation with a 'reused' entry
+            start_time: time.time() at the start of the generation
             
-            # Step 5: Invoke LLM
-            logger.info(f"🤖 Step 5: Calling Groq API (model: {self.model})...")
-            llm_start = time.time()
-            response = chain.invoke({
-                "user_prompt": user_prompt
-            })
-            llm_time = time.time() - llm_start
-            response_length = len(response)
-            logger.info(f"✅ LLM response received in {llm_time*1000:.2f}ms ({response_length} chars)")
-            logger.debug(f"   Response preview: {response[:200]}...")
+        Returns:
+            Result dict with renderer='layout' and no token usage
+        """
+        total_time = time.time() - start_time
+        html_content = state['reused']
+        metrics.STAGE_SECONDS.observe(state['parse_time'], stage='parse')
+        metrics.STAGE_SECONDS.observe(state['cache_lookup_time'], stage='cache_lookup')
+        metrics.STAGE_SECONDS.observe(state['layout_time'], stage='layout')
+        metrics.GENERATION_SECONDS.observe(total_time, outcome='layout')
+        metrics.HTML_CHARS.observe(len(html_content))
+        logger.info("🧱 Refilled a cached layout in %.2fms (no LLM call)", total_time*1000)
+        
+        result = {
+            'html': html_content,
+            'tokens_used': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'tokenizer': None,
+            'tokens_estimated': False,
+            'model': self.model,
+            'renderer': 'layout',
+            'temperature': state['temperature'],
+            'cache_hit': False,
+            'latency': {
+                'total_ms': round(total_time * 1000, 2),
+                'parse_ms': round(state['parse_time'] * 1000, 2),
+                'cache_lookup_ms': round(state['cache_lookup_time'] * 1000, 2),
+                'layout_ms': round(state['layout_time'] * 1000, 2),
+            }
+        }
+        log_request('layout', result)
+        return result
+    
+    def _rendered_generation(self, state: dict, start_time: float) -> dict:
+        """
+        Build the response for a dashboard rendered by the template engine
+        
+        Args:
+            state: dict returned by _prepare_generation with a 'rendered' entry
+            start_time: time.time() at the start of the generation
+            
+        Returns:
+            Result dict with renderer='template' and no token usage
+        """
+        total_time = time.time() - start_time
+        html_content = state['rendered']
+        metrics.STAGE_SECONDS.observe(state['parse_time'], stage='parse')
+        metrics.STAGE_SECONDS.observe(state['render_time'], stage='template')
+        metrics.GENERATION_SECONDS.observe(total_time, outcome='template')
+        metrics.HTML_CHARS.observe(len(html_content))
+        logger.info("🧩 Rendered from template in %.2fms (no LLM call)", total_time*1000)
+        
+        result = {
+            'html': html_content,
+            'tokens_used': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'tokenizer': None,
+            'tokens_estimated': False,
+            'model': 'template',
+            'renderer': 'template',
+            'temperature': state['temperature'],
+            'cache_hit': False,
+            'latency': {
+                'total_ms': round(total_time * 1000, 2),
+                'parse_ms': round(state['parse_time'] * 1000, 2),
+                'render_ms': round(state['render_time'] * 1000, 2),
+            }
+        }
+        log_request('template', result)
+        return result
+    
+    def _cached_generation(self, state: dict, start_time: float) -> dict:
+        """
+        Build the response for a cache hit
+        
+        Args:
+            state: dict returned by _prepare_generation with a 'cached' entry
+            start_time: time.time() at the start of the generation
             
-            # Step 6: Extract HTML
-            logger.info("🔧 Step 6: Extracting and cleaning HTML...")
-            extract_start = time.time()
-            html_content = self._extract_html(response)
-            extract_time = time.time() - extract_start
-            logger.info(f"✅ HTML extracted in {extract_time*1000:.2f}ms")
-            
-            # Step 7: Validate HTML
-            logger.info("✔️  Step 7: Validating HTML...")
-            validate_start = time.time()
-            html_lower = html_content.strip().lower()
-            if not (html_lower.startswith('<!doctype') or 
-                    html_lower.startswith('<html') or 
-                    '<html' in html_lower[:100]):
-                if '<' in html_content and '>' in html_content:
-                    logger.warning("⚠️  DOCTYPE missing, adding it...")
-                    if not html_lower.startswith('<!doctype'):
-                        html_content = '<!DOCTYPE html>\n' + html_content
-                else:
-                    raise ValueError("Generated content is not valid HTML")
-            validate_time = time.time() - validate_start
-            logger.info(f"✅ HTML validated in {validate_time*1000:.2f}ms")
-            
-            # Step 8: Calculate metrics
-            logger.info("📊 Step 8: Calculating metrics...")
-            tokens_used = self._estimate_tokens(user_prompt + html_content)
-            
-            # Total time
-            total_time = time.time() - start_time
-            
-            # Summary
+        Returns:
+            Cached result dict with cache_hit=True and fresh latency figures
+        """
+        total_time = time.time() - start_time
+        metrics.STAGE_SECONDS.observe(state['parse_time'], stage='parse')
+        metrics.STAGE_SECONDS.observe(state['cache_lookup_time'], stage='cache_lookup')
+        metrics.GENERATION_SECONDS.observe(total_time, outcome='cache_hit')
+        logger.info("⚡ Cache hit: served in %.2fms (lookup %.2fms)", total_time*1000, state['cache_lookup_time']*1000)
+        
+        result = {
+            **state['cached'],
+            'cache_hit': True,
+            'latency': {
+                'total_ms': round(total_time * 1000, 2),
+                'parse_ms': round(state['parse_time'] * 1000, 2),
+                'cache_lookup_ms': round(state['cache_lookup_time'] * 1000, 2),
+            }
+        }
+        log_request('cache_hit', result)
+        return result
+    
+    def _prepare_generation(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                            parsed_data: Any = None, data_format: str = None,
+                            render_mode: str = None, cache_key: str = None) -> dict:
+        """
+        Run steps 1-3 of the pipeline: parse JSON, look up the caches, build the prompt
+        
+        Args:
+            json_data_str: JSON data as string
+            user_instructions: User's design instructions
+            temperature: Optional temperature override (0.0-2.0)
+            parsed_data: json_data_str already parsed, or None to parse it here
+            data_format: DATA section encoding; defaults to settings.PROMPT_DATA_FORMAT
+            render_mode: 'auto', 'llm' or 'template'; defaults to settings.RENDER_MODE
+            cache_key: Response cache key already computed by _request_key (for
+                coalescing), so the payload is not serialized and hashed again
+            
+        Returns:
+            dict with the prompt, effective temperature and step timings (the chain
+            is selected afterwards, only when the LLM is called); with a 'rendered'
+            (template fast path), 'cached' or 'reused' (refilled layout) entry
+            instead when no LLM call is needed
+        """
+        state = self._start_generation(json_data_str, user_instructions, temperature, parsed_data,
+                                       data_format, render_mode, cache_key)
+        if 'rendered' in state:
+            return state
+        if self.cache is not None:
+            lookup_start = time.time()
+            if self._use_cached(state, self.cache.get(self._cache_key(state)), lookup_start):
+                return state
+        if self.layouts is not None:
+            layout_start = time.time()
+            if self._use_layout(state, self.layouts.get(self._layout_key(state)), layout_start):
+                return state
+        self._build_prompt(state)
+        return state
+    
+    async def _aprepare_generation(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                                   parsed_data: Any = None, data_format: str = None,
+                                   render_mode: str = None, cache_key: str = None) -> dict:
+        """Async variant of _prepare_generation: disk-tier cache reads run on a worker thread"""
+        state = self._start_generation(json_data_str, user_instructions, temperature, parsed_data,
+                                       data_format, render_mode, cache_key)
+        if 'rendered' in state:
+            return state
+        if self.cache is not None:
+            lookup_start = time.time()
+            if self._use_cached(state, await self.cache.aget(self._cache_key(state)), lookup_start):
+                return state
+        if self.layouts is not None:
+            layout_start = time.time()
+            if self._use_layout(state, await self.layouts.aget(self._layout_key(state)), layout_start):
+                return state
+        self._build_prompt(state)
+        return state
+    
+    def _start_generation(self, json_data_str: str, user_instructions: str, temperature: float = None,
+                          parsed_data: Any = None, data_format: str = None,
+                          render_mode: str = None, cache_key: str = None) -> dict:
+        """
+        Parse the JSON (step 1) and try the template fast path
+        
+        Returns:
+            Generation state (see _prepare_generation); with a 'rendered' entry
+            when a template produced the page
+        """
+        if json_data_str is not None:
+            metrics.PAYLOAD_CHARS.observe(len(json_data_str))
+        
+        # Step 1: Parse JSON (skipped when the request model already did it)
+        parse_start = time.time()
+        if parsed_data is None:
+            logger.info("🔍 Step 1: Parsing JSON data (%s)...", json_backend.BACKEND)
+            json_data = json_backend.loads(json_data_str)
+            parse_time = time.time() - parse_start
+            logger.info("✅ JSON parsed successfully in %.2fms", parse_time*1000)
+        else:
+            logger.info("🔍 Step 1: Using JSON parsed during request validation")
+            json_data = parsed_data
+            parse_time = time.time() - parse_start
+        if isinstance(json_data, dict):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"   Data keys: {list(json_data.keys())}")
+        
+        temp = temperature if temperature is not None else settings.TEMPERATURE
+        
+        # Template fast path: known data shapes are rendered locally, without the LLM
+        render_mode = render_mode or settings.RENDER_MODE
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {render_mode}. Use one of: {', '.join(RENDER_MODES)}")
+        if render_mode != 'llm':
+            render_start = time.time()
+            html_content = render_dashboard(json_data, user_instructions)
+            render_time = time.time() - render_start
+            if html_content is not None:
+                return {
+                    'rendered': html_content,
+                    'temperature': temp,
+                    'parse_time': parse_time,
+                    'render_time': render_time,
+                }
+            if render_mode == 'template':
+                raise TemplateNotApplicableError(
+                    "No template matches this data shape; use render_mode 'auto' or 'llm'"
+                )
+            logger.info("🧩 No template for this data shape, using the LLM")
+        
+        return {
+            'json_data': json_data,  # dropped once the prompt is built
+            'data_format': data_format,
+            'temperature': temp,
+            'pooled': temperature is not None,
+            'chain': None,  # set by _select_chain / _aselect_chain (step 4)
+            'cache_key': cache_key,
+            'cache_lookup_time': 0.0,
+            'layout_key': None,
+            'layout_values': None,
+            'user_instructions': user_instructions,
+            'parse_time': parse_time,
+            'prompt_time': 0.0,
+            'chain_time': 0.0,
+            'queue_time': 0.0,
+            'llm_time': 0.0,
+            'continuations': 0,
+            'continuation_prompt_tokens': 0,
+            'finish_reason': None,
+            'usage': [],  # usage_metadata of each finished LLM call (None where the API sent none)
+        }
+    
+    def _cache_key(self, state: dict) -> str:
+        """Response cache key of the request, computed unless _request_key already did"""
+        if state['cache_key'] is None:
+            state['cache_key'] = make_cache_key(state['json_data'], state['user_instructions'], self.model,
+                                                state['temperature'], self.prompt_variant,
+                                                state['data_format'] or settings.PROMPT_DATA_FORMAT)
+        return state['cache_key']
+    
+    def _use_cached(self, state: dict, cached: Optional[dict], lookup_start: float) -> bool:
+        """Record a response cache lookup; on a hit the result goes into state['cached']"""
+        state['cache_lookup_time'] = time.time() - lookup_start
+        metrics.CACHE_LOOKUPS.inc(result='hit' if cached is not None else 'miss')
+        if cached is None:
+            logger.info("🗄️  Cache miss (%.2fms)", state['cache_lookup_time']*1000)
+            return False
+        state['cached'] = cached
+        return True
+    
+    def _layout_key(self, state: dict) -> str:
+        """Layout cache key (schema fingerprint and prompt); the payload's values go into state"""
+        fingerprint, state['layout_values'] = describe(state['json_data'])
+        state['layout_key'] = make_layout_key(fingerprint, state['user_instructions'], self.model,
+                                              state['temperature'], self.prompt_variant)
+        return state['layout_key']
+    
+    def _use_layout(self, state: dict, layout: Optional[dict], layout_start: float) -> bool:
+        """
+        Refill a cached layout with the payload's values (same schema and prompt as an earlier generation)
+        
+        Returns:
+            True if the page was rebuilt (it is in state['reused'])
+        """
+        html_content = fill_layout(layout, state['layout_values']) if layout is not None else None
+        state['layout_time'] = time.time() - layout_start
+        if layout is None:
+            metrics.LAYOUT_LOOKUPS.inc(result='miss')
+        elif html_content is None:
+            metrics.LAYOUT_LOOKUPS.inc(result='ambiguous')
+            logger.info("🧱 Cached layout cannot hold the new values unambiguously, regenerating")
+        else:
+            metrics.LAYOUT_LOOKUPS.inc(result='hit')
+            state['reused'] = html_content
+            return True
+        return False
+    
+    def _build_prompt(self, state: dict) -> None:
+        """
+        Run steps 2-3 of the pipeline: build the user prompt and check it fits the context window
+        
+        Raises:
+            PromptTooLargeError: If the prompt leaves no room for MAX_TOKENS of output
+        """
+        logger.info("📝 Step 2: Building user prompt...")
+        prompt_start = time.time()
+        user_prompt = build_user_prompt(state.pop('json_data'), state['user_instructions'],
+                                        data_format=state['data_format'])
+        prompt_tokens = self._system_prompt_tokens() + count_tokens(user_prompt)
+        prompt_time = time.time() - prompt_start
+        prompt_length = len(user_prompt)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"✅ Prompt built in {prompt_time*1000:.2f}ms ({prompt_length} chars, {prompt_tokens:,} tokens)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"   Prompt preview: {user_prompt[:200]}...")
+        
+        # Reject before any network call if the completion cannot fit
+        if prompt_tokens + settings.MAX_TOKENS > settings.MODEL_CONTEXT_WINDOW:
+            raise PromptTooLargeError(
+                f"Prompt is {prompt_tokens:,} tokens; with {settings.MAX_TOKENS:,} output tokens it exceeds "
+                f"the {settings.MODEL_CONTEXT_WINDOW:,}-token context window of {self.model}"
+            )
+        
+        # Step 3: Configure temperature
+        logger.info("🌡️  Step 3: Temperature set to %s", state['temperature'])
+        
+        state['user_prompt'] = user_prompt
+        state['prompt_tokens'] = prompt_tokens
+        state['prompt_time'] = prompt_time
+    
+    def _select_chain(self, state: dict) -> None:
+        """
+        Run step 4 of the pipeline: select the chain, building the LangChain stack on first use
+        
+        Args:
+            state: dict returned by _prepare_generation; 'chain' and 'chain_time' are filled in
+        """
+        logger.info("🔗 Step 4: Preparing LangChain...")
+        chain_start = time.time()
+        if state['pooled']:
+            chain, reused = self.chain_pool.get(self.model, state['temperature'])
+            logger.debug("   %s chain for temp=%s", 'Reusing pooled' if reused else 'Created', state['temperature'])
+        else:
+            logger.debug("   Using default chain")
+            chain = self.chain
+        state['chain'] = chain
+        state['chain_time'] = time.time() - chain_start
+        logger.info("✅ Chain ready in %.2fms", state['chain_time']*1000)
+    
+    async def _aselect_chain(self, state: dict) -> None:
+        """
+        Async variant of _select_chain that keeps LangChain setup off the event loop
+        
+        Building the stack (importing LangChain, or waiting on _llm_stack_lock
+        while warm_up does it) and building a chain for a new pool key both
+        run on a worker thread; a ready chain is picked up inline.
+        """
+        if self.llm_ready() and (not state['pooled'] or self.chain_pool.contains(self.model, state['temperature'])):
+            self._select_chain(state)
+        else:
+            await asyncio.to_thread(self._select_chain, state)
+    
+    def _finalize_generation(self, state: dict, response: str, start_time: float,
+                             background_store: bool = False) -> dict:
+        """
+        Run steps 6-8 of the pipeline: extract, validate and measure the HTML
+        
+        Args:
+            state: dict returned by _prepare_generation, with 'llm_time' filled in
+            response: Raw content from LLM
+            start_time: time.time() at the start of the generation
+            background_store: Write the result to the disk cache tier without
+                waiting for it (when called on the event loop)
+            
+        Returns:
+            dict with 'html', 'tokens_used', 'model', 'temperature' and 'latency' keys
+        """
+        temp = state['temperature']
+        parse_time = state['parse_time']
+        prompt_time = state['prompt_time']
+        chain_time = state['chain_time']
+        queue_time = state['queue_time']
+        llm_time = state['llm_time']
+        
+        response_length = len(response)
+        logger.info("✅ LLM response received in %.2fms (%s chars)", llm_time*1000, response_length)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"   Response preview: {response[:200]}...")
+        
+        # Step 6: Extract HTML
+        logger.info("🔧 Step 6: Extracting and cleaning HTML...")
+        extract_start = time.time()
+        html_content, complete = extract_html(response)
+        truncated = cut_off(state['finish_reason'], complete)
+        extract_time = time.time() - extract_start
+        logger.info("✅ HTML extracted in %.2fms", extract_time*1000)
+        if truncated:
+            self._record_truncation(len(html_content))
+        
+        # Step 7: Validate HTML (only the first DOCTYPE_WINDOW characters are inspected)
+        logger.info("✔️  Step 7: Validating HTML...")
+        validate_start = time.time()
+        if needs_doctype(html_content):
+            if '<' in html_content and '>' in html_content:
+                logger.warning("⚠️  DOCTYPE missing, adding it...")
+                html_content = DOCTYPE + html_content
+            else:
+                raise ValueError("Generated content is not valid HTML")
+        validate_time = time.time() - validate_start
+        logger.info("✅ HTML validated in %.2fms", validate_time*1000)
+        
+        # Step 8: Calculate metrics
+        logger.info("📊 Step 8: Calculating metrics...")
+        prompt_tokens, completion_tokens, tokenizer, estimated = self._token_counts(state, response)
+        tokens_used = prompt_tokens + completion_tokens
+        
+        # Total time
+        total_time = time.time() - start_time
+        self._record_generation(state, total_time, html_content, completion_tokens,
+                                extract=extract_time, validate=validate_time)
+        
+        # Summary
+        if logger.isEnabledFor(logging.INFO):
             logger.info("=" * 60)
             logger.info("🎉 DASHBOARD GENERATION COMPLETE")
             logger.info("=" * 60)
@@ -141,76 +1431,94 @@ class LLMService:
             logger.info(f"   ├─ JSON Parsing: {parse_time*1000:.2f}ms")
             logger.info(f"   ├─ Prompt Building: {prompt_time*1000:.2f}ms")
             logger.info(f"   ├─ Chain Setup: {chain_time*1000:.2f}ms")
+            logger.info(f"   ├─ Concurrency Wait: {queue_time*1000:.2f}ms")
             logger.info(f"   ├─ LLM API Call: {llm_time*1000:.2f}ms ({(llm_time/total_time)*100:.1f}%)")
             logger.info(f"   ├─ HTML Extraction: {extract_time*1000:.2f}ms")
             logger.info(f"   └─ HTML Validation: {validate_time*1000:.2f}ms")
-            logger.info(f"📈 Tokens: ~{tokens_used:,} tokens")
+            logger.info(f"📈 Tokens: {tokens_used:,} ({prompt_tokens:,} prompt + {completion_tokens:,} completion, {tokenizer})")
             logger.info(f"📄 Output Size: {len(html_content):,} chars")
             logger.info(f"🌡️  Temperature: {temp}")
             logger.info(f"🤖 Model: {self.model}")
             logger.info("=" * 60)
-            
-            return {
-                'html': html_content,
-                'tokens_used': tokens_used,
-                'model': self.model,
-                'temperature': temp,
-                'latency': {
-                    'total_ms': round(total_time * 1000, 2),
-                    'parse_ms': round(parse_time * 1000, 2),
-                    'prompt_ms': round(prompt_time * 1000, 2),
-                    'chain_ms': round(chain_time * 1000, 2),
-                    'llm_ms': round(llm_time * 1000, 2),
-                    'extract_ms': round(extract_time * 1000, 2),
-                    'validate_ms': round(validate_time * 1000, 2),
-                }
+        
+        result = {
+            'html': html_content,
+            'tokens_used': tokens_used,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokenizer': tokenizer,
+            'tokens_estimated': estimated,
+            'model': self.model,
+            'renderer': 'llm',
+            'temperature': temp,
+            'truncated': truncated,
+            'continuations': state['continuations'],
+        }
+        self._cache_store(state, result, background=background_store)
+        
+        result = {
+            **result,
+            'cache_hit': False,
+            'latency': {
+                'total_ms': round(total_time * 1000, 2),
+                'parse_ms': round(parse_time * 1000, 2),
+                'cache_lookup_ms': round(state['cache_lookup_time'] * 1000, 2),
+                'prompt_ms': round(prompt_time * 1000, 2),
+                'chain_ms': round(chain_time * 1000, 2),
+                'queue_ms': round(queue_time * 1000, 2),
+                'llm_ms': round(llm_time * 1000, 2),
+                'extract_ms': round(extract_time * 1000, 2),
+                'validate_ms': round(validate_time * 1000, 2),
             }
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ JSON Parse Error: {str(e)}")
-            raise ValueError(f"Invalid JSON data: {str(e)}")
-        except Exception as e:
-            logger.error(f"❌ Generation Error: {str(e)}")
-            logger.exception("Full traceback:")
-            raise Exception(f"Error generating dashboard: {str(e)}")
+        }
+        log_request('generated', result)
+        return result
     
-    def _extract_html(self, content: str) -> str:
+    def _token_counts(self, state: dict, output: str) -> tuple:
         """
-        Extract HTML from response, removing markdown code blocks if present
+        Prompt and completion tokens of a generation
+        
+        The API's usage_metadata is used when every LLM call of the generation
+        reported it (a stream closed early never gets its final chunk); otherwise
+        both are counted locally.
         
         Args:
-            content: Raw content from LLM
+            state: dict returned by _prepare_generation, after the LLM calls
+            output: LLM output to count locally if needed
             
         Returns:
-            Clean HTML string
+            (prompt_tokens, completion_tokens, tokenizer, estimated): tokenizer is
+            'api' or the local tokenizer's name, and estimated is True when the
+            counts come from the heuristic tokenizer
         """
-        # Remove markdown code blocks if present
-        # Pattern: ```html ... ``` or ``` ... ```
-        pattern = r'```(?:html)?\s*(.*?)\s*```'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if match:
-            return match.group(1).strip()
-        
-        # If no code blocks found, return as is
-        return content.strip()
+        usage = state['usage']
+        if usage and all(usage):
+            return (sum(call.get('input_tokens', 0) for call in usage),
+                    sum(call.get('output_tokens', 0) for call in usage), 'api', False)
+        return (state['prompt_tokens'] + state['continuation_prompt_tokens'], self._estimate_tokens(output),
+                tokenizer_name(), tokens_estimated())
     
     def _estimate_tokens(self, text: str) -> int:
         """
-        Rough estimation of tokens (4 chars ≈ 1 token)
-        For accurate tracking, use LangChain callbacks
+        Count tokens with the local tokenizer (see app.tokenizer)
         
         Args:
-            text: Text to estimate tokens for
+            text: Text to count tokens for
             
         Returns:
-            Estimated token count
+            Token count
         """
-        return len(text) // 4
+        return count_tokens(text)
+    
+    def _system_prompt_tokens(self) -> int:
+        """Token count of the static system prompt (computed once)"""
+        if self._system_tokens is None:
+            self._system_tokens = count_tokens(self.system_prompt)
+        return self._system_tokens
     
     def test_connection(self) -> bool:
         """
-        Test connection to Groq API using LangChain
+        Test connection to the LLM backend using LangChain
         
         Returns:
             bool: True if connection successful
@@ -0,0 +1,118 @@
+"""Logging setup: verbose step-by-step output or one structured record per request"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional, TextIO
+
+from app import json_backend
+from app.config import settings
+
+# Supported values for settings.LOG_MODE
+LOG_MODES = ("verbose", "structured")
+
+# Carries the one-per-request records of structured mode
+request_logger = logging.getLogger("app.requests")
+
+_handler = None
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as single-line JSON, merging in the record's `fields`"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json_backend.dumps(entry)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves all formatting to the listener thread
+    
+    The stock prepare() formats the message in the caller's thread. Log
+    arguments here are plain numbers and strings, so the record can be
+    handed over as-is and the request path only pays for a queue put.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(mode: Optional[str] = None, stream: Optional[TextIO] = None) -> None:
+    """
+    Install the root handler for the given mode (safe to call again to switch)
+    
+    verbose: the step-by-step INFO lines, written synchronously (the old behaviour).
+    structured: app.* INFO lines are disabled; each request emits one JSON
+    record with all stage timings via app.requests. Records go through a
+    queue and are written by a background thread.
+    
+    Args:
+        mode: 'verbose' or 'structured'; defaults to settings.LOG_MODE
+        stream: Output stream; defaults to stderr
+    """
+    global _handler, _listener
+    mode = mode or settings.LOG_MODE
+    if mode not in LOG_MODES:
+        raise ValueError(f"Unknown log mode: {mode}. Use one of: {', '.join(LOG_MODES)}")
+    
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    
+    output = logging.StreamHandler(stream or sys.stderr)
+    if mode == "structured":
+        output.setFormatter(StructuredFormatter())
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+        _handler = _DeferredQueueHandler(records)
+        logging.getLogger("app").setLevel(logging.WARNING)
+        request_logger.setLevel(logging.INFO)
+    else:
+        output.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        _handler = output
+        logging.getLogger("app").setLevel(logging.NOTSET)
+        request_logger.setLevel(logging.WARNING)
+    
+    root.addHandler(_handler)
+    root.setLevel(logging.INFO)
+
+
+def log_request(outcome: str, result: dict) -> None:
+    """
+    Emit the structured per-request record (no-op outside structured mode)
+    
+    Args:
+        outcome: 'generated', 'streamed', 'cache_hit', 'coalesced', 'template' or 'layout'
+        result: Generation result dict; everything except the HTML is logged
+    """
+    if not request_logger.isEnabledFor(logging.INFO):
+        return
+    fields = {key: value for key, value in result.items() if key != 'html'}
+    fields['outcome'] = outcome
+    fields['html_chars'] = len(result.get('html', ''))
+    request_logger.info("dashboard_request", extra={"fields": fields})
+
+
+def _stop_listener() -> None:
+    """Flush queued records at interpreter exit"""
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
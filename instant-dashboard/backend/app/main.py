@@ -1,13 +1,26 @@
 """FastAPI application for The Instant Dashboard"""
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import math
+from typing import AsyncIterator, Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from app.compression import CompressionMiddleware
 from app.config import settings
-from app.models import DashboardRequest, DashboardResponse, HealthResponse
-from app.llm_service import llm_service
+from app.logging_config import configure_logging
+from app.metrics import REGISTRY, PAYLOAD_CHARS
+from app.json_stream import parse_upload, UploadTooLargeError
+from pydantic import ValidationError
+from app.models import (
+    DashboardRequest, DashboardResponse, HealthResponse, UploadOptions,
+    BatchDashboardRequest, BatchDashboardResponse, BatchItemResult
+)
+from app.llm_service import llm_service, PromptTooLargeError, rate_limit_delay
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (LOG_MODE: verbose or structured)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -24,18 +37,150 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "ETag"],
 )
 
+# Compress responses (brotli when installed, else gzip) for clients that accept it
+if settings.COMPRESSION_MIN_BYTES > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
+    )
+
+# Read size for multipart file parts
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def _result_metadata(result: dict) -> dict:
+    """Response metadata for a generation result"""
+    return {
+        'model': result['model'],
+        'tokens_used': result['tokens_used'],
+        'prompt_tokens': result.get('prompt_tokens'),
+        'completion_tokens': result.get('completion_tokens'),
+        'tokenizer': result.get('tokenizer'),
+        'tokens_estimated': result.get('tokens_estimated', False),
+        'temperature': result.get('temperature'),
+        'renderer': result.get('renderer', 'llm'),
+        'truncated': result.get('truncated', False),
+        'continuations': result.get('continuations', 0),
+        'cache_hit': result.get('cache_hit', False),
+        'coalesced': result.get('coalesced', False),
+        'coalesced_requests': result.get('coalesced_requests', 1),
+        'etag': _etag(result['html'], "json"),
+        'latency': result.get('latency', {}),
+    }
+
+def _etag(html: str, response_format: str) -> str:
+    """
+    ETag of a dashboard response: a hash of its HTML, whichever way it was produced
+    
+    Only the raw page (format=html) gets a strong ETag. The JSON envelope
+    carries a weak one with a -json suffix: its bytes also change with the
+    latency and cache metadata, and it must not validate the raw page or
+    the other way round.
+    
+    Args:
+        html: Dashboard HTML
+        response_format: 'json' or 'html'
+    
+    Returns:
+        Quoted ETag, W/-prefixed for 'json'
+    """
+    digest = hashlib.sha256(html.encode()).hexdigest()[:32]
+    if response_format == "html":
+        return f'"{digest}"'
+    return f'W/"{digest}-json"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header lists etag (weak comparison, so compressed copies match)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def _dashboard_response(result: dict, metadata: dict, response_format: str, if_none_match: Optional[str]) -> Response:
+    """
+    Response for a generated dashboard
+    
+    The ETag is a hash of the HTML (see _etag), so a client that sends it
+    back in If-None-Match gets an empty 304 when the new dashboard is
+    identical to the one it already shows (the generation still ran; the
+    download is what is saved).
+    
+    Args:
+        result: Generation result with 'html'
+        metadata: Response metadata (see _result_metadata)
+        response_format: 'json' for the DashboardResponse envelope, 'html' for the raw page
+            with the scalar metadata in X-Dashboard-* headers
+        if_none_match: If-None-Match request header
+    
+    Returns:
+        304, text/html or application/json response carrying the ETag
+    """
+    etag = _etag(result['html'], "html") if response_format == "html" else metadata['etag']
+    headers = {"ETag": etag}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if response_format == "html":
+        for key, value in metadata.items():
+            if isinstance(value, (str, int, float)) and key != 'etag':
+                name = "-".join(part.capitalize() for part in key.split("_"))
+                headers[f"X-Dashboard-{name}"] = str(value).lower() if isinstance(value, bool) else str(value)
+        return Response(result['html'], media_type="text/html; charset=utf-8", headers=headers)
+    # Serialized by pydantic-core directly, skipping FastAPI's jsonable_encoder pass
+    body = DashboardResponse(success=True, html_content=result['html'], error=None, metadata=metadata)
+    return Response(body.model_dump_json(), media_type="application/json", headers=headers)
+
+def _error_status(error: Exception) -> int:
+    """HTTP status matching how /generate-dashboard reports an error"""
+    if isinstance(error, ValidationError):
+        return 422
+    if isinstance(error, PromptTooLargeError):
+        return 413
+    if isinstance(error, ValueError):
+        return 400
+    if rate_limit_delay(error) is not None:
+        return 429
+    return 500
+
+def _too_many_requests(error: Exception) -> Optional[HTTPException]:
+    """429 with a Retry-After header if error is a Groq rate limit or a full LLM queue, else None"""
+    delay = rate_limit_delay(error)
+    if delay is None:
+        return None
+    retry_after = max(1, math.ceil(delay))
+    logger.warning("🚦 RATE LIMITED: %s (Retry-After: %ss)", error, retry_after)
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(retry_after)})
+
+async def _upload_chunks(upload) -> AsyncIterator[bytes]:
+    """Chunks of a multipart `file` field (an UploadFile, or text if sent as a plain field)"""
+    if isinstance(upload, str):
+        yield upload.encode("utf-8")
+        return
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
 @app.on_event("startup")
 async def startup_event():
-    """Validate configuration on startup"""
+    """Validate configuration on startup and warm up the LLM stack in the background"""
     try:
         settings.validate()
         logger.info("✅ Configuration validated successfully")
-        logger.info(f"✅ Using model: {settings.GROQ_MODEL}")
+        logger.info("✅ Using model: %s (%s backend)", settings.GROQ_MODEL, llm_service.backend.name)
     except ValueError as e:
         logger.error(f"❌ Configuration error: {str(e)}")
         raise
+    
+    if settings.LLM_WARMUP:
+        # LangChain is imported off the event loop; / and /health answer meanwhile
+        asyncio.get_running_loop().run_in_executor(None, llm_service.warm_up)
 
 @app.get("/", tags=["Root"])
 async def root():
@@ -50,23 +195,43 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     groq_configured = bool(settings.GROQ_API_KEY)
+    # The fake backend needs no key
+    ready = llm_service.backend.configured()
     
     return HealthResponse(
-        status="healthy" if groq_configured else "unhealthy",
-        message="API is running" if groq_configured else "Groq API key not configured",
-        groq_configured=groq_configured
+        status="healthy" if ready else "unhealthy",
+        message="API is running" if ready else "Groq API key not configured",
+        groq_configured=groq_configured,
+        backend=llm_service.backend.name,
+        llm_ready=llm_service.llm_ready()
     )
 
+@app.get("/stats", tags=["Health"])
+async def stats():
+    """Response cache, chain pool and request coalescing counters"""
+    return llm_service.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """Stage latencies, tokens, sizes, errors and gauges in Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/generate-dashboard", response_model=DashboardResponse, tags=["Dashboard"])
-async def generate_dashboard(request: DashboardRequest):
+async def generate_dashboard(
+    request: DashboardRequest,
+    response_format: str = Query(default="json", alias="format", pattern="^(json|html)$", description="'json' for the DashboardResponse envelope, 'html' for the raw text/html page"),
+    if_none_match: Optional[str] = Header(default=None, description="ETag of the dashboard the client has; an identical result is answered with 304")
+):
     """
     Generate a dashboard from JSON data and user instructions
     
     Args:
         request: DashboardRequest with json_data, user_prompt, and optional temperature
+        response_format: 'json' (DashboardResponse) or 'html' (raw page, metadata in X-Dashboard-* headers)
+        if_none_match: ETag from an earlier response
         
     Returns:
-        DashboardResponse with generated HTML or error
+        DashboardResponse with generated HTML or error, the raw HTML, or 304 Not Modified
     """
     import time
     
@@ -76,40 +241,36 @@ async def generate_dashboard(request: DashboardRequest):
         logger.info("=" * 60)
         logger.info("📊 NEW DASHBOARD GENERATION REQUEST")
         logger.info("=" * 60)
-        logger.info(f"📝 User prompt: {request.user_prompt[:100]}...")
+        logger.info("📝 User prompt: %s...", request.user_prompt[:100])
         if request.temperature is not None:
-            logger.info(f"🌡️  Custom temperature: {request.temperature}")
-        logger.info(f"📦 JSON data size: {len(request.json_data)} chars")
+            logger.info("🌡️  Custom temperature: %s", request.temperature)
+        logger.info("📦 JSON data size: %s chars", len(request.json_data))
         logger.info("-" * 60)
         
-        # Generate dashboard using LLM
-        result = llm_service.generate_dashboard(
+        # Generate dashboard using LLM (non-blocking)
+        result = await llm_service.agenerate_dashboard(
             json_data_str=request.json_data,
             user_instructions=request.user_prompt,
-            temperature=request.temperature
+            temperature=request.temperature,
+            parsed_data=request.parsed_data,
+            data_format=request.data_format,
+            render_mode=request.render_mode
         )
         
         request_time = time.time() - request_start
         
-        logger.info("=" * 60)
-        logger.info("✅ REQUEST COMPLETED SUCCESSFULLY")
-        logger.info(f"⏱️  Total Request Time: {request_time*1000:.2f}ms ({request_time:.2f}s)")
-        logger.info(f"📊 Tokens Used: ~{result['tokens_used']:,}")
-        logger.info("=" * 60)
-        logger.info("")  # Empty line for readability
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("=" * 60)
+            logger.info("✅ REQUEST COMPLETED SUCCESSFULLY")
+            logger.info(f"⏱️  Total Request Time: {request_time*1000:.2f}ms ({request_time:.2f}s)")
+            logger.info(f"📊 Tokens Used: ~{result['tokens_used']:,}")
+            logger.info("=" * 60)
+            logger.info("")  # Empty line for readability
         
-        return DashboardResponse(
-            success=True,
-            html_content=result['html'],
-            error=None,
-            metadata={
-                'model': result['model'],
-                'tokens_used': result['tokens_used'],
-                'temperature': result.get('temperature'),
-                'latency': result.get('latency', {}),
-                'total_request_time_ms': round(request_time * 1000, 2)
-            }
-        )
+    except PromptTooLargeError as e:
+        # Prompt cannot fit the context window; rejected before calling the LLM
+        logger.error(f"❌ PROMPT TOO LARGE: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
         
     except ValueError as e:
         # Validation errors (invalid JSON, etc.)
@@ -121,6 +282,10 @@ async def generate_dashboard(request: DashboardRequest):
         raise HTTPException(status_code=400, detail=str(e))
         
     except Exception as e:
+        rate_limited = _too_many_requests(e)
+        if rate_limited is not None:
+            raise rate_limited
+        
         # Other errors
         logger.error("=" * 60)
         logger.error("❌ GENERATION ERROR")
@@ -132,12 +297,315 @@ async def generate_dashboard(request: DashboardRequest):
             status_code=500,
             detail=f"Error generating dashboard: {str(e)}"
         )
+    
+    # Outside the try: a bug building the response is not a generation error
+    return _dashboard_response(result, {
+        **_result_metadata(result),
+        'total_request_time_ms': round(request_time * 1000, 2)
+    }, response_format, if_none_match)
+
+@app.post("/generate-dashboard/stream", tags=["Dashboard"])
+async def generate_dashboard_stream(
+    request: DashboardRequest,
+    stream_format: str = Query(default="html", alias="format", pattern="^(html|sse)$", description="'html' for a chunked text/html body, 'sse' for Server-Sent Events")
+):
+    """
+    Stream a dashboard as it is generated
+    
+    Args:
+        request: DashboardRequest with json_data, user_prompt, and optional temperature
+        stream_format: 'html' (chunked HTML body) or 'sse' (text/event-stream)
+        
+    Returns:
+        StreamingResponse with HTML chunks as they arrive from the LLM
+    """
+    import time
+    
+    request_start = time.time()
+    
+    logger.info("=" * 60)
+    logger.info("📡 NEW STREAMING DASHBOARD REQUEST")
+    logger.info("=" * 60)
+    logger.info("📝 User prompt: %s...", request.user_prompt[:100])
+    logger.info("📦 JSON data size: %s chars", len(request.json_data))
+    
+    chunks = llm_service.astream_dashboard(
+        json_data_str=request.json_data,
+        user_instructions=request.user_prompt,
+        temperature=request.temperature,
+        parsed_data=request.parsed_data,
+        data_format=request.data_format,
+        render_mode=request.render_mode
+    )
+    
+    # Pull the first chunk before committing to a 200 so that bad input
+    # and upstream failures still surface as proper HTTP errors
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = ""
+    except PromptTooLargeError as e:
+        logger.error(f"❌ PROMPT TOO LARGE: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        logger.error(f"❌ VALIDATION ERROR: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        rate_limited = _too_many_requests(e)
+        if rate_limited is not None:
+            raise rate_limited
+        logger.error(f"❌ GENERATION ERROR: {str(e)}")
+        logger.exception("Full traceback:")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating dashboard: {str(e)}"
+        )
+    
+    ttfb_ms = round((time.time() - request_start) * 1000, 2)
+    logger.info("⚡ Time to first byte: %sms", ttfb_ms)
+    
+    async def body():
+        try:
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; end the document with a marker
+            logger.error(f"❌ STREAM ERROR: {str(e)}")
+            logger.exception("Full traceback:")
+            yield f"\n<!-- Error generating dashboard: {str(e)} -->\n"
+    
+    async def sse_body():
+        async for chunk in body():
+            yield "".join(f"data: {line}\n" for line in chunk.split("\n")) + "\n"
+        yield "event: done\ndata: \n\n"
+    
+    headers = {"X-Time-To-First-Byte-Ms": str(ttfb_ms), "Cache-Control": "no-cache"}
+    if stream_format == "sse":
+        return StreamingResponse(sse_body(), media_type="text/event-stream", headers=headers)
+    return StreamingResponse(body(), media_type="text/html; charset=utf-8", headers=headers)
+
+@app.post("/generate-dashboard/upload", response_model=DashboardResponse, tags=["Dashboard"])
+async def generate_dashboard_upload(
+    request: Request,
+    response_format: str = Query(default="json", alias="format", pattern="^(json|html)$", description="'json' for the DashboardResponse envelope, 'html' for the raw text/html page")
+):
+    """
+    Generate a dashboard from an uploaded JSON file
+    
+    The body is either the JSON document itself or a multipart/form-data
+    form with the document in a `file` field. Options (user_prompt,
+    temperature, data_format, render_mode) come from the query string;
+    form fields of the same name override them. Bodies over
+    UPLOAD_STREAM_THRESHOLD are parsed as they arrive, profiling large
+    arrays on the fly, so memory does not grow with the size of the upload.
+    
+    Args:
+        request: Incoming request; the body is read as a stream
+        response_format: 'json' (DashboardResponse) or 'html' (raw page); If-None-Match works as in /generate-dashboard
+        
+    Returns:
+        DashboardResponse; metadata.upload has bytes, ingest_ms, streamed and profiled_arrays
+    """
+    import time
+    
+    request_start = time.time()
+    
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload is larger than the {settings.UPLOAD_MAX_BYTES:,}-byte limit"
+        )
+    
+    limits = {
+        'max_bytes': settings.UPLOAD_MAX_BYTES,
+        'stream_threshold': settings.UPLOAD_STREAM_THRESHOLD,
+        'array_threshold': settings.PROFILE_ARRAY_THRESHOLD,
+        'sample_rows': settings.PROFILE_SAMPLE_ROWS,
+        'top_k': settings.PROFILE_TOP_K,
+    }
+    fields = dict(request.query_params)
+    
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            # File parts are spooled to disk by the form parser, not kept in memory
+            async with request.form() as form:
+                fields.update({name: value for name, value in form.items()
+                               if name in UploadOptions.model_fields})
+                options = UploadOptions.model_validate(fields)
+                upload = form.get("file")
+                if upload is None:
+                    raise HTTPException(status_code=422, detail="Multipart upload needs a 'file' field")
+                data, upload_info = await parse_upload(_upload_chunks(upload), **limits)
+        else:
+            # Validate the options before reading a possibly huge body
+            options = UploadOptions.model_validate(fields)
+            data, upload_info = await parse_upload(request.stream(), **limits)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid upload options: {str(e)}")
+    except UploadTooLargeError as e:
+        logger.error(f"❌ UPLOAD TOO LARGE: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        logger.error(f"❌ VALIDATION ERROR: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    PAYLOAD_CHARS.observe(upload_info['bytes'])
+    
+    logger.info("=" * 60)
+    logger.info("📤 NEW UPLOAD DASHBOARD REQUEST")
+    logger.info("=" * 60)
+    logger.info("📝 User prompt: %s...", options.user_prompt[:100])
+    logger.info("📦 Upload: %s bytes in %sms (%s, %s arrays profiled)", upload_info['bytes'],
+                upload_info['ingest_ms'], 'streamed' if upload_info['streamed'] else 'buffered',
+                upload_info['profiled_arrays'])
+    logger.info("-" * 60)
+    
+    try:
+        result = await llm_service.agenerate_dashboard(
+            json_data_str=None,
+            user_instructions=options.user_prompt,
+            temperature=options.temperature,
+            parsed_data=data,
+            data_format=options.data_format,
+            render_mode=options.render_mode
+        )
+    except PromptTooLargeError as e:
+        logger.error(f"❌ PROMPT TOO LARGE: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        logger.error(f"❌ VALIDATION ERROR: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        rate_limited = _too_many_requests(e)
+        if rate_limited is not None:
+            raise rate_limited
+        logger.error(f"❌ GENERATION ERROR: {str(e)}")
+        logger.exception("Full traceback:")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating dashboard: {str(e)}"
+        )
+    
+    request_time = time.time() - request_start
+    logger.info("✅ UPLOAD REQUEST COMPLETED in %.2fms", request_time*1000)
+    
+    return _dashboard_response(result, {
+        **_result_metadata(result),
+        'upload': upload_info,
+        'total_request_time_ms': round(request_time * 1000, 2)
+    }, response_format, request.headers.get("if-none-match"))
+
+@app.post("/generate-dashboards/batch", response_model=BatchDashboardResponse, tags=["Dashboard"])
+async def generate_dashboards_batch(request: BatchDashboardRequest):
+    """
+    Generate several dashboards in one call with bounded parallelism
+    
+    Identical items are generated once. Each item succeeds or fails on its
+    own; the HTTP status is 200 as long as the batch itself is valid.
+    
+    Args:
+        request: BatchDashboardRequest with items and optional max_concurrency
+    
+    Returns:
+        BatchDashboardResponse with one result per item, in input order
+    """
+    import time
+    
+    request_start = time.time()
+    
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(request.items)} items; the limit is {settings.BATCH_MAX_ITEMS}"
+        )
+    
+    logger.info("=" * 60)
+    logger.info("📚 NEW BATCH REQUEST (%s items)", len(request.items))
+    logger.info("=" * 60)
+    
+    # Validate items one by one so a bad item does not reject the whole batch
+    results = [None] * len(request.items)
+    jobs = []
+    for index, item in enumerate(request.items):
+        try:
+            item_request = DashboardRequest.model_validate(item)
+        except ValidationError as e:
+            results[index] = BatchItemResult(index=index, success=False, status_code=422,
+                                             error=f"Invalid item: {str(e)}")
+            continue
+        jobs.append((index, {
+            'json_data_str': item_request.json_data,
+            'user_instructions': item_request.user_prompt,
+            'temperature': item_request.temperature,
+            'parsed_data': item_request.parsed_data,
+            'data_format': item_request.data_format,
+            'render_mode': item_request.render_mode,
+        }))
+    
+    max_concurrency = request.max_concurrency or settings.BATCH_MAX_CONCURRENCY
+    outcomes = await llm_service.agenerate_batch([job for _, job in jobs], max_concurrency=max_concurrency)
+    
+    # Map job positions back to item indices (duplicate_of refers to jobs)
+    for (index, _), outcome in zip(jobs, outcomes):
+        duplicate_of = outcome['duplicate_of']
+        if duplicate_of is not None:
+            duplicate_of = jobs[duplicate_of][0]
+        if outcome['success']:
+            result = outcome['result']
+            results[index] = BatchItemResult(
+                index=index, success=True, status_code=200, html_content=result['html'],
+                duplicate_of=duplicate_of,
+                metadata={**_result_metadata(result), 'attempts': outcome['attempts']}
+            )
+        else:
+            results[index] = BatchItemResult(
+                index=index, success=False, status_code=_error_status(outcome['error']),
+                error=str(outcome['error']), duplicate_of=duplicate_of,
+                metadata={'attempts': outcome['attempts']}
+            )
+    
+    request_time = time.time() - request_start
+    succeeded = sum(1 for result in results if result.success)
+    
+    logger.info("=" * 60)
+    logger.info("✅ BATCH COMPLETED: %s/%s succeeded", succeeded, len(results))
+    logger.info("⏱️  Total Request Time: %.2fms (%.2fs)", request_time*1000, request_time)
+    logger.info("=" * 60)
+    logger.info("")
+    
+    return BatchDashboardResponse(
+        success=succeeded == len(results),
+        results=results,
+        metadata={
+            'items': len(results),
+            'unique_items': sum(1 for outcome in outcomes if outcome['duplicate_of'] is None),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'max_concurrency': max_concurrency,
+            'total_request_time_ms': round(request_time * 1000, 2)
+        }
+    )
 
 if __name__ == "__main__":
+    import os
+    import tempfile
     import uvicorn
+    
+    workers = settings.WORKERS or os.cpu_count() or 1
+    if workers > 1:
+        # Production mode: the workers share cache entries and the Groq back-off
+        # through one SQLite file (set in the environment they inherit)
+        shared_db = os.path.join(tempfile.gettempdir(), f"instant-dashboard-{settings.BACKEND_PORT}.sqlite3")
+        for name in ("CACHE_DB_PATH", "RATE_LIMIT_DB_PATH"):
+            if not os.environ.get(name):
+                os.environ[name] = shared_db
+        logger.info("🚀 Starting %s workers; shared state in %s", workers, os.environ["RATE_LIMIT_DB_PATH"])
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=settings.BACKEND_PORT,
-        reload=True
+        reload=workers == 1,
+        workers=workers if workers > 1 else None
     )
@@ -0,0 +1,211 @@
+"""Prometheus-style metrics (text exposition format) without extra dependencies"""
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Buckets for stage and request durations, in seconds
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Buckets for payload and output sizes, in characters (256 .. 64M)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the exposition format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: a named metric with optional labels, one series per label set"""
+    
+    type_name = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value) for every series"""
+        raise NotImplementedError
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    
+    type_name = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._series[()] = 0
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in series]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly or read from a callback at scrape time"""
+    
+    type_name = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+        if not self.labelnames:
+            self._series[()] = 0
+    
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+    
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Report function() on every scrape (unlabelled gauges only)"""
+        self._function = function
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        if self._function is not None:
+            return [(self.name, "", self._function())]
+        with self._lock:
+            series = sorted(self._series.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in series]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, plus sum and count"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (last slot = +Inf), sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        samples = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """Collection of metrics rendered together on /metrics"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+# Generation pipeline
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "dashboard_stage_seconds", "Time spent in each generation stage", ("stage",)))
+GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "dashboard_generation_seconds", "End-to-end generation time", ("outcome",)))
+TOKENS = REGISTRY.register(Counter(
+    "dashboard_tokens_total", "Tokens sent to and received from the LLM", ("kind",)))
+PAYLOAD_CHARS = REGISTRY.register(Histogram(
+    "dashboard_payload_chars", "Size of the json_data of each request, in characters", buckets=SIZE_BUCKETS))
+HTML_CHARS = REGISTRY.register(Histogram(
+    "dashboard_html_chars", "Size of the generated HTML, in characters", buckets=SIZE_BUCKETS))
+ERRORS = REGISTRY.register(Counter(
+    "dashboard_errors_total", "Failed generations by error type", ("type",)))
+TRUNCATED = REGISTRY.register(Counter(
+    "dashboard_truncated_outputs_total", "LLM outputs cut off by the output limit (per finish_reason, or a missing </html>)"))
+CONTINUATIONS = REGISTRY.register(Counter(
+    "dashboard_continuations_total", "Extra LLM calls made to resume output cut off at MAX_TOKENS"))
+COALESCED = REGISTRY.register(Counter(
+    "dashboard_coalesced_requests_total", "Requests served by joining an identical in-flight generation"))
+
+# Concurrency
+LLM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "dashboard_llm_calls_in_flight", "LLM calls currently running"))
+QUEUED = REGISTRY.register(Gauge(
+    "dashboard_generations_queued", "Generations waiting for a concurrency slot"))
+REJECTED = REGISTRY.register(Counter(
+    "dashboard_generations_rejected_total", "Generations turned away with 429 because the LLM queue was full"))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "dashboard_llm_retries_total", "LLM calls retried after a transient error, by reason", ("reason",)))
+RATE_LIMIT_WAITS = REGISTRY.register(Counter(
+    "dashboard_rate_limit_waits_total", "LLM calls held back by the client-side RPM/TPM budget"))
+
+# Response cache
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "dashboard_cache_lookups_total", "Response cache lookups", ("result",)))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "dashboard_cache_entries", "Entries in the in-memory response cache"))
+CACHE_BYTES = REGISTRY.register(Gauge(
+    "dashboard_cache_bytes", "Bytes held by the in-memory response cache"))
+LAYOUT_LOOKUPS = REGISTRY.register(Counter(
+    "dashboard_layout_lookups_total", "Layout cache lookups (hit, miss, or ambiguous when regenerated)", ("result",)))
@@ -1,23 +1,31 @@
-from pydantic import BaseModel, Field, validator
-from typing import Any, Optional
-import json
+from pydantic import BaseModel, Field, PrivateAttr, model_validator, validator
+from typing import Any, List, Optional
+from app import json_backend
 
 class DashboardRequest(BaseModel):
     """Request model for dashboard generation"""
     json_data: str = Field(..., description="JSON data as a string")
     user_prompt: str = Field(..., description="User instructions for dashboard design")
     temperature: Optional[float] = Field(default=None, ge=0.0, le=2.0, description="LLM temperature (0.0-2.0)")
+    data_format: Optional[str] = Field(default=None, pattern="^(pretty|minified|columnar)$", description="Prompt encoding of the data: pretty, minified or columnar (defaults to server setting)")
+    render_mode: Optional[str] = Field(default=None, pattern="^(auto|llm|template)$", description="auto: skip the LLM for known data shapes; llm or template to force either path (defaults to server setting)")
     
-    @validator('json_data')
-    def validate_json(cls, v):
-        """Validate that json_data is valid JSON"""
+    # Parsed form of json_data, filled in once by validate_json and reused downstream
+    _parsed_data: Any = PrivateAttr(default=None)
+    
+    @model_validator(mode='after')
+    def validate_json(self):
+        """Validate that json_data is valid JSON and keep the parsed object"""
         try:
-            # Try to parse the JSON to ensure it's valid
-            parsed = json.loads(v)
-            # Return the original string (we'll parse it again in the service)
-            return v
-        except json.JSONDecodeError as e:
+            self._parsed_data = json_backend.loads(self.json_data)
+        except json_backend.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON: {str(e)}")
+        return self
+    
+    @property
+    def parsed_data(self) -> Any:
+        """json_data parsed during validation (no second json.loads needed)"""
+        return self._parsed_data
     
     @validator('user_prompt')
     def validate_prompt(cls, v):
@@ -46,8 +54,56 @@ class DashboardResponse(BaseModel):
             }
         }
 
+class UploadOptions(BaseModel):
+    """Options of an upload to /generate-dashboard/upload (query string or form fields)"""
+    user_prompt: str = Field(..., description="User instructions for dashboard design")
+    temperature: Optional[float] = Field(default=None, ge=0.0, le=2.0, description="LLM temperature (0.0-2.0)")
+    data_format: Optional[str] = Field(default=None, pattern="^(pretty|minified|columnar)$", description="Prompt encoding of the data: pretty, minified or columnar (defaults to server setting)")
+    render_mode: Optional[str] = Field(default=None, pattern="^(auto|llm|template)$", description="auto: skip the LLM for known data shapes; llm or template to force either path (defaults to server setting)")
+    
+    @validator('user_prompt')
+    def validate_prompt(cls, v):
+        """Validate that user_prompt is not empty"""
+        if not v or not v.strip():
+            raise ValueError("User prompt cannot be empty")
+        return v.strip()
+
+class BatchDashboardRequest(BaseModel):
+    """Request model for batch dashboard generation"""
+    items: List[dict] = Field(..., min_length=1, description="Dashboard requests, each with the same fields as /generate-dashboard")
+    max_concurrency: Optional[int] = Field(default=None, ge=1, le=64, description="Items generated at once (defaults to server setting)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"json_data": "{\"title\": \"Q1\", \"value\": 100}", "user_prompt": "Modern and dark"},
+                    {"json_data": "{\"title\": \"Q2\", \"value\": 120}", "user_prompt": "Modern and dark", "temperature": 0.5}
+                ],
+                "max_concurrency": 4
+            }
+        }
+
+class BatchItemResult(BaseModel):
+    """Outcome of one item of a batch"""
+    index: int
+    success: bool
+    status_code: int
+    html_content: Optional[str] = None
+    error: Optional[str] = None
+    duplicate_of: Optional[int] = None
+    metadata: Optional[dict] = None
+
+class BatchDashboardResponse(BaseModel):
+    """Response model for batch dashboard generation"""
+    success: bool
+    results: List[BatchItemResult]
+    metadata: Optional[dict] = None
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     message: str
     groq_configured: bool
+    backend: str = "groq"
+    llm_ready: bool = False
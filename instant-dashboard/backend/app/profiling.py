@@ -0,0 +1,229 @@
+"""Data profiling: compact summaries of large JSON arrays for the prompt"""
+import random
+from collections import Counter
+from typing import Any, Iterable
+
+# Distinct values tracked per field before cardinality is reported as a lower bound
+CARDINALITY_CAP = 1000
+
+
+def _type_name(value: Any) -> str:
+    """JSON type name of a parsed value"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+class FieldStats:
+    """Running statistics for one field of an array of rows"""
+    
+    def __init__(self, top_k: int):
+        self.top_k = top_k
+        self.count = 0
+        self.nulls = 0
+        self.types = Counter()
+        self.distinct = set()
+        self.distinct_capped = False
+        self.values = Counter()
+        self.minimum = None
+        self.maximum = None
+    
+    def add(self, value: Any) -> None:
+        """Account for one value of this field"""
+        self.count += 1
+        type_name = _type_name(value)
+        self.types[type_name] += 1
+        
+        if value is None:
+            self.nulls += 1
+            return
+        if type_name in ("array", "object"):
+            return
+        
+        if type_name == "number":
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+        
+        if value in self.distinct:
+            self.values[value] += 1
+        elif len(self.distinct) < CARDINALITY_CAP:
+            self.distinct.add(value)
+            self.values[value] += 1
+        else:
+            self.distinct_capped = True
+    
+    def summary(self) -> dict:
+        """Compact, JSON-serializable description of the field"""
+        result = {
+            "type": "|".join(name for name, _ in self.types.most_common()),
+            "count": self.count,
+        }
+        if self.nulls:
+            result["nulls"] = self.nulls
+        if self.distinct or self.distinct_capped:
+            result["distinct"] = f">={CARDINALITY_CAP}" if self.distinct_capped else len(self.distinct)
+        if self.minimum is not None:
+            result["min"] = self.minimum
+            result["max"] = self.maximum
+        # Top values only say something when values repeat
+        top = self.values.most_common(self.top_k)
+        if top and top[0][1] > 1:
+            result["top"] = [[value, count] for value, count in top]
+        return result
+
+
+class ArrayProfile(dict):
+    """
+    Profile object standing in for a large array (see ArrayProfiler.profile)
+    
+    Serializes like any dict; its type tells it apart from user data that
+    happens to have a "__profile__" key.
+    """
+
+
+class ArrayProfiler:
+    """
+    Single-pass profiler for an array of JSON values
+    
+    Rows are fed one at a time, so the array itself never has to be kept
+    (or even fully materialized). Memory is bounded by the number of
+    fields, CARDINALITY_CAP and the sample size. Samples are drawn with a
+    fixed-seed reservoir so the same data always yields the same profile.
+    """
+    
+    def __init__(self, sample_rows: int = 5, top_k: int = 5):
+        self.sample_rows = sample_rows
+        self.top_k = top_k
+        self.row_count = 0
+        self.fields = {}
+        self._reservoir = []  # (index, row)
+        self._random = random.Random(0)
+    
+    def add(self, row: Any) -> None:
+        """Account for the next row of the array"""
+        index = self.row_count
+        self.row_count += 1
+        
+        if isinstance(row, dict):
+            for key, value in row.items():
+                stats = self.fields.get(key)
+                if stats is None:
+                    stats = self.fields[key] = FieldStats(self.top_k)
+                stats.add(value)
+        else:
+            stats = self.fields.get("<value>")
+            if stats is None:
+                stats = self.fields["<value>"] = FieldStats(self.top_k)
+            stats.add(row)
+        
+        if len(self._reservoir) < self.sample_rows:
+            self._reservoir.append((index, row))
+        else:
+            slot = self._random.randint(0, index)
+            if slot < self.sample_rows:
+                self._reservoir[slot] = (index, row)
+    
+    def extend(self, rows: Iterable[Any]) -> "ArrayProfiler":
+        """Feed every row from an iterable; returns self for chaining"""
+        for row in rows:
+            self.add(row)
+        return self
+    
+    def profile(self) -> dict:
+        """
+        Build the profile object that replaces the array in the prompt
+        
+        Returns:
+            dict with row_count, per-field stats and sample rows in original order
+        """
+        return ArrayProfile({
+            "__profile__": True,
+            "row_count": self.row_count,
+            "fields": {name: stats.summary() for name, stats in self.fields.items()},
+            "sample_rows": [row for _, row in sorted(self._reservoir, key=lambda item: item[0])],
+        })
+
+
+def summarize_data(data: Any, array_threshold: int = 50, sample_rows: int = 5, top_k: int = 5) -> Any:
+    """
+    Replace every array longer than array_threshold with its profile
+    
+    Objects and short arrays are kept as-is (recursively), so titles,
+    KPI objects and small lists still reach the LLM verbatim.
+    
+    Args:
+        data: Parsed JSON data
+        array_threshold: Arrays with more items than this are profiled
+        sample_rows: Sample rows kept per profiled array
+        top_k: Most frequent values reported per field
+    
+    Returns:
+        New JSON-serializable structure (the input is not modified)
+    """
+    if isinstance(data, dict):
+        summary = {key: summarize_data(value, array_threshold, sample_rows, top_k)
+                   for key, value in data.items()}
+        # A profile made earlier (e.g. while an upload streamed in) stays one
+        return ArrayProfile(summary) if isinstance(data, ArrayProfile) else summary
+    if isinstance(data, list):
+        if len(data) > array_threshold:
+            return ArrayProfiler(sample_rows, top_k).extend(data).profile()
+        return [summarize_data(item, array_threshold, sample_rows, top_k) for item in data]
+    return data
+
+
+def count_profiles(data: Any) -> int:
+    """Number of array profiles (ArrayProfile objects) in a summarized structure"""
+    if isinstance(data, dict):
+        own = 1 if isinstance(data, ArrayProfile) else 0
+        return own + sum(count_profiles(value) for value in data.values())
+    if isinstance(data, list):
+        return sum(count_profiles(item) for item in data)
+    return 0
+
+
+def approx_json_size(data: Any, limit: int) -> int:
+    """
+    Estimate the pretty-printed (indent=2) size of data, stopping past limit
+    
+    Used to decide cheaply whether a payload fits the prompt budget
+    without serializing a multi-megabyte document first.
+    
+    Args:
+        data: Parsed JSON data
+        limit: Stop walking once the running estimate exceeds this
+    
+    Returns:
+        Estimated character count (a value > limit means "over budget")
+    """
+    size = 0
+    stack = [iter((data,))]
+    while stack and size <= limit:
+        try:
+            value = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+        
+        size += 2 * len(stack) + 2  # newline, indentation, comma
+        if isinstance(value, dict):
+            size += 2 + sum(len(key) + 4 for key in value)  # braces, quotes, colon and space
+            stack.append(iter(value.values()))
+        elif isinstance(value, list):
+            size += 2
+            stack.append(iter(value))
+        elif isinstance(value, str):
+            size += len(value) + 2
+        else:
+            size += len(str(value))
+    return size
@@ -1,104 +1,150 @@
 """System prompts for dashboard generation"""
-
+from app.config import settings
+from app.profiling import approx_json_size, count_profiles, summarize_data
+from app.serialization import COLUMNAR_NOTE, serialize_data
+from app.tokenizer import count_tokens
+
+# System prompts are sent as-is (not formatted), so the static part of every
+# request is a byte-identical prefix that provider-side prompt caching can reuse.
+# Everything that varies per request goes into the user message after it.
 SYSTEM_PROMPT = """You are an expert Frontend Developer specializing in creating beautiful, functional dashboards.
 
-Your task is to generate a complete, self-contained HTML page with embedded CSS that visualizes the provided JSON data.
-
-CRITICAL REQUIREMENTS:
-1. Use ONLY the ACTUAL VALUES from the provided JSON - DO NOT use template syntax
-2. DO NOT use Jinja2, Handlebars, or any template syntax - use the real data values directly
-3. Output ONLY valid HTML with embedded <style> tags - no markdown, no explanations
-4. The HTML must be complete and ready to render in an iframe
-5. Include proper DOCTYPE and meta tags
-6. Make it responsive and mobile-friendly
-
-ANTI-HALLUCINATION RULES - EXTREMELY IMPORTANT:
-❌ NEVER add currency symbols ($, €, £) unless they are in the JSON
-❌ NEVER add units (kg, lbs, %, etc.) unless they are in the JSON
-❌ NEVER modify numbers (no rounding, no formatting changes)
-❌ NEVER add extra text or labels not in the JSON
-❌ NEVER make up data points or values
-✅ ONLY use the EXACT values as they appear in the JSON
-✅ If JSON has "revenue": 50000, display exactly: 50000
-✅ If JSON has "currency": "USD", you can use it for context
-✅ Copy values character-for-character from the JSON
-
-IMPORTANT - DATA USAGE:
-❌ WRONG: Use template variables or placeholders
-✅ CORRECT: <h1>Monthly Office Spending</h1>
-
-❌ WRONG: Use template loops or conditionals
-✅ CORRECT: <span>2847500</span>
-
-❌ WRONG: <div>$50,000</div> when JSON has "revenue": 50000
-✅ CORRECT: <div>50000</div> or <div>50000 USD</div> if currency is in JSON
-
-YOU MUST:
-- Extract actual values from the JSON data provided
-- Hardcode those values directly into the HTML
-- Never use template syntax of any kind
-- Display the real numbers, text, and data from the JSON
-- Never add symbols, formatting, or text not present in the JSON
-- Use values EXACTLY as they appear in the JSON
+Your task is to generate a complete, self-contained HTML page with embedded CSS that visualizes the JSON data in the user's message, following the user's instructions.
 
-DESIGN GUIDELINES:
-1. Modern, professional appearance with clean typography
-2. Use a cohesive color scheme (avoid harsh primary colors)
-3. Include subtle shadows, rounded corners, and smooth transitions
-4. Ensure good contrast and readability
-5. Add hover effects for interactive elements
-6. Use CSS Grid or Flexbox for layouts
-
-STRUCTURE:
-1. Start with <!DOCTYPE html>
-2. Include <meta charset="UTF-8"> and viewport meta tag
-3. All CSS should be in a <style> tag in the <head>
-4. Use semantic HTML5 elements
-5. Ensure all data from JSON is displayed accurately with REAL VALUES
-
-STYLING BEST PRACTICES:
-- Use modern fonts (system fonts or web-safe fonts)
-- Implement a consistent spacing system
-- Add subtle animations for better UX
-- Use CSS variables for colors and spacing
-- Ensure the design looks premium and polished
+OUTPUT REQUIREMENTS:
+1. Output ONLY the HTML document - no markdown, no explanations
+2. Start with <!DOCTYPE html> and include <meta charset="UTF-8"> and a viewport meta tag
+3. Put all CSS in a <style> tag in the <head>; the page must render on its own in an iframe
+4. Use semantic HTML5 elements and make the page responsive and mobile-friendly
+
+DATA RULES - EXTREMELY IMPORTANT:
+✅ Display every value EXACTLY as it appears in the JSON, character for character, hardcoded into the HTML
+❌ NEVER use template syntax or placeholders (Jinja2, Handlebars, {{ }}, template loops or conditionals)
+❌ NEVER add currency symbols ($, €, £) or units (kg, lbs, %, etc.) unless they are in the JSON
+❌ NEVER modify numbers (no rounding, no thousands separators, no abbreviations like 50k)
+❌ NEVER add text, labels or data points that are not in the JSON
+✅ Context fields such as "currency": "USD" may be shown next to the values they describe
 
 EXAMPLE:
-If JSON has: {{"title": "Sales Report", "revenue": 50000}}
-Your HTML should contain: <h1>Sales Report</h1> and <div>50000</div>
-NOT: <div>$50,000</div> or <div>50k</div>
+JSON: {"title": "Sales Report", "revenue": 50000, "currency": "USD"}
+✅ CORRECT: <h1>Sales Report</h1> and <div>50000</div> or <div>50000 USD</div>
+❌ WRONG: <div>$50,000</div>, <div>50k</div>, <div>{{ revenue }}</div>
 
-Remember: The user will judge the quality based on both accuracy of data display and visual appeal.
-ALL DATA MUST BE REAL VALUES FROM THE JSON, NOT TEMPLATE PLACEHOLDERS.
-NEVER HALLUCINATE OR ADD EXTRA SYMBOLS/FORMATTING TO THE DATA.
+DESIGN GUIDELINES:
+1. Modern, professional appearance with clean typography (system or web-safe fonts)
+2. A cohesive color scheme defined with CSS variables (avoid harsh primary colors)
+3. A consistent spacing system, subtle shadows, rounded corners and smooth transitions
+4. Good contrast and readability, with hover effects for interactive elements
+5. CSS Grid or Flexbox for layouts, and a premium, polished finish
+
+The user will judge the result on both the accuracy of the data and its visual appeal.
 """
 
-def build_user_prompt(json_data: dict, user_instructions: str) -> str:
-    """Build the complete user prompt with data and instructions"""
-    import json as json_module
-    
-    # Format JSON nicely for the prompt
-    json_str = json_module.dumps(json_data, indent=2)
+LEAN_SYSTEM_PROMPT = """You generate dashboards as one self-contained HTML page.
+
+Output only the HTML document: <!DOCTYPE html>, meta charset and viewport tags, all CSS in one <style> tag in the <head>, a responsive layout. No markdown, no commentary.
+
+Data rules:
+- Show every value exactly as written in the JSON: no rounding, thousands separators, currency symbols or units that are not in the JSON.
+- Hardcode the values; never use template syntax or placeholders.
+- Never invent values, labels or data points.
+Example: "revenue": 50000 -> <div>50000</div>, not <div>$50,000</div>.
+
+Design: clean modern typography, a cohesive palette in CSS variables, cards with subtle shadows and rounded corners, Grid or Flexbox layout, good contrast.
+"""
+
+# Supported values for settings.PROMPT_VARIANT
+SYSTEM_PROMPTS = {"full": SYSTEM_PROMPT, "lean": LEAN_SYSTEM_PROMPT}
+
+
+def system_prompt(variant: str = None) -> str:
+    """
+    Static system prompt of a prompt variant
     
-    return f"""Create a dashboard based on this data and instructions:
+    Args:
+        variant: 'full' or 'lean' (defaults to settings.PROMPT_VARIANT)
+        
+    Returns:
+        System prompt text
+    """
+    variant = variant or settings.PROMPT_VARIANT
+    if variant not in SYSTEM_PROMPTS:
+        raise ValueError(f"Unknown prompt variant: {variant}. Use one of: {', '.join(SYSTEM_PROMPTS)}")
+    return SYSTEM_PROMPTS[variant]
+
+PROFILE_NOTE = """
+NOTE - SUMMARIZED DATA:
+Some arrays were too large to include in full. Each of them is replaced by an object with "__profile__": true containing:
+- "row_count": the number of rows in the original array
+- "fields": per-field type, count, distinct count, min/max (numbers) and "top" [value, count] pairs
+- "sample_rows": a few representative rows, copied exactly from the original data
+Visualize these statistics and sample rows as they are. Do NOT invent the rows that were left out.
+"""
 
-DATA (JSON):
+CONTINUE_PROMPT = """Your previous answer was cut off by the output limit.
+Continue the HTML exactly where it stopped, starting with the very next character.
+Do not repeat anything you already wrote, do not start the document over, and do not add a code fence or any explanation."""
+
+
+def build_data_section(json_data, token_budget: int = None, data_format: str = None) -> tuple:
+    """
+    Serialize the data for the prompt, profiling large arrays if it is over budget
+    
+    Args:
+        json_data: Parsed JSON data
+        token_budget: Max tokens for the DATA section (defaults to settings.PROMPT_TOKEN_BUDGET)
+        data_format: 'pretty', 'minified' or 'columnar' (defaults to settings.PROMPT_DATA_FORMAT)
+        
+    Returns:
+        (json_str, notes) - the serialized data and any explanatory notes for the LLM
+    """
+    budget = token_budget if token_budget is not None else settings.PROMPT_TOKEN_BUDGET
+    data_format = data_format or settings.PROMPT_DATA_FORMAT
+    notes = COLUMNAR_NOTE if data_format == "columnar" else ""
+    
+    # Cheap size walk first, so huge payloads are never serialized in full
+    max_chars = budget * 4
+    if approx_json_size(json_data, max_chars) <= max_chars:
+        json_str = serialize_data(json_data, data_format)
+        if count_tokens(json_str) <= budget:
+            # Data profiled while it was streamed in still needs the note
+            if count_profiles(json_data):
+                notes += PROFILE_NOTE
+            return json_str, notes
+    
+    # Over budget: profile large arrays, shrinking the profile until it fits
+    threshold = settings.PROFILE_ARRAY_THRESHOLD
+    sample_rows = settings.PROFILE_SAMPLE_ROWS
+    top_k = settings.PROFILE_TOP_K
+    while True:
+        summary = summarize_data(json_data, threshold, sample_rows, top_k)
+        json_str = serialize_data(summary, data_format)
+        if count_tokens(json_str) <= budget or (threshold <= 1 and sample_rows == 0 and top_k <= 1):
+            # Over budget without long arrays (e.g. one huge object): nothing to explain
+            return json_str, notes + (PROFILE_NOTE if count_profiles(summary) else "")
+        threshold = max(1, threshold // 2)
+        sample_rows //= 2
+        top_k = max(1, top_k // 2)
+
+
+def build_user_prompt(json_data: dict, user_instructions: str, token_budget: int = None,
+                      data_format: str = None) -> str:
+    """
+    Build the user message: the data and instructions of this request
+    
+    The static rules live in the system prompt, so this message only holds
+    what changes between requests.
+    """
+    # Serialize the data (large arrays are profiled to fit the budget)
+    json_str, notes = build_data_section(json_data, token_budget, data_format)
+    
+    return f"""DATA (JSON):
 ```json
 {json_str}
 ```
-
+{notes}
 USER INSTRUCTIONS:
 {user_instructions}
 
-CRITICAL REMINDER - ANTI-HALLUCINATION:
-- Use the ACTUAL VALUES from the JSON above EXACTLY as they appear
-- DO NOT add currency symbols like $ unless they are in the JSON
-- DO NOT add units or formatting not present in the JSON
-- DO NOT use any template syntax
-- Extract the real data and hardcode it into your HTML
-- For example, if the JSON has "revenue": 50000, write <span>50000</span> NOT <span>$50,000</span>
-- If the JSON has "currency": "USD", you can display it like: <span>50000 USD</span>
-
-Generate a complete HTML page that displays this data beautifully according to the instructions.
-Remember to use ONLY the actual data values provided above - do not make up any numbers, add symbols, or use template placeholders.
+Generate the complete HTML page now, using only the exact values from DATA.
 """
@@ -0,0 +1,346 @@
+"""
+Client-side limits for LLM calls: per-minute token buckets, retry backoff and an admission queue
+
+Groq enforces requests-per-minute and tokens-per-minute limits on the API
+key. Spending that budget here, before the call, turns a burst of traffic
+into a short wait instead of a burst of 429s; the calls that still fail
+with a transient error are retried with jittered exponential backoff.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from app.shared_state import connect
+
+logger = logging.getLogger(__name__)
+
+# Admission priorities (lower goes first): someone waiting on the page beats a batch item
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Weight of the latest call in the moving average of slot hold times (for Retry-After)
+HOLD_TIME_SMOOTHING = 0.2
+
+# Exception class names (anywhere in the MRO) of transient network errors:
+# the Groq SDK's timeout/connection errors and httpx's transport errors
+TRANSIENT_ERROR_CLASSES = {
+    'APITimeoutError': 'timeout',
+    'TimeoutException': 'timeout',
+    'APIConnectionError': 'connection',
+    'TransportError': 'connection',
+}
+
+
+class QueueFullError(Exception):
+    """Raised when a generation arrives while the LLM queue is full; maps to 429 with Retry-After"""
+    
+    status_code = 429
+    
+    def __init__(self, retry_after: float, waiting: int):
+        self.retry_after = retry_after
+        self.waiting = waiting
+        super().__init__(f"LLM queue is full ({waiting} generations waiting); retry in {retry_after:.0f}s")
+
+
+def transient_error_reason(error: BaseException) -> Optional[str]:
+    """
+    Why an LLM call failed, if retrying it may succeed
+    
+    Walks the exception chain, since generation errors wrap the SDK error.
+    
+    Args:
+        error: Exception raised by an LLM call
+    
+    Returns:
+        'rate_limited' (429), 'server_error' (5xx), 'timeout' or 'connection';
+        None for errors a retry will not fix
+    """
+    while error is not None:
+        if isinstance(error, QueueFullError):
+            return None
+        status = getattr(error, 'status_code', None)
+        if status == 429:
+            return 'rate_limited'
+        if isinstance(status, int) and status >= 500:
+            return 'server_error'
+        if isinstance(error, TimeoutError):
+            return 'timeout'
+        if isinstance(error, ConnectionError):
+            return 'connection'
+        for cls in type(error).__mro__:
+            if cls.__name__ in TRANSIENT_ERROR_CLASSES:
+                return TRANSIENT_ERROR_CLASSES[cls.__name__]
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]
+    
+    The jitter spreads retries from calls that failed together, so they do
+    not hit the API again in one burst.
+    
+    Args:
+        attempt: Retries so far (0 for the first)
+        base: Delay ceiling of the first retry in seconds
+        cap: Largest delay ceiling in seconds
+    
+    Returns:
+        Delay in seconds
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBuckets:
+    """
+    Per-minute budgets (e.g. requests and tokens) spent before each LLM call
+    
+    Each bucket holds up to one minute of its limit and refills continuously
+    at limit/60 per second, the way Groq accounts for its limits. A call may
+    start once every bucket covers its cost. With a db_path the levels live
+    in a SQLite table, so all workers spend from the same budget, like the
+    API key they share; without one they stay in this process.
+    """
+    
+    def __init__(self, limits: Dict[str, float], db_path: str = ""):
+        """
+        Args:
+            limits: Bucket name -> limit per minute (names with a limit of 0 are unlimited)
+            db_path: SQLite file shared by the workers ('' keeps the levels in memory)
+        """
+        self.limits = {name: float(limit) for name, limit in limits.items() if limit > 0}
+        self.db_path = db_path
+        self._levels = {}  # name -> (level, time.time() of the last update)
+        self._lock = threading.Lock()
+        self._reserved = {name: 0.0 for name in self.limits}
+        self._waits = 0
+        
+        self._db = None
+        if db_path and self.limits:
+            self._db = connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, "
+                "updated REAL NOT NULL)"
+            )
+            self._db.commit()
+    
+    @property
+    def enabled(self) -> bool:
+        """True when at least one bucket has a limit"""
+        return bool(self.limits)
+    
+    def reserve(self, costs: Dict[str, float]) -> float:
+        """
+        Spend `costs` if every bucket covers them, else report how long to wait
+        
+        Nothing is spent unless all buckets have enough, so a caller that has
+        to wait simply calls again after the returned delay. A cost above a
+        bucket's capacity is capped at the capacity, or it could never start.
+        
+        Args:
+            costs: Bucket name -> amount this call uses (unknown names are ignored)
+        
+        Returns:
+            0.0 if the budget was spent, else seconds until it should be there
+        """
+        if not self.limits:
+            return 0.0
+        with self._lock:
+            try:
+                levels = self._load()
+                costs = {name: min(costs.get(name, 0.0), limit) for name, limit in self.limits.items()}
+                wait = max((costs[name] - level) * 60 / self.limits[name] for name, level in levels.items())
+                if wait <= 0:
+                    wait = 0.0
+                    levels = {name: level - costs[name] for name, level in levels.items()}
+                self._store(levels, time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Shared rate-limit budget unavailable, not limiting: {str(e)}")
+                return 0.0
+            if wait:
+                self._waits += 1
+            else:
+                for name, cost in costs.items():
+                    self._reserved[name] += cost
+            return wait
+    
+    def drain(self) -> None:
+        """
+        Empty every bucket
+        
+        Called after a 429 despite the budget (another client on the same
+        key, or limits set above the real ones): new calls then wait for a
+        refill instead of running into the same limit.
+        """
+        if not self.limits:
+            return
+        with self._lock:
+            try:
+                self._load()
+                self._store({name: 0.0 for name in self.limits}, time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Shared rate-limit budget write failed: {str(e)}")
+    
+    def stats(self) -> dict:
+        """Limits, current levels and spending counters for /stats"""
+        if not self.limits:
+            return {'enabled': False}
+        with self._lock:
+            try:
+                levels = self._load()
+                if self._db is not None:
+                    self._db.commit()
+            except sqlite3.Error:
+                levels = {}
+            return {
+                'enabled': True,
+                'shared': self._db is not None,
+                'limits_per_minute': dict(self.limits),
+                'available': {name: round(level, 1) for name, level in levels.items()},
+                'reserved': {name: round(amount, 1) for name, amount in self._reserved.items()},
+                'waits': self._waits,
+            }
+    
+    def _load(self) -> dict:
+        """
+        Current level of each bucket, refilled up to now (caller holds self._lock)
+        
+        With SQLite this opens a write transaction (BEGIN IMMEDIATE) that
+        _store commits, so two workers never spend the same budget.
+        """
+        if self._db is not None:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = {name: (level, updated) for name, level, updated
+                        in self._db.execute("SELECT name, level, updated FROM token_buckets")}
+            except sqlite3.Error:
+                self._db.rollback()
+                raise
+        else:
+            rows = self._levels
+        now = time.time()
+        levels = {}
+        for name, limit in self.limits.items():
+            level, updated = rows.get(name, (limit, now))
+            levels[name] = min(limit, level + max(0.0, now - updated) * limit / 60)
+        return levels
+    
+    def _store(self, levels: dict, now: float) -> None:
+        """Save bucket levels as of `now` and end the transaction _load opened"""
+        if self._db is None:
+            self._levels = {name: (level, now) for name, level in levels.items()}
+            return
+        try:
+            self._db.executemany(
+                "INSERT INTO token_buckets (name, level, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated = excluded.updated",
+                [(name, level, now) for name, level in levels.items()]
+            )
+            self._db.commit()
+        except sqlite3.Error:
+            self._db.rollback()
+            raise
+
+
+class AdmissionQueue:
+    """
+    Bounded priority queue in front of the LLM: `slots` calls run, up to `max_waiting` wait
+    
+    A freed slot goes to the waiting generation with the lowest priority
+    number, first come first served within a priority. When the waiting line
+    is full, new generations are turned away at once with QueueFullError,
+    whose retry_after estimates when the line will have moved on, instead of
+    queueing for longer than a client will wait.
+    
+    Bound to the event loop it is first used on, like asyncio.Semaphore.
+    """
+    
+    def __init__(self, slots: int, max_waiting: int = 0):
+        """
+        Args:
+            slots: Calls allowed at once
+            max_waiting: Generations allowed to wait for a slot; 0 = no limit
+        """
+        self.slots = max(1, slots)
+        self.max_waiting = max_waiting
+        self._free = self.slots
+        self._waiters = []  # heap of [priority, sequence, future]
+        self._sequence = itertools.count()
+        self._hold_time = 1.0  # moving average of seconds a slot is held
+        self.rejected = 0
+    
+    @property
+    def waiting(self) -> int:
+        """Generations currently waiting for a slot"""
+        return len(self._waiters)
+    
+    def retry_after(self) -> int:
+        """Whole seconds until a newcomer would likely get a slot (at least 1)"""
+        return max(1, math.ceil((self.waiting + 1) * self._hold_time / self.slots))
+    
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """
+        Wait for a slot
+        
+        Args:
+            priority: Lower numbers are served first (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+        
+        Raises:
+            QueueFullError: If max_waiting generations are already waiting
+        """
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        if self.max_waiting and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after(), self.waiting)
+        
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as this waiter was cancelled: pass it on
+                self.release()
+            elif entry in self._waiters:
+                # Still queued; release() may already have popped (and skipped) it
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+    
+    def release(self, held: float = None) -> None:
+        """
+        Hand the slot to the next waiter, or free it
+        
+        Args:
+            held: Seconds the slot was held, which feeds retry_after
+        """
+        if held is not None:
+            self._hold_time += HOLD_TIME_SMOOTHING * (held - self._hold_time)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+    
+    def stats(self) -> dict:
+        """Slots, waiters and rejections for /stats"""
+        return {
+            'slots': self.slots,
+            'in_use': self.slots - self._free,
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'rejected': self.rejected,
+            'avg_hold_seconds': round(self._hold_time, 3),
+        }
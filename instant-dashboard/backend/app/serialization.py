@@ -0,0 +1,60 @@
+"""Encodings for the DATA section of the prompt"""
+from typing import Any
+
+from app import json_backend
+
+# Supported values for settings.PROMPT_DATA_FORMAT / DashboardRequest.data_format
+DATA_FORMATS = ("pretty", "minified", "columnar")
+
+COLUMNAR_NOTE = """
+NOTE - COLUMNAR ENCODING:
+Arrays of objects that share the same keys are written as {"__columns__": [key, ...], "__rows__": [[value, ...], ...]}.
+Each row lists the values in the same order as "__columns__". Treat every row as one object of the original array.
+"""
+
+
+def to_columnar(data: Any) -> Any:
+    """
+    Rewrite arrays of same-keyed objects as column names plus value rows
+    
+    Key names are then written once per array instead of once per row,
+    which is where most of the tokens go in tabular exports.
+    
+    Args:
+        data: Parsed JSON data
+    
+    Returns:
+        New structure with homogeneous object arrays in columnar form
+    """
+    if isinstance(data, dict):
+        return {key: to_columnar(value) for key, value in data.items()}
+    if isinstance(data, list):
+        if len(data) >= 2 and all(isinstance(item, dict) for item in data):
+            columns = list(data[0].keys())
+            if all(list(item.keys()) == columns for item in data[1:]):
+                return {
+                    "__columns__": columns,
+                    "__rows__": [[to_columnar(item[key]) for key in columns] for item in data],
+                }
+        return [to_columnar(item) for item in data]
+    return data
+
+
+def serialize_data(data: Any, data_format: str = "pretty") -> str:
+    """
+    Serialize parsed JSON for the prompt in the requested encoding
+    
+    Args:
+        data: Parsed JSON data
+        data_format: 'pretty' (indent=2), 'minified' or 'columnar' (minified + columnar arrays)
+    
+    Returns:
+        Serialized JSON text
+    """
+    if data_format == "pretty":
+        return json_backend.dumps(data, indent=2)
+    if data_format == "minified":
+        return json_backend.dumps(data)
+    if data_format == "columnar":
+        return json_backend.dumps(to_columnar(data))
+    raise ValueError(f"Unknown data format: {data_format}. Use one of: {', '.join(DATA_FORMATS)}")
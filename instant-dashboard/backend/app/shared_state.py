@@ -0,0 +1,111 @@
+"""State shared by worker processes on one host through a SQLite file"""
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a connection waits for another process's write lock before giving up
+SQLITE_BUSY_TIMEOUT = 5.0
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite file that several worker processes read and write at once
+    
+    WAL mode lets readers carry on while one process writes, and the busy
+    timeout makes concurrent writers queue instead of failing with
+    "database is locked".
+    
+    Args:
+        db_path: Path of the SQLite file (created if missing)
+    
+    Returns:
+        Connection usable from any thread (callers serialize access)
+    """
+    db = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class RateLimitState:
+    """
+    Back-off deadline after a 429 from Groq, shared by all workers
+    
+    Groq's limits apply to the API key, not to a process, so when one
+    worker is told to retry after N seconds the others should hold off too.
+    With a db_path the deadline is kept in a SQLite table every worker
+    reads before calling the LLM; without one it stays in this process.
+    """
+    
+    def __init__(self, db_path: str = ""):
+        """
+        Args:
+            db_path: SQLite file shared by the workers ('' keeps the state in memory)
+        """
+        self.db_path = db_path
+        self._blocked_until = {}  # name -> time.time() deadline known to this process
+        self._lock = threading.Lock()
+        
+        self._db = None
+        if db_path:
+            self._db = connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, blocked_until REAL NOT NULL)"
+            )
+            self._db.commit()
+    
+    def back_off(self, seconds: float, name: str = "groq") -> None:
+        """
+        Hold off calls to `name` for `seconds` (an earlier, later deadline is kept)
+        
+        Args:
+            seconds: Delay from Retry-After or the retry backoff
+            name: Limited resource
+        """
+        deadline = time.time() + seconds
+        with self._lock:
+            self._blocked_until[name] = max(self._blocked_until.get(name, 0.0), deadline)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT INTO rate_limits (name, blocked_until) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                        (name, deadline)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️  Shared rate-limit write failed: {str(e)}")
+    
+    def wait_seconds(self, name: str = "groq") -> float:
+        """
+        Seconds left before calls to `name` may start again
+        
+        Args:
+            name: Limited resource
+        
+        Returns:
+            Remaining back-off in seconds, 0.0 if calls may go ahead
+        """
+        with self._lock:
+            deadline = self._blocked_until.get(name, 0.0)
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT blocked_until FROM rate_limits WHERE name = ?", (name,)).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️  Shared rate-limit read failed: {str(e)}")
+                    row = None
+                if row:
+                    deadline = max(deadline, row[0])
+        return max(0.0, deadline - time.time())
+    
+    def stats(self) -> dict:
+        """Remaining back-off per resource and whether it is shared"""
+        with self._lock:
+            names = set(self._blocked_until)
+        return {
+            'shared': self._db is not None,
+            'wait_seconds': {name: round(self.wait_seconds(name), 2) for name in sorted(names | {"groq"})},
+        }
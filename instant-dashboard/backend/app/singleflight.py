@@ -0,0 +1,115 @@
+"""Single-flight: concurrent identical calls share one execution"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+
+class _Call:
+    """One in-flight execution and the number of callers that joined it"""
+    
+    def __init__(self):
+        self.joined = 0
+        self.task = None  # asyncio.Task (async calls)
+        self.done = threading.Event()  # sync calls
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into a single execution
+    
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running wait for it and get the same result or
+    the same exception. Once the call finishes the key is released, so later
+    callers start a fresh execution (the response cache covers those).
+    
+    Async calls run in their own task and are awaited through
+    asyncio.shield, so a leader whose client disconnects does not cancel
+    the work the other callers are waiting for.
+    """
+    
+    def __init__(self):
+        self._async_calls = {}
+        self._sync_calls = {}
+        self._lock = threading.Lock()
+        
+        self.executions = 0
+        self.coalesced = 0
+    
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, int, bool]:
+        """
+        Await fn() once per key among concurrent callers
+        
+        Args:
+            key: Identity of the call
+            fn: Coroutine function to run if no identical call is in flight
+        
+        Returns:
+            (result, shared_by, leader) - shared_by counts every caller that
+            received this result; leader is True for the caller that ran fn
+        """
+        call = self._async_calls.get(key)
+        leader = call is None
+        if leader:
+            call = self._async_calls[key] = _Call()
+            call.task = asyncio.ensure_future(fn())
+            call.task.add_done_callback(lambda _: self._release(self._async_calls, key, call))
+            self.executions += 1
+        else:
+            call.joined += 1
+            self.coalesced += 1
+        
+        result = await asyncio.shield(call.task)
+        return result, call.joined + 1, leader
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, int, bool]:
+        """
+        Blocking counterpart of ado for callers on worker threads
+        
+        Args:
+            key: Identity of the call
+            fn: Function to run if no identical call is in flight
+        
+        Returns:
+            (result, shared_by, leader), as for ado
+        """
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._sync_calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.joined += 1
+                self.coalesced += 1
+        
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                self._release(self._sync_calls, key, call)
+                call.done.set()
+        else:
+            call.done.wait()
+        
+        if call.error is not None:
+            raise call.error
+        return call.result, call.joined + 1, leader
+    
+    def _release(self, calls: dict, key: Hashable, call: _Call) -> None:
+        """Forget a finished call so the next caller starts a new one"""
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+    
+    def stats(self) -> dict:
+        """Return executions, coalesced callers and calls currently in flight"""
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._async_calls) + len(self._sync_calls),
+            }
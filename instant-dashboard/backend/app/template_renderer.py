@@ -0,0 +1,351 @@
+"""Deterministic dashboard renderer for common data shapes (no LLM call)"""
+import html
+import json
+import re
+from typing import Any, Optional
+
+# Supported values for settings.RENDER_MODE / DashboardRequest.render_mode
+RENDER_MODES = ("auto", "llm", "template")
+
+# Arrays longer than this are left to the LLM path (which profiles them)
+MAX_TEMPLATE_ROWS = 200
+# Nesting depth of objects rendered as grouped sections
+MAX_GROUP_DEPTH = 2
+
+TITLE_KEYS = ("report_title", "dashboard_title", "title", "report_name", "dashboard_name", "name")
+TIME_KEYS = ("date", "day", "week", "month", "quarter", "year", "period", "time", "timestamp")
+
+_TIME_LABEL = re.compile(
+    r"^(\d{4}([-/]\d{1,2}([-/]\d{1,2})?)?([T ][\d:.]+Z?)?"
+    r"|q[1-4]( \d{4})?"
+    r"|(mon|tue|wed|thu|fri|sat|sun)[a-z]*"
+    r"|(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?( \d{4})?)$",
+    re.IGNORECASE,
+)
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+STYLE = """
+:root {
+  --bg: #f4f6fb; --panel: #ffffff; --text: #1f2933; --muted: #647185; --border: #e3e8f0;
+  --accent: #4f6bed; --accent-soft: rgba(79, 107, 237, 0.12); --shadow: 0 6px 20px rgba(31, 41, 51, 0.08);
+  --radius: 14px; --gap: 20px;
+}
+body.theme-dark {
+  --bg: #11151c; --panel: #1a2029; --text: #e6ebf2; --muted: #97a3b6; --border: #2a3240;
+  --accent: #7c93ff; --accent-soft: rgba(124, 147, 255, 0.16); --shadow: 0 6px 20px rgba(0, 0, 0, 0.35);
+}
+* { box-sizing: border-box; margin: 0; padding: 0; }
+body {
+  font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+  background: var(--bg); color: var(--text); line-height: 1.5;
+}
+.dashboard { max-width: 1200px; margin: 0 auto; padding: 32px 20px; display: grid; gap: var(--gap); }
+.dashboard-header h1 { font-size: 1.9rem; font-weight: 700; letter-spacing: -0.01em; }
+.meta { list-style: none; display: flex; flex-wrap: wrap; gap: 10px; margin-top: 12px; }
+.meta li { background: var(--accent-soft); border-radius: 999px; padding: 4px 14px; font-size: 0.9rem; }
+.meta-label { color: var(--muted); margin-right: 6px; }
+.panel {
+  background: var(--panel); border: 1px solid var(--border); border-radius: var(--radius);
+  box-shadow: var(--shadow); padding: 22px; display: grid; gap: 16px; min-width: 0;
+}
+.panel h2 { font-size: 1.15rem; font-weight: 600; }
+.panel h3 { font-size: 1rem; font-weight: 600; color: var(--muted); }
+.group { display: grid; gap: var(--gap); grid-template-columns: repeat(auto-fit, minmax(320px, 1fr)); }
+.kpi-grid { display: grid; gap: 14px; grid-template-columns: repeat(auto-fit, minmax(180px, 1fr)); }
+.kpi {
+  border: 1px solid var(--border); border-radius: 12px; padding: 16px;
+  transition: transform 0.2s ease, box-shadow 0.2s ease;
+}
+.kpi:hover { transform: translateY(-2px); box-shadow: var(--shadow); }
+.kpi-label { color: var(--muted); font-size: 0.85rem; }
+.kpi-value { font-size: 1.6rem; font-weight: 700; word-break: break-word; }
+.bars { list-style: none; display: grid; gap: 12px; }
+.bar-row { display: grid; grid-template-columns: minmax(110px, 30%) 1fr auto; gap: 12px; align-items: center; }
+.bar-track { background: var(--accent-soft); border-radius: 6px; height: 12px; overflow: hidden; }
+.bar-fill { background: var(--accent); height: 100%; border-radius: 6px; transition: width 0.6s ease; }
+.bar-row:hover .bar-fill { filter: brightness(1.15); }
+.bar-value { font-weight: 600; font-variant-numeric: tabular-nums; }
+.chart { width: 100%; height: auto; display: block; }
+.chart .line { fill: none; stroke: var(--accent); stroke-width: 3; stroke-linejoin: round; }
+.chart .area { fill: var(--accent-soft); stroke: none; }
+.chart circle { fill: var(--panel); stroke: var(--accent); stroke-width: 2.5; transition: r 0.2s ease; }
+.chart circle:hover { r: 7; }
+.chart text { fill: var(--muted); font-size: 12px; }
+.legend { color: var(--muted); font-size: 0.85rem; }
+.table-wrap { overflow-x: auto; }
+table { width: 100%; border-collapse: collapse; font-size: 0.92rem; }
+th, td { text-align: left; padding: 10px 12px; border-bottom: 1px solid var(--border); white-space: nowrap; }
+th { color: var(--muted); font-weight: 600; }
+td.num, th.num { text-align: right; font-variant-numeric: tabular-nums; }
+tbody tr { transition: background 0.15s ease; }
+tbody tr:hover { background: var(--accent-soft); }
+.chips { list-style: none; display: flex; flex-wrap: wrap; gap: 8px; }
+.chips li { border: 1px solid var(--border); border-radius: 999px; padding: 4px 12px; }
+@media (max-width: 640px) {
+  .dashboard { padding: 20px 12px; }
+  .dashboard-header h1 { font-size: 1.5rem; }
+  .bar-row { grid-template-columns: 1fr auto; }
+  .bar-track { grid-column: 1 / -1; grid-row: 2; }
+}
+"""
+
+
+class TemplateNotApplicableError(ValueError):
+    """Raised when render_mode='template' is forced for data the templates cannot show"""
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def humanize(key: str) -> str:
+    """Heading or label from a JSON key: 'total_revenue' / 'totalRevenue' -> 'Total Revenue'"""
+    words = _CAMEL.sub(" ", str(key)).replace("_", " ").replace("-", " ").split()
+    return " ".join(word[:1].upper() + word[1:] for word in words) or str(key)
+
+
+def format_value(value: Any) -> str:
+    """A value exactly as it appears in the JSON (no symbols, rounding or units), HTML-escaped"""
+    if isinstance(value, str):
+        return html.escape(value)
+    return html.escape(json.dumps(value))
+
+
+def _plan_list(key: Optional[str], items: list) -> Optional[dict]:
+    """Section for an array, or None if its shape is not supported"""
+    if not items or len(items) > MAX_TEMPLATE_ROWS:
+        return None
+    if all(_is_scalar(item) for item in items):
+        return {'kind': 'chips', 'key': key, 'values': items}
+    if not all(isinstance(item, dict) and item for item in items):
+        return None
+    columns = list(items[0].keys())
+    if any(list(item.keys()) != columns for item in items[1:]):
+        return None
+    if not all(_is_scalar(value) for item in items for value in item.values()):
+        return None
+    
+    numeric = [column for column in columns if all(_is_number(item[column]) for item in items)]
+    labels = [column for column in columns if all(isinstance(item[column], str) for item in items)]
+    if not numeric or not labels:
+        return {'kind': 'table', 'key': key, 'columns': columns, 'numeric': numeric, 'rows': items}
+    label = labels[0]
+    
+    is_time = label.lower() in TIME_KEYS or all(_TIME_LABEL.match(item[label].strip()) for item in items)
+    if is_time and len(items) >= 2:
+        return {'kind': 'series', 'key': key, 'label': label, 'value': numeric[0],
+                'columns': columns, 'numeric': numeric, 'rows': items}
+    if len(columns) == 2:
+        return {'kind': 'bars', 'key': key, 'label': label, 'value': numeric[0], 'rows': items}
+    return {'kind': 'table', 'key': key, 'columns': columns, 'numeric': numeric, 'rows': items}
+
+
+def _plan_object(key: Optional[str], obj: dict, depth: int) -> Optional[dict]:
+    """Section for a nested object: a KPI panel, or a group of sub-sections"""
+    if not obj:
+        return None
+    if all(_is_scalar(value) for value in obj.values()):
+        return {'kind': 'kpis', 'key': key, 'items': list(obj.items())}
+    if depth >= MAX_GROUP_DEPTH:
+        return None
+    children = []
+    for child_key, value in obj.items():
+        child = _plan_value(child_key, value, depth + 1)
+        if child is None:
+            return None
+        children.append(child)
+    return {'kind': 'group', 'key': key, 'children': children}
+
+
+def _plan_value(key: Optional[str], value: Any, depth: int) -> Optional[dict]:
+    if isinstance(value, list):
+        return _plan_list(key, value)
+    if isinstance(value, dict):
+        return _plan_object(key, value, depth)
+    return {'kind': 'kpis', 'key': key, 'items': [(key, value)]}
+
+
+def plan_dashboard(data: Any) -> Optional[dict]:
+    """
+    Match parsed JSON against the shapes the templates know how to show
+    
+    Supported: a title, scalar fields (meta chips or KPI cards), objects of
+    scalars (KPI panels), label/value arrays (bar lists), arrays keyed by a
+    date/day/month column (line chart + table), arrays of flat objects
+    (tables), arrays of scalars, and one level of objects grouping these.
+    
+    Args:
+        data: Parsed JSON data
+    
+    Returns:
+        dict with title, meta and sections, or None if the LLM should handle it
+    """
+    if isinstance(data, list):
+        section = _plan_list(None, data)
+        return {'title': None, 'meta': [], 'sections': [section]} if section else None
+    if not isinstance(data, dict) or not data:
+        return None
+    
+    title_key = next((key for key in TITLE_KEYS if isinstance(data.get(key), str)), None)
+    meta = []
+    kpis = []
+    sections = []
+    for key, value in data.items():
+        if key == title_key:
+            continue
+        if _is_number(value):
+            kpis.append((key, value))
+        elif _is_scalar(value):
+            meta.append((key, value))
+        else:
+            section = _plan_value(key, value, 1)
+            if section is None:
+                return None
+            sections.append(section)
+    if kpis:
+        sections.insert(0, {'kind': 'kpis', 'key': None, 'items': kpis})
+    if not sections and not meta:
+        return None
+    return {'title': data[title_key] if title_key else None, 'meta': meta, 'sections': sections}
+
+
+def _heading(key: Optional[str], level: int) -> str:
+    return f"<h{level}>{html.escape(humanize(key))}</h{level}>" if key is not None else ""
+
+
+def _render_kpis(section: dict) -> str:
+    cards = "".join(
+        f'<article class="kpi"><p class="kpi-label">{html.escape(humanize(key))}</p>'
+        f'<p class="kpi-value">{format_value(value)}</p></article>'
+        for key, value in section['items']
+    )
+    return f'<div class="kpi-grid">{cards}</div>'
+
+
+def _render_bars(section: dict) -> str:
+    label, value = section['label'], section['value']
+    peak = max(abs(row[value]) for row in section['rows']) or 1
+    rows = "".join(
+        f'<li class="bar-row"><span class="bar-label">{format_value(row[label])}</span>'
+        f'<div class="bar-track"><div class="bar-fill" style="width: {abs(row[value]) / peak * 100:.1f}%"></div></div>'
+        f'<span class="bar-value">{format_value(row[value])}</span></li>'
+        for row in section['rows']
+    )
+    return f'<ul class="bars" aria-label="{html.escape(humanize(value))}">{rows}</ul>'
+
+
+def _render_table(section: dict) -> str:
+    numeric = set(section['numeric'])
+    align = {column: ' class="num"' if column in numeric else "" for column in section['columns']}
+    head = "".join(
+        f"<th{align[column]}>{html.escape(humanize(column))}</th>" for column in section['columns']
+    )
+    body = "".join(
+        "<tr>" + "".join(f"<td{align[column]}>{format_value(row[column])}</td>" for column in section['columns']) + "</tr>"
+        for row in section['rows']
+    )
+    return f'<div class="table-wrap"><table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table></div>'
+
+
+def _render_series(section: dict) -> str:
+    label, value, rows = section['label'], section['value'], section['rows']
+    width, height, pad_x, pad_top, pad_bottom = 640, 260, 30, 20, 40
+    values = [row[value] for row in rows]
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    step = (width - 2 * pad_x) / (len(rows) - 1)
+    points = [
+        (pad_x + index * step, pad_top + (high - row[value]) / span * (height - pad_top - pad_bottom))
+        for index, row in enumerate(rows)
+    ]
+    line = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+    baseline = height - pad_bottom
+    area = f"{points[0][0]:.1f},{baseline} {line} {points[-1][0]:.1f},{baseline}"
+    # Every x label fits up to 12 points; beyond that, label about 8 of them
+    label_every = 1 if len(rows) <= 12 else -(-len(rows) // 8)
+    marks = "".join(
+        f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4.5"><title>{format_value(row[label])}: {format_value(row[value])}</title></circle>'
+        + (f'<text x="{x:.1f}" y="{height - 14}" text-anchor="middle">{format_value(row[label])}</text>'
+           if index % label_every == 0 else "")
+        for index, ((x, y), row) in enumerate(zip(points, rows))
+    )
+    chart = (
+        f'<svg class="chart" viewBox="0 0 {width} {height}" role="img" aria-label="{html.escape(humanize(value))}">'
+        f'<polygon class="area" points="{area}"></polygon><polyline class="line" points="{line}"></polyline>{marks}</svg>'
+        f'<p class="legend">{html.escape(humanize(value))}</p>'
+    )
+    return chart + _render_table(section)
+
+
+def _render_chips(section: dict) -> str:
+    return '<ul class="chips">' + "".join(f"<li>{format_value(value)}</li>" for value in section['values']) + "</ul>"
+
+
+_RENDERERS = {
+    'kpis': _render_kpis,
+    'bars': _render_bars,
+    'table': _render_table,
+    'series': _render_series,
+    'chips': _render_chips,
+}
+
+
+def _render_section(section: dict, level: int = 2) -> str:
+    if section['kind'] == 'group':
+        children = "".join(_render_section(child, level + 1) for child in section['children'])
+        return f'<section class="panel">{_heading(section["key"], level)}<div class="group">{children}</div></section>'
+    body = _RENDERERS[section['kind']](section)
+    if level > 2:
+        return f'<div>{_heading(section["key"], level)}{body}</div>'
+    return f'<section class="panel">{_heading(section["key"], level)}{body}</section>'
+
+
+def render_dashboard(data: Any, user_instructions: str = "") -> Optional[str]:
+    """
+    Render a complete dashboard page for data of a known shape
+    
+    Follows the SYSTEM_PROMPT rules: a self-contained HTML5 page with the
+    CSS in one <style> tag, every value copied exactly from the JSON, and
+    no symbols, units or text that are not in the data (labels come from
+    the JSON keys). Instructions asking for a dark look switch the theme;
+    other instructions are not interpreted.
+    
+    Args:
+        data: Parsed JSON data
+        user_instructions: User's design instructions
+    
+    Returns:
+        HTML document, or None if the data does not match a known shape
+    """
+    plan = plan_dashboard(data)
+    if plan is None:
+        return None
+    
+    theme = "theme-dark" if re.search(r"\b(dark|night)\b", user_instructions or "", re.IGNORECASE) else "theme-light"
+    title = plan['title']
+    header = ""
+    if title is not None or plan['meta']:
+        chips = "".join(
+            f'<li><span class="meta-label">{html.escape(humanize(key))}</span><span class="meta-value">{format_value(value)}</span></li>'
+            for key, value in plan['meta']
+        )
+        header = (
+            '<header class="dashboard-header">'
+            + (f"<h1>{html.escape(title)}</h1>" if title is not None else "")
+            + (f'<ul class="meta">{chips}</ul>' if chips else "")
+            + "</header>"
+        )
+    sections = "\n".join(_render_section(section) for section in plan['sections'])
+    
+    return (
+        "<!DOCTYPE html>\n"
+        '<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+        + (f"<title>{html.escape(title)}</title>\n" if title is not None else "")
+        + f"<style>{STYLE}</style>\n</head>\n"
+        f'<body class="{theme}">\n<main class="dashboard">\n{header}\n{sections}\n</main>\n</body>\n</html>\n'
+    )
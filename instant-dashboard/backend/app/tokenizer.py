@@ -0,0 +1,129 @@
+"""Offline token counting for prompt budgeting and usage metadata"""
+import logging
+import math
+import re
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pre-tokenizer split close to the Llama 3 / cl100k pattern, using only `re`
+_PRETOKENIZE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)"
+    r"|[^\r\n\w]?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?[^\s\w]+[\r\n]*"
+    r"|\s*[\r\n]"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+
+class _HeuristicTokenizer:
+    """
+    Fallback when no real tokenizer is available
+    
+    Splits text the way BPE pre-tokenizers do, then counts short pieces
+    as one token and long pieces as one token per 4 characters. That tracks
+    real BPE counts for JSON and HTML much better than len(text) // 4,
+    because whitespace runs and punctuation are counted as their own tokens.
+    Its counts are still estimates and are reported as such.
+    """
+    
+    name = "heuristic"
+    estimated = True
+    
+    def count(self, text: str) -> int:
+        total = 0
+        for piece in _PRETOKENIZE.findall(text):
+            length = len(piece)
+            total += 1 if length <= 6 else math.ceil(length / 4)
+        return total
+
+
+class _HuggingFaceTokenizer:
+    """Exact counts from a local tokenizer.json (e.g. the Llama 3 tokenizer)"""
+    
+    estimated = False
+    
+    def __init__(self, path: str):
+        from tokenizers import Tokenizer
+        
+        self._tokenizer = Tokenizer.from_file(path)
+        self.name = f"tokenizers:{path}"
+    
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class _TiktokenTokenizer:
+    """Counts from a locally cached tiktoken encoding"""
+    
+    estimated = False
+    
+    def __init__(self, encoding: str):
+        import tiktoken
+        
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+    
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def _load_tokenizer():
+    """
+    Pick the most accurate tokenizer available without network access
+    
+    Order: settings.TOKENIZER_PATH via `tokenizers`, then
+    settings.TIKTOKEN_ENCODING via `tiktoken`, then the heuristic counter.
+    """
+    if settings.TOKENIZER_PATH:
+        try:
+            return _HuggingFaceTokenizer(settings.TOKENIZER_PATH)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load tokenizer from {settings.TOKENIZER_PATH}: {str(e)}")
+    if settings.TIKTOKEN_ENCODING:
+        try:
+            return _TiktokenTokenizer(settings.TIKTOKEN_ENCODING)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load tiktoken encoding {settings.TIKTOKEN_ENCODING}: {str(e)}")
+    return _HeuristicTokenizer()
+
+
+_tokenizer = None
+
+
+def get_tokenizer():
+    """Return the process-wide tokenizer, loading it on first use"""
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = _load_tokenizer()
+        logger.info(f"🔢 Token counting with: {_tokenizer.name}")
+        if _tokenizer.estimated:
+            logger.warning("⚠️  No TOKENIZER_PATH or TIKTOKEN_ENCODING loaded; prompt sizes and "
+                           "token counts not reported by the API are estimates")
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text with the best available local tokenizer
+    
+    Args:
+        text: Text to count
+    
+    Returns:
+        Token count
+    """
+    return get_tokenizer().count(text)
+
+
+def tokenizer_name() -> str:
+    """Name of the tokenizer behind count_tokens (reported in metadata)"""
+    return get_tokenizer().name
+
+
+def tokens_estimated() -> bool:
+    """Whether count_tokens only estimates (no real tokenizer loaded)"""
+    return get_tokenizer().estimated
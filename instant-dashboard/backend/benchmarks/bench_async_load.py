@@ -0,0 +1,76 @@
+"""
+Load benchmark: blocking chain.invoke vs async chain.ainvoke
+
+Drives /generate-dashboard through the ASGI app in-process with a stub LLM,
+so no network access or Groq key is needed.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_async_load [--latency 0.5] [--levels 1,2,4,8,16]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+
+import httpx
+
+from app.main import app
+from app.llm_service import llm_service
+from benchmarks.stub_llm import install_stub
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "test_data.json"
+
+
+async def run_level(client: httpx.AsyncClient, payload: dict, concurrency: int) -> float:
+    """Fire `concurrency` simultaneous requests and return requests/second"""
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post("/generate-dashboard", json=payload) for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    for response in responses:
+        response.raise_for_status()
+    return concurrency / elapsed
+
+
+async def main(latency: float, levels: list) -> None:
+    install_stub(llm_service, latency=latency)
+    payload = {
+        "json_data": TEST_DATA.read_text(),
+        "user_prompt": "Modern dashboard with a bar chart of expenses",
+    }
+    
+    async_generate = llm_service.agenerate_dashboard
+    
+    async def blocking_generate(json_data_str, user_instructions, temperature=None, priority=None, **options):
+        # The pre-async behaviour: a synchronous invoke inside the event loop
+        # (options: parsed_data, data_format, render_mode as the endpoint passes them)
+        return llm_service.generate_dashboard(json_data_str, user_instructions, temperature, **options)
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"Stub LLM latency: {latency * 1000:.0f}ms")
+        print(f"{'concurrency':>11} | {'blocking rps':>12} | {'async rps':>9} | {'speedup':>7}")
+        print("-" * 50)
+        for concurrency in levels:
+            llm_service.agenerate_dashboard = blocking_generate
+            blocking_rps = await run_level(client, payload, concurrency)
+            llm_service.agenerate_dashboard = async_generate
+            async_rps = await run_level(client, payload, concurrency)
+            print(f"{concurrency:>11} | {blocking_rps:>12.2f} | {async_rps:>9.2f} | {async_rps / blocking_rps:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.latency, [int(level) for level in args.levels.split(",")]))
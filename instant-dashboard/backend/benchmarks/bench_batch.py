@@ -0,0 +1,82 @@
+"""
+Batch benchmark: N sequential generations vs one agenerate_batch call
+
+Uses the in-process stub LLM, so no network access or Groq key is needed.
+Part of the items are exact duplicates, which the batch generates once.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_batch [--latency 0.5] [--items 24] [--unique 16] [--concurrency 1,4,8]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+
+from app.llm_service import llm_service
+from benchmarks.stub_llm import install_stub
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "test_data.json"
+
+
+def make_items(count: int, unique: int) -> list:
+    """Build `count` batch items cycling through `unique` distinct prompts"""
+    json_data = TEST_DATA.read_text()
+    return [
+        {
+            "json_data_str": json_data,
+            "user_instructions": f"Modern dashboard, variant {index % unique}",
+        }
+        for index in range(count)
+    ]
+
+
+async def run_sequential(items: list) -> float:
+    """Generate every item one after another; returns wall-clock seconds"""
+    start = time.perf_counter()
+    for item in items:
+        await llm_service.agenerate_dashboard(**item)
+    return time.perf_counter() - start
+
+
+async def run_batch(items: list, concurrency: int) -> float:
+    """Generate the items through agenerate_batch; returns wall-clock seconds"""
+    start = time.perf_counter()
+    results = await llm_service.agenerate_batch([dict(item) for item in items], max_concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if not result['success']]
+    if failed:
+        raise RuntimeError(f"{len(failed)} batch items failed: {failed[0]['error']}")
+    return elapsed
+
+
+async def main(latency: float, count: int, unique: int, levels: list) -> None:
+    install_stub(llm_service, latency=latency)
+    items = make_items(count, unique)
+    
+    print(f"Stub LLM latency: {latency * 1000:.0f}ms, {count} items ({unique} unique)")
+    sequential = await run_sequential(items)
+    print(f"{'mode':>22} | {'wall time':>9} | {'speedup':>7}")
+    print("-" * 46)
+    print(f"{'sequential':>22} | {sequential:>8.2f}s | {1:>6.1f}x")
+    for concurrency in levels:
+        elapsed = await run_batch(items, concurrency)
+        label = f"batch, concurrency {concurrency}"
+        print(f"{label:>22} | {elapsed:>8.2f}s | {sequential / elapsed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument("--items", type=int, default=24, help="number of batch items")
+    parser.add_argument("--unique", type=int, default=16, help="distinct items among them")
+    parser.add_argument("--concurrency", default="1,4,8", help="comma-separated batch concurrency levels")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.latency, args.items, args.unique, [int(level) for level in args.concurrency.split(",")]))
@@ -0,0 +1,78 @@
+"""
+Mixed-temperature load test: per-request ChatGroq clients vs the chain pool
+
+Runs LLMService.agenerate_dashboard against the local stub server with a
+rotating set of temperature overrides, once with pooling disabled
+(LLM_CLIENT_POOL_SIZE=0, the old behaviour) and once with the pool.
+Reports the chain_ms / llm_ms split and how many TCP connections the
+stub saw.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_client_pool [--requests 80] [--concurrency 4] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+
+import httpx
+
+from app.config import settings
+from app.llm_service import LLMService
+from benchmarks.stub_llm import BackgroundServer
+from benchmarks.stub_server import create_stub_app
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "test_data.json"
+TEMPERATURES = [0.1, 0.4, 0.7, 1.0]
+
+
+async def run(service: LLMService, requests: int, concurrency: int) -> list:
+    """Generate `requests` dashboards with rotating temperatures; return latency dicts"""
+    payload = TEST_DATA.read_text()
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(index: int) -> dict:
+        async with semaphore:
+            result = await service.agenerate_dashboard(
+                payload, f"Dashboard variant {index}", temperature=TEMPERATURES[index % len(TEMPERATURES)]
+            )
+            return result['latency']
+    
+    return await asyncio.gather(*[one(index) for index in range(requests)])
+
+
+async def main(requests: int, concurrency: int, latency: float) -> None:
+    with BackgroundServer(create_stub_app(latency=latency)) as stub_url:
+        settings.GROQ_API_BASE = stub_url
+        print(f"Stub latency: {latency * 1000:.0f}ms, {requests} requests, concurrency {concurrency}, "
+              f"temperatures {TEMPERATURES}")
+        print(f"{'mode':<10} | {'chain_ms p50':>12} | {'chain_ms max':>12} | {'llm_ms p50':>10} | {'connections':>11}")
+        print("-" * 68)
+        for pool_size in (0, 8):
+            settings.LLM_CLIENT_POOL_SIZE = pool_size
+            service = LLMService()
+            httpx.post(f"{stub_url}/stats/reset")
+            latencies = await run(service, requests, concurrency)
+            connections = httpx.get(f"{stub_url}/stats").json()["connections"]
+            chain = [item['chain_ms'] for item in latencies]
+            llm = [item['llm_ms'] for item in latencies]
+            mode = "pooled" if pool_size else "per-req"
+            print(f"{mode:<10} | {statistics.median(chain):>12.2f} | {max(chain):>12.2f} | "
+                  f"{statistics.median(llm):>10.2f} | {connections:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server latency in seconds")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
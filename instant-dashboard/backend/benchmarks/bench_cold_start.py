@@ -0,0 +1,131 @@
+"""
+Cold-start benchmark: import time of app.main, boot time and first-request latency
+
+Every measurement runs in a fresh interpreter, so nothing is already
+imported or cached:
+
+  import ms        `import app.main` in a new process (and whether LangChain,
+                   langchain_groq or httpx got imported with it)
+  /health ms       spawning `uvicorn app.main:app` until /health answers
+  llm_ready ms     until /health reports llm_ready (the background warm-up is done)
+  first / second   the first two LLM requests once ready, with the fake
+                   backend (LLM_BACKEND=fake, no latency)
+
+Boot is measured with LLM_WARMUP=true (LangChain built on a background
+thread at startup; requests are sent once /health reports llm_ready) and
+LLM_WARMUP=false (built by the first request, sent as soon as /health answers).
+
+Pass --max-import-ms to exit with status 1 when the median import time is
+over budget or LangChain is imported by app.main, so a regression fails CI.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_cold_start [--runs 5] [--max-import-ms 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_load import BACKEND_DIR, free_port
+
+TEST_DATA = (BACKEND_DIR.parent / "test_data.json").read_text()
+HEAVY_MODULES = ("langchain_core", "langchain_groq", "httpx")
+
+IMPORT_SNIPPET = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def environment(**overrides: str) -> dict:
+    """Environment for the measured process: fake backend, no caches, quiet logs"""
+    env = {**os.environ, "LLM_BACKEND": "fake", "FAKE_LLM_LATENCY": "0", "CACHE_ENABLED": "false",
+           "SINGLEFLIGHT_ENABLED": "false", "RENDER_MODE": "llm", "LOG_MODE": "structured"}
+    env.update(overrides)
+    return env
+
+
+def measure_import() -> dict:
+    """Import app.main in a fresh interpreter; returns {'ms', 'heavy'}"""
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=environment(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_boot(warmup: bool) -> tuple:
+    """Spawn uvicorn; returns (ms until /health answers, ms until llm_ready or None, first and second request ms)"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    payload = {"json_data": TEST_DATA, "user_prompt": "Dashboard of monthly expenses"}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=environment(LLM_WARMUP=str(warmup).lower()),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                httpx.get(f"{base_url}/health", timeout=1).raise_for_status()
+                break
+            except httpx.TransportError:
+                time.sleep(0.005)
+        health_ms = (time.perf_counter() - start) * 1000
+        ready_ms = None
+        if warmup:
+            while not httpx.get(f"{base_url}/health").json()["llm_ready"]:
+                time.sleep(0.005)
+            ready_ms = (time.perf_counter() - start) * 1000
+        
+        request_ms = []
+        with httpx.Client(base_url=base_url, timeout=None) as client:
+            for number in range(2):
+                request_start = time.perf_counter()
+                client.post("/generate-dashboard", json={**payload, "user_prompt": f"{payload['user_prompt']} {number}"}
+                            ).raise_for_status()
+                request_ms.append((time.perf_counter() - request_start) * 1000)
+        return health_ms, ready_ms, request_ms[0], request_ms[1]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(runs: int, max_import_ms: float) -> int:
+    imports = [measure_import() for _ in range(runs)]
+    import_ms = statistics.median(item['ms'] for item in imports)
+    heavy = sorted({name for item in imports for name in item['heavy']})
+    print(f"import app.main: {import_ms:.0f}ms median of {runs}; "
+          f"imported with it: {', '.join(heavy) if heavy else 'none of ' + ', '.join(HEAVY_MODULES)}")
+    
+    print(f"{'LLM_WARMUP':<10} | {'/health ms':>10} | {'llm_ready ms':>12} | {'first ms':>9} | {'second ms':>9}")
+    print("-" * 63)
+    for warmup in (True, False):
+        health, ready, first, second = zip(*[measure_boot(warmup) for _ in range(runs)])
+        ready_text = f"{statistics.median(ready):>12.0f}" if warmup else f"{'-':>12}"
+        print(f"{str(warmup).lower():<10} | {statistics.median(health):>10.0f} | {ready_text} | "
+              f"{statistics.median(first):>9.1f} | {statistics.median(second):>9.1f}")
+    
+    if max_import_ms and (import_ms > max_import_ms or "langchain_core" in heavy):
+        print(f"FAIL: import budget is {max_import_ms:.0f}ms and LangChain must not be imported by app.main")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement (median reported)")
+    parser.add_argument("--max-import-ms", type=float, default=0, help="fail above this import time; 0 = report only")
+    args = parser.parse_args()
+    
+    sys.exit(main(args.runs, args.max_import_ms))
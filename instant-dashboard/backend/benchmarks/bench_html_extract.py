@@ -0,0 +1,109 @@
+"""
+HTML extraction benchmark: regex + full-copy validation vs the single-pass scanner
+
+Runs the old extract/validate steps (non-greedy re.DOTALL search, then
+lowercasing a full copy of the document to look at its first 100
+characters) and app.html_extract.extract_html + needs_doctype over a
+corpus of LLM outputs. The corpus covers the shapes Groq returns: fenced,
+fenced with chatter around it, other fence tags, unfenced, and outputs cut
+off by MAX_TOKENS, at a typical 4096-token size and larger. "same HTML"
+is "no" where the regex was wrong: it keeps the tag of a ```HTML fence
+in the document and leaves the opening fence on truncated output.
+
+Pass --recordings DIR to run over recorded raw LLM outputs instead
+(every *.txt / *.md / *.html file in DIR).
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_html_extract [--repeat 200] [--recordings DIR]
+"""
+import argparse
+import re
+import time
+from pathlib import Path
+
+from app.html_extract import DOCTYPE, extract_html, needs_doctype
+from benchmarks.stub_llm import STUB_HTML
+
+
+def legacy_extract(content: str) -> str:
+    """The former LLMService._extract_html"""
+    match = re.search(r'```(?:html)?\s*(.*?)\s*```', content, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    return content.strip()
+
+
+def legacy_validate(html_content: str) -> str:
+    """The former step 7 of LLMService._finalize_generation"""
+    html_lower = html_content.strip().lower()
+    if not (html_lower.startswith('<!doctype') or html_lower.startswith('<html') or '<html' in html_lower[:100]):
+        if '<' in html_content and '>' in html_content:
+            if not html_lower.startswith('<!doctype'):
+                html_content = '<!DOCTYPE html>\n' + html_content
+        else:
+            raise ValueError("Generated content is not valid HTML")
+    return html_content
+
+
+def validate(html_content: str) -> str:
+    """Step 7 as it is now: only the head of the document is inspected"""
+    if needs_doctype(html_content):
+        if '<' in html_content and '>' in html_content:
+            return DOCTYPE + html_content
+        raise ValueError("Generated content is not valid HTML")
+    return html_content
+
+
+def document(rows: int) -> str:
+    """A dashboard document with `rows` table rows (about 60 chars each)"""
+    body = "\n".join(f"<tr><td>Item {i}</td><td>{i * 37 % 1000}</td><td>{i * 13.5}</td></tr>" for i in range(rows))
+    return STUB_HTML.replace("</body>", f"<table>\n{body}\n</table>\n</body>")
+
+
+def corpus() -> dict:
+    """Synthetic raw outputs; 250 rows is about the 16 KB of a 4096-token completion"""
+    outputs = {}
+    for label, rows in (("4k tokens", 250), ("200 KB", 3300)):
+        doc = document(rows)
+        outputs[f"fenced, {label}"] = f"```html\n{doc}\n```"
+        outputs[f"chatter + fence, {label}"] = f"Here is your dashboard:\n\n```html\n{doc}\n```\n\nLet me know if you need changes."
+        outputs[f"```HTML tag, {label}"] = f"```HTML\n{doc}\n```"
+        outputs[f"unfenced, {label}"] = f"\n{doc}\n"
+        outputs[f"truncated fence, {label}"] = f"```html\n{doc[:len(doc) * 3 // 4]}"
+        outputs[f"truncated unfenced, {label}"] = doc[:len(doc) * 3 // 4]
+    return outputs
+
+
+def per_call_us(function, content: str, repeat: int) -> float:
+    """Mean microseconds per function(content) call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(content)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(repeat: int, recordings: str) -> None:
+    if recordings:
+        paths = sorted(p for p in Path(recordings).iterdir() if p.suffix in (".txt", ".md", ".html"))
+        outputs = {path.name: path.read_text() for path in paths}
+    else:
+        outputs = corpus()
+    
+    print(f"{'output':<30} | {'KB':>5} | {'regex us':>9} | {'scanner us':>10} | {'speedup':>7} | {'complete':>8} | {'same HTML':>9}")
+    print("-" * 97)
+    for name, content in outputs.items():
+        old_us = per_call_us(lambda text: legacy_validate(legacy_extract(text)), content, repeat)
+        new_us = per_call_us(lambda text: validate(extract_html(text)[0]), content, repeat)
+        html_content, complete = extract_html(content)
+        same = validate(html_content) == legacy_validate(legacy_extract(content))
+        print(f"{name[:30]:<30} | {len(content) / 1024:>5.0f} | {old_us:>9.1f} | {new_us:>10.1f} | "
+              f"{old_us / new_us:>6.1f}x | {'yes' if complete else 'NO':>8} | {'yes' if same else 'no':>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="calls per output and implementation")
+    parser.add_argument("--recordings", default="", help="directory of recorded raw LLM outputs")
+    args = parser.parse_args()
+    
+    main(args.repeat, args.recordings)
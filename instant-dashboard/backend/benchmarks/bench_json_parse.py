@@ -0,0 +1,76 @@
+"""
+JSON parsing benchmark: double stdlib parse vs single parse with the fast backend
+
+"before" mirrors the old request path: DashboardRequest validated json_data
+with json.loads and LLMService parsed it again. "after" is one parse with
+app.json_backend, carried through the request.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_json_parse [--sizes 1KB,100KB,1MB,10MB,50MB]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from app import json_backend
+
+UNITS = {"KB": 1024, "MB": 1024 * 1024}
+
+
+def parse_size(text: str) -> int:
+    """Convert '10MB' / '1KB' to a byte count"""
+    return int(text[:-2]) * UNITS[text[-2:].upper()]
+
+
+def make_payload(target_bytes: int) -> str:
+    """Build a JSON document of roughly target_bytes with a realistic row shape"""
+    row = {"id": 0, "region": "North America", "product": "Enterprise Suite Pro",
+           "revenue": 1245000.5, "orders": 542, "active": True, "tags": ["b2b", "annual"]}
+    row_bytes = len(json.dumps(row)) + 1
+    rows = [dict(row, id=i) for i in range(max(1, target_bytes // row_bytes))]
+    return json.dumps({"report_title": "Synthetic Sales Export", "currency": "USD", "rows": rows})
+
+
+def measure(fn, payload: str, repeat: int = 3) -> tuple:
+    """Return (best elapsed ms, peak traced MB) for fn(payload)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - start)
+    
+    # Memory is traced in a separate run; tracemalloc distorts timings
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings) * 1000, peak / (1024 * 1024)
+
+
+def before(payload: str):
+    json.loads(payload)          # validator result, thrown away
+    return json.loads(payload)   # service re-parse
+
+
+def after(payload: str):
+    return json_backend.loads(payload)
+
+
+def main(sizes: list) -> None:
+    print(f"Fast backend: {json_backend.BACKEND}")
+    print(f"{'size':>6} | {'before ms':>10} | {'after ms':>9} | {'speedup':>7} | {'before MB':>9} | {'after MB':>8}")
+    print("-" * 66)
+    for size in sizes:
+        payload = make_payload(parse_size(size))
+        before_ms, before_mb = measure(before, payload)
+        after_ms, after_mb = measure(after, payload)
+        print(f"{size:>6} | {before_ms:>10.2f} | {after_ms:>9.2f} | {before_ms / after_ms:>6.1f}x | "
+              f"{before_mb:>9.1f} | {after_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1KB,100KB,1MB,10MB,50MB", help="comma-separated payload sizes")
+    args = parser.parse_args()
+    main(args.sizes.split(","))
@@ -0,0 +1,241 @@
+"""
+Incremental JSON parser vs json.loads: agreement over random chunkings, then throughput
+
+Generates random documents (escapes, \\u escapes and surrogate pairs,
+multibyte UTF-8, big ints, floats with exponents, nested arrays and
+objects, empty containers, assorted whitespace) and feeds each one to
+IncrementalJSONParser split at random byte offsets, including 1-byte
+chunks that cut tokens and UTF-8 sequences in half:
+
+  exact     profiling off: close() must equal json.loads, types included
+            (1 vs 1.0, key order); repeated with ELEMENT_LIMIT cut to just
+            above the longest scalar generated, so objects are also walked
+            key by key, and with a tiny DECODE_RETRY_BYTES
+  invalid   truncated and corrupted documents: the parser must fail exactly
+            when json.loads does, and agree with it otherwise
+  profiled  small array_threshold: close() must equal streamed_reference,
+            i.e. summarize_data with the parser's bottom-up profiling order
+            (see IncrementalJSONParser); documents where that differs from
+            summarize_data(json.loads(doc)) are counted
+
+Then times the parser on a large export per chunk size against json.loads.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_json_stream [--docs 300] [--size 20MB]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from unittest import mock
+
+from app import json_stream
+from app.json_stream import IncrementalJSONParser
+from app.profiling import ArrayProfiler, count_profiles, summarize_data
+from benchmarks.bench_json_parse import make_payload, parse_size
+
+CHARACTERS = ['a', 'Z', ' ', '"', '\\', '/', '\n', '\t', '\x00', '\x1f', 'é', 'ß', '中', '€', '😀', ' ']
+WHITESPACE = ['', ' ', '\n', '\t', '\r\n  ']
+CHUNK_SIZES = (4 * 1024, 64 * 1024, 1024 * 1024)
+# Longer than any scalar random_scalar makes (12 characters, each escaped as \uXXXX\uXXXX)
+SMALL_ELEMENT_LIMIT = 160
+# (ELEMENT_LIMIT, DECODE_RETRY_BYTES) pairs of the exact check: the defaults, then
+# small enough that objects are walked and retries are capped within tiny documents
+LIMITS = ((json_stream.ELEMENT_LIMIT, json_stream.DECODE_RETRY_BYTES), (SMALL_ELEMENT_LIMIT, 8))
+
+
+def random_scalar(rng: random.Random):
+    kind = rng.randrange(7)
+    if kind == 0:
+        return "".join(rng.choice(CHARACTERS) for _ in range(rng.randrange(12)))
+    if kind == 1:
+        return rng.choice([0, -1, 7, 10 ** 20 + 1, -(10 ** 30), 2 ** 64])
+    if kind == 2:
+        return rng.choice([0.5, -0.0, 1e-7, 2.5e20, 1.0, -3.25, 6.02e+23])
+    if kind == 3:
+        return rng.randrange(-10 ** 6, 10 ** 6)
+    return rng.choice([True, False, None, ""])
+
+
+def random_value(rng: random.Random, depth: int = 0, long_arrays: bool = False):
+    """A random JSON value; long_arrays adds arrays past the profiling threshold used below"""
+    kind = rng.randrange(6) if depth < 4 else 0
+    if kind in (0, 1):
+        return random_scalar(rng)
+    if kind in (2, 3):
+        length = rng.choice([0, 1, 3, 12, 30]) if long_arrays else rng.randrange(5)
+        if rng.random() < 0.5:
+            # Homogeneous rows, the shape profiling is for
+            return [{"id": i, "name": random_scalar(rng), "v": random_scalar(rng)} for i in range(length)]
+        return [random_value(rng, depth + 1, long_arrays) for _ in range(length)]
+    return {"".join(rng.choice(CHARACTERS) for _ in range(rng.randrange(6))): random_value(rng, depth + 1, long_arrays)
+            for _ in range(rng.randrange(5))}
+
+
+def serialize(rng: random.Random, value) -> bytes:
+    """Random but valid formatting: ASCII escapes or raw UTF-8, compact or indented"""
+    text = json.dumps(value, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 0, 2]),
+                      separators=rng.choice([None, (",", ":"), (" , ", " : ")]))
+    return (rng.choice(WHITESPACE) + text + rng.choice(WHITESPACE)).encode()
+
+
+def chunkings(rng: random.Random, doc: bytes) -> list:
+    """Ways to split doc: whole, 1-byte, small and large random chunks"""
+    splits = [[doc], [doc[i:i + 1] for i in range(len(doc))]]
+    for largest in (8, 4096):
+        chunks, pos = [], 0
+        while pos < len(doc):
+            step = rng.randint(1, largest)
+            chunks.append(doc[pos:pos + step])
+            pos += step
+        splits.append(chunks)
+    return splits
+
+
+def streamed(chunks: list, **options):
+    """('ok', canonical result) or ('error', None) from IncrementalJSONParser"""
+    parser = IncrementalJSONParser(**options)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+        result = parser.close()
+    except ValueError:
+        return 'error', None
+    return 'ok', canonical(result)
+
+
+def loaded(doc: bytes):
+    """('ok', canonical result) or ('error', None) from json.loads"""
+    try:
+        return 'ok', canonical(json.loads(doc.decode("utf-8")))
+    except ValueError:
+        return 'error', None
+
+
+def canonical(value) -> tuple:
+    """Comparable form that tells 1 from 1.0 and keeps key order and profile count"""
+    return json.dumps(value), count_profiles(value)
+
+
+def streamed_reference(data, array_threshold: int, sample_rows: int, top_k: int):
+    """
+    What IncrementalJSONParser.close() returns for data, modelled on the parsed document
+    
+    Arrays are profiled bottom-up while they stream in, so an array inside a
+    long array reaches the outer profile as a profile, not as a list; objects
+    are decoded whole (documents here stay far below ELEMENT_LIMIT) and are
+    summarized afterwards, which also reaches into the sample rows of the
+    profiles made while streaming.
+    """
+    def profile_arrays(value):
+        if not isinstance(value, list):
+            return value
+        items = [profile_arrays(item) for item in value]
+        if len(items) > array_threshold:
+            return ArrayProfiler(sample_rows, top_k).extend(items).profile()
+        return items
+    
+    return summarize_data(profile_arrays(data), array_threshold, sample_rows, top_k)
+
+
+def check_exact(rng: random.Random, docs: int) -> list:
+    failures = []
+    for n in range(docs):
+        doc = serialize(rng, random_value(rng))
+        expected = loaded(doc)
+        for chunks in chunkings(rng, doc):
+            for element_limit, retry_bytes in LIMITS:
+                with mock.patch.object(json_stream, "ELEMENT_LIMIT", element_limit), \
+                        mock.patch.object(json_stream, "DECODE_RETRY_BYTES", retry_bytes):
+                    got = streamed(chunks, array_threshold=10 ** 9)
+                if got != expected:
+                    failures.append(f"exact: doc {n} ({len(chunks)} chunks, ELEMENT_LIMIT={element_limit}) "
+                                    f"gave {got[1]!r:.120} instead of {expected[1]!r:.120} for {doc[:120]!r}")
+    return failures
+
+
+def check_invalid(rng: random.Random, docs: int) -> list:
+    failures = []
+    for n in range(docs):
+        doc = serialize(rng, random_value(rng))
+        variants = [doc[:rng.randrange(len(doc) + 1)], doc + rng.choice([b"x", b"]", b"}", b",", b" 1", b"\xff"])]
+        corrupted = bytearray(doc)
+        corrupted[rng.randrange(len(doc))] = rng.choice(b'[]{}:,"\\-.e0 x\x80')
+        variants.append(bytes(corrupted))
+        for variant in variants:
+            expected = loaded(variant)
+            for chunks in chunkings(rng, variant):
+                got = streamed(chunks, array_threshold=10 ** 9)
+                if got != expected:
+                    failures.append(f"invalid: variant of doc {n} ({len(chunks)} chunks) gave {got[0]} "
+                                    f"where json.loads gave {expected[0]} for {variant[:120]!r}")
+    return failures
+
+
+def check_profiled(rng: random.Random, docs: int) -> tuple:
+    """Failures, and how many documents stream to something other than summarize_data(json.loads(doc))"""
+    options = {'array_threshold': 8, 'sample_rows': 3, 'top_k': 3}
+    failures, reordered = [], 0
+    for n in range(docs):
+        data = random_value(rng, long_arrays=True)
+        doc = serialize(rng, data)
+        data = json.loads(doc)
+        expected = ('ok', canonical(streamed_reference(data, **options)))
+        if expected != ('ok', canonical(summarize_data(data, **options))):
+            reordered += 1
+        for chunks in chunkings(rng, doc):
+            got = streamed(chunks, **options)
+            if got != expected:
+                failures.append(f"profiled: doc {n} ({len(chunks)} chunks) gave {got[1]!r:.120} "
+                                f"instead of {expected[1]!r:.120}")
+    return failures, reordered
+
+
+def throughput(size: int) -> None:
+    payload = make_payload(size).encode()
+    mb = len(payload) / (1024 * 1024)
+    
+    start = time.perf_counter()
+    json.loads(payload)
+    elapsed = time.perf_counter() - start
+    print(f"{'json.loads':>16} | {elapsed * 1000:>9.1f} | {mb / elapsed:>7.1f}")
+    for chunk_size in CHUNK_SIZES:
+        start = time.perf_counter()
+        parser = IncrementalJSONParser()
+        for pos in range(0, len(payload), chunk_size):
+            parser.feed(payload[pos:pos + chunk_size])
+        parser.close()
+        elapsed = time.perf_counter() - start
+        print(f"{f'{chunk_size // 1024}KB chunks':>16} | {elapsed * 1000:>9.1f} | {mb / elapsed:>7.1f}")
+
+
+def main(docs: int, size: str, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = check_exact(rng, docs) + check_invalid(rng, docs)
+    profiled_failures, reordered = check_profiled(rng, docs)
+    failures += profiled_failures
+    print(f"Checked {docs} documents per mode over 4 chunkings each (seed {seed})")
+    print(f"Profiled documents whose nested arrays were profiled bottom-up: {reordered}/{docs}")
+    
+    print()
+    print(f"Throughput on a {size} export")
+    print(f"{'parser':>16} | {'ms':>9} | {'MB/s':>7}")
+    print("-" * 38)
+    throughput(parse_size(size))
+    
+    for failure in failures[:20]:
+        print(f"FAIL: {failure}")
+    if len(failures) > 20:
+        print(f"FAIL: ... and {len(failures) - 20} more")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=300, help="random documents per check")
+    parser.add_argument("--size", default="20MB", help="size of the export timed at the end")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the document generator")
+    args = parser.parse_args()
+    
+    sys.exit(main(args.docs, args.size, args.seed))
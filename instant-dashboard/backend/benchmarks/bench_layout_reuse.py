@@ -0,0 +1,164 @@
+"""
+Layout reuse benchmark: hourly refreshes of one report with new values
+
+Sends the same report (same keys, types and array lengths, new numbers each
+hour) to the /generate-dashboard handler with layout reuse off and on. The
+stub LLM writes a page showing the values it was given, standing in for
+Groq. Two layouts are tried:
+
+  table: values only in text nodes, so every refresh after the first is refilled
+  chart: values also in a <script> chart, so the mapping is ambiguous and
+         every refresh goes back to the LLM
+
+so only the table case measures reuse. First, a page whose short values
+("Q1", "1") also appear in a heading and a page number is checked: changing
+them must send the request back to the LLM instead of rewriting that text.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_layout_reuse [--latency 1.0] [--hours 24]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+
+from app.cache import ResponseCache
+from app.layout_cache import build_layout, describe, fill_layout
+from app.main import generate_dashboard
+from app.models import DashboardRequest
+from app.llm_service import llm_service
+from benchmarks.stub_llm import install_stub
+
+REGIONS = ["North America", "Europe", "Asia Pacific", "Latin America", "Middle East", "Africa"]
+USER_PROMPT = "Clean dashboard with a KPI row and a table of regions"
+
+
+def report(hour: int) -> dict:
+    """Hourly sales snapshot: same structure every hour, new numbers"""
+    rng = random.Random(hour)
+    return {
+        "report_title": "Regional Sales (hourly)",
+        "refreshed_at": f"2025-03-14T{hour % 24:02d}:00:00Z",
+        "orders": rng.randint(1000, 5000),
+        "revenue": round(rng.uniform(50000, 90000), 2),
+        "regions": [{"region": name, "orders": rng.randint(50, 900), "revenue": round(rng.uniform(2000, 20000), 2)}
+                    for name in REGIONS],
+    }
+
+
+def llm_page(data: dict, chart: bool) -> str:
+    """The page an LLM might write for this data (values copied verbatim)"""
+    rows = "\n".join(
+        f"<tr><td>{row['region']}</td><td>{row['orders']}</td><td>{row['revenue']}</td></tr>"
+        for row in data["regions"]
+    )
+    script = ""
+    if chart:
+        script = f"<script>const revenue = {json.dumps([row['revenue'] for row in data['regions']])};</script>"
+    return f"""```html
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{data['report_title']}</title>
+<style>body {{ font-family: system-ui; margin: 2rem; }} .kpi {{ padding: 1rem; border-radius: 12px; }}</style>
+</head>
+<body>
+<h1>{data['report_title']}</h1>
+<p class="muted">Refreshed {data['refreshed_at']}</p>
+<section class="kpis"><div class="kpi"><span>Orders</span><strong>{data['orders']}</strong></div>
+<div class="kpi"><span>Revenue</span><strong>{data['revenue']}</strong></div></section>
+<table><thead><tr><th>Region</th><th>Orders</th><th>Revenue</th></tr></thead>
+<tbody>
+{rows}
+</tbody></table>
+{script}
+</body>
+</html>
+```"""
+
+
+SHORT_VALUES_PAGE = """<!DOCTYPE html>
+<html><body>
+<h1>Q1 results</h1>
+<table><tr><td>North America</td><td>Q1</td><td>1</td></tr></table>
+<footer>Page <span>1</span></footer>
+</body></html>"""
+
+
+def check_short_values() -> list:
+    """Failures of the refill of SHORT_VALUES_PAGE, whose short values are ambiguous"""
+    data = {"region": "North America", "quarter": "Q1", "rank": 1}
+    layout = build_layout(SHORT_VALUES_PAGE, describe(data)[1])
+    if layout is None:
+        return ["short values: layout not recorded"]
+    failures = []
+    refilled = fill_layout(layout, describe({**data, "region": "Europe"})[1])
+    if refilled != SHORT_VALUES_PAGE.replace("North America", "Europe"):
+        failures.append(f"short values: region refill gave {refilled!r}")
+    for changed in ({"quarter": "Q2"}, {"rank": 2}):
+        refilled = fill_layout(layout, describe({**data, **changed})[1])
+        if refilled is not None:
+            failures.append(f"short values: {changed} was refilled instead of regenerated: {refilled!r}")
+    return failures
+
+
+async def refreshes(hours: int, chart: bool, reuse: bool, stub) -> tuple:
+    """Run `hours` refreshes; returns (mean ms, LLM calls, renderers seen, every page correct)"""
+    llm_service.layouts = ResponseCache(max_entries=16) if reuse else None
+    stub.calls = 0
+    renderers = set()
+    correct = True
+    elapsed = 0.0
+    for hour in range(hours):
+        data = report(hour)
+        stub.response = llm_page(data, chart)
+        request = DashboardRequest(json_data=json.dumps(data), user_prompt=USER_PROMPT)
+        start = time.perf_counter()
+        response = await generate_dashboard(request, response_format="json", if_none_match=None)
+        elapsed += time.perf_counter() - start
+        response = json.loads(response.body)
+        renderers.add(response["metadata"]["renderer"])
+        # A refilled page must be exactly the page the LLM would have written for this hour
+        expected = llm_page(data, chart).split("\n", 1)[1].rsplit("\n", 1)[0]
+        correct = correct and response["html_content"] == expected
+    return elapsed / hours * 1000, stub.calls, ", ".join(sorted(renderers)), correct
+
+
+async def main(latency: float, hours: int) -> int:
+    failures = check_short_values()
+    stub = install_stub(llm_service, latency=latency)
+    print(f"Stub LLM latency: {latency * 1000:.0f}ms, {hours} hourly refreshes")
+    print(f"{'layout':<6} | {'reuse':<5} | {'mean ms':>9} | {'LLM calls':>9} | {'renderers':<11} | {'pages correct':<13}")
+    print("-" * 68)
+    for chart in (False, True):
+        for reuse in (False, True):
+            mean_ms, calls, renderers, correct = await refreshes(hours, chart, reuse, stub)
+            print(f"{'chart' if chart else 'table':<6} | {'on' if reuse else 'off':<5} | {mean_ms:>9.2f} | "
+                  f"{calls:>9} | {renderers:<11} | {'yes' if correct else 'NO':<13}")
+            if not correct:
+                failures.append(f"{'chart' if chart else 'table'} layout, reuse {'on' if reuse else 'off'}: "
+                                f"a page differed from the LLM's")
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=1.0, help="stub LLM latency in seconds")
+    parser.add_argument("--hours", type=int, default=24, help="refreshes per run")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    sys.exit(asyncio.run(main(args.latency, args.hours)))
@@ -0,0 +1,187 @@
+"""
+Offline load test: throughput, latency percentiles and server memory of app.main:app
+
+Starts `uvicorn app.main:app` in a subprocess with LLM_BACKEND=fake, so no
+network access or Groq key is needed. With --backend server the app keeps
+the groq backend instead and talks to benchmarks.stub_server (also started
+locally) through GROQ_API_BASE, which exercises the real Groq client and
+HTTP stack.
+
+Each scenario is a closed loop: --concurrency clients send requests back to
+back until --requests have completed, after --warmup unmeasured ones. The
+payloads and request order are fixed, so runs are reproducible:
+
+  llm       POST /generate-dashboard, render_mode=llm, a new prompt each time (cache miss)
+  stream    POST /generate-dashboard/stream, render_mode=llm, a new prompt each time
+  cached    POST /generate-dashboard, the same request every time (cache hit)
+  template  POST /generate-dashboard, render_mode=template (no LLM call)
+
+Memory is the server's resident set after each scenario and its peak
+(VmRSS / VmHWM from /proc; shown as "-" where /proc is not available).
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_load [--backend fake|server] [--concurrency 16] [--requests 400]
+                                    [--latency 0.5] [--tokens-per-second 0] [--scenarios llm,stream,cached,template]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PAYLOAD = (BACKEND_DIR.parent / "test_cases" / "complex_sales_dashboard.json").read_text()
+SCENARIOS = ("llm", "stream", "cached", "template")
+
+
+def free_port() -> int:
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_mb(pid: int) -> tuple:
+    """(current, peak) resident set of a process in MB, or (None, None) without /proc"""
+    try:
+        fields = dict(line.split(":", 1) for line in Path(f"/proc/{pid}/status").read_text().splitlines())
+    except OSError:
+        return None, None
+    return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+
+
+def start(args: list, env: dict, health_url: str) -> subprocess.Popen:
+    """Start a server subprocess and wait until health_url answers"""
+    process = subprocess.Popen(args, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(args)} exited with code {process.returncode}")
+        try:
+            httpx.get(health_url, timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{' '.join(args)} did not start within 30s")
+
+
+def request_for(scenario: str, index: int) -> tuple:
+    """(path, JSON body) of request number `index` of a scenario"""
+    body = {"json_data": PAYLOAD, "user_prompt": "Sales dashboard with KPI cards and a revenue chart"}
+    if scenario in ("llm", "stream"):
+        body["render_mode"] = "llm"
+        body["user_prompt"] += f" (variant {index})"
+    elif scenario == "cached":
+        body["render_mode"] = "llm"
+    else:
+        body["render_mode"] = "template"
+    path = "/generate-dashboard/stream" if scenario == "stream" else "/generate-dashboard"
+    return path, body
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, concurrency: int, requests: int,
+                       warmup: int, offset: int) -> dict:
+    """Run one closed-loop scenario; returns rps, latency percentiles and error count"""
+    latencies = []
+    errors = 0
+    
+    async def worker(counter) -> None:
+        nonlocal errors
+        for index in counter:
+            path, body = request_for(scenario, index)
+            request_start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                failed = response.status_code != 200
+            except httpx.HTTPError:
+                failed = True
+            latencies.append((time.perf_counter() - request_start) * 1000)
+            errors += failed
+    
+    warmup_counter = iter(range(offset, offset + warmup))
+    await asyncio.gather(*[worker(warmup_counter) for _ in range(concurrency)])
+    latencies.clear()
+    errors = 0
+    
+    counter = iter(range(offset + warmup, offset + warmup + requests))
+    start_time = time.perf_counter()
+    await asyncio.gather(*[worker(counter) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start_time
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'errors': errors,
+    }
+
+
+async def main(backend: str, concurrency: int, requests: int, warmup: int, latency: float,
+               tokens_per_second: float, scenarios: list) -> None:
+    port = free_port()
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    env.setdefault("CACHE_ENABLED", "true")
+    env.setdefault("LOG_MODE", "structured")
+    env.setdefault("MAX_CONCURRENT_GENERATIONS", str(max(concurrency, 16)))
+    stub = None
+    if backend == "server":
+        stub_port = free_port()
+        stub = start([sys.executable, "-m", "benchmarks.stub_server", "--port", str(stub_port),
+                      "--latency", str(latency), "--tokens-per-second", str(tokens_per_second)],
+                     env, f"http://127.0.0.1:{stub_port}/stats")
+        env.update(LLM_BACKEND="groq", GROQ_API_KEY=env.get("GROQ_API_KEY") or "load-test-key",
+                   GROQ_API_BASE=f"http://127.0.0.1:{stub_port}")
+    else:
+        env.update(LLM_BACKEND="fake", FAKE_LLM_LATENCY=str(latency), FAKE_LLM_TOKENS_PER_SECOND=str(tokens_per_second))
+    
+    server = start([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                    "--log-level", "warning"], env, f"http://127.0.0.1:{port}/health")
+    try:
+        rss, _ = memory_mb(server.pid)
+        print(f"Backend: {backend}, LLM latency {latency * 1000:.0f}ms, "
+              f"{tokens_per_second or 'instant'} tokens/s, concurrency {concurrency}, "
+              f"{requests} requests (+{warmup} warm-up)")
+        print(f"Server RSS at start: {f'{rss:.0f} MB' if rss is not None else '-'}")
+        print(f"{'scenario':<9} | {'rps':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'errors':>6} | {'RSS MB':>7} | {'peak MB':>7}")
+        print("-" * 71)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None) as client:
+            for number, scenario in enumerate(scenarios):
+                result = await run_scenario(client, scenario, concurrency, requests, warmup,
+                                            offset=number * (warmup + requests))
+                rss, peak = memory_mb(server.pid)
+                rss_text = f"{rss:>7.0f}" if rss is not None else f"{'-':>7}"
+                peak_text = f"{peak:>7.0f}" if peak is not None else f"{'-':>7}"
+                print(f"{scenario:<9} | {result['rps']:>8.1f} | {result['p50']:>8.1f} | {result['p99']:>8.1f} | "
+                      f"{result['errors']:>6} | {rss_text} | {peak_text}")
+    finally:
+        for process in (server, stub):
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("fake", "server"), default="fake",
+                        help="fake: in-process fake LLM; server: groq backend against the local stub server")
+    parser.add_argument("--concurrency", type=int, default=16, help="clients sending requests back to back")
+    parser.add_argument("--requests", type=int, default=400, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--latency", type=float, default=0.5, help="LLM time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="LLM output rate; 0 = instant")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    args = parser.parse_args()
+    
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args.backend, args.concurrency, args.requests, args.warmup, args.latency,
+                     args.tokens_per_second, args.scenarios.split(",")))
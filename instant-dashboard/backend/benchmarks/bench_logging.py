@@ -0,0 +1,80 @@
+"""
+Logging overhead per request: verbose vs structured (queue-backed) vs disabled
+
+Calls the /generate-dashboard handler directly with a zero-latency stub LLM,
+so the time per request is the pipeline itself plus whatever logging costs.
+Log output goes to a temporary file, like a real log sink would.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_logging [--requests 2000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+os.environ.setdefault("SINGLEFLIGHT_ENABLED", "false")
+
+from app.logging_config import configure_logging
+from app.main import generate_dashboard
+from app.models import DashboardRequest
+from app.llm_service import llm_service
+from benchmarks.stub_llm import install_stub
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "test_data.json"
+
+
+async def run(request: DashboardRequest, count: int) -> float:
+    """Handle `count` requests one after another; returns microseconds per request"""
+    start = time.perf_counter()
+    for _ in range(count):
+        await generate_dashboard(request, response_format="json", if_none_match=None)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def main(count: int) -> None:
+    install_stub(llm_service, latency=0)
+    request = DashboardRequest(
+        json_data=TEST_DATA.read_text(),
+        user_prompt="Modern dashboard with a bar chart of expenses",
+    )
+    logging.disable(logging.CRITICAL)
+    await run(request, 50)  # warm up tokenizer, regexes and the event loop
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for mode in ("off", "verbose", "structured"):
+            log_path = Path(tmp) / f"{mode}.log"
+            with open(log_path, "w") as sink:
+                if mode == "off":
+                    configure_logging("verbose", sink)
+                    logging.disable(logging.CRITICAL)
+                else:
+                    logging.disable(logging.NOTSET)
+                    configure_logging(mode, sink)
+                results[mode] = await run(request, count)
+                configure_logging("verbose", sink)  # stops the queue listener, flushing its records
+                logging.disable(logging.CRITICAL)
+            lines = sum(1 for _ in open(log_path))
+            results[mode] = (results[mode], lines / count)
+    
+    floor = results["off"][0]
+    print(f"{count} requests, zero-latency stub LLM")
+    print(f"{'mode':>10} | {'us/request':>10} | {'logging us':>10} | {'lines/request':>13}")
+    print("-" * 53)
+    for mode, (micros, lines) in results.items():
+        print(f"{mode:>10} | {micros:>10.1f} | {micros - floor:>10.1f} | {lines:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per mode")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.requests))
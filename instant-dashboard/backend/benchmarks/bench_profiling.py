@@ -0,0 +1,46 @@
+"""
+Prompt size benchmark: raw indent=2 dump vs profiled DATA section
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_profiling [--rows 100,1000,10000,100000]
+"""
+import argparse
+import json
+import time
+
+from app.config import settings
+from app.prompts import build_user_prompt
+
+
+def make_rows(count: int) -> dict:
+    """Synthetic export: a title plus `count` sales rows"""
+    regions = ["North America", "Europe", "Asia Pacific", "Latin America"]
+    return {
+        "report_title": "Synthetic Sales Export",
+        "currency": "USD",
+        "rows": [
+            {"date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "region": regions[i % 4],
+             "orders": i % 97, "revenue": round(i * 13.37, 2)}
+            for i in range(count)
+        ],
+    }
+
+
+def main(row_counts: list) -> None:
+    print(f"PROMPT_TOKEN_BUDGET: {settings.PROMPT_TOKEN_BUDGET} tokens (~4 chars/token)")
+    print(f"{'rows':>7} | {'raw ~tokens':>11} | {'prompt ~tokens':>14} | {'build ms':>8}")
+    print("-" * 50)
+    for count in row_counts:
+        data = make_rows(count)
+        raw_tokens = len(json.dumps(data, indent=2)) // 4
+        start = time.perf_counter()
+        prompt = build_user_prompt(data, "Modern dashboard with charts")
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{count:>7} | {raw_tokens:>11,} | {len(prompt) // 4:>14,} | {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100,1000,10000,100000", help="comma-separated row counts")
+    args = parser.parse_args()
+    main([int(count) for count in args.rows.split(",")])
@@ -0,0 +1,137 @@
+"""
+Prompt A/B harness: full vs lean system prompt on the sample payloads
+
+For each prompt variant, sends the sample payloads (test_data.json and
+test_cases/*.json) through LLMService one after another and reports:
+
+  system / user tokens   static prefix and per-request part of the prompt
+  cached tokens          prompt tokens covered by a simulated provider prefix
+                         cache (longest common prefix with earlier requests)
+  stub ms                latency of a stub LLM that charges --prefill-ms per
+                         1k uncached prompt tokens plus --latency per call
+  values in prompt       share of the payload's leaf values present verbatim
+                         in the prompt (large arrays are profiled)
+
+With --live the stub is replaced by the configured Groq model (GROQ_API_KEY,
+or GROQ_API_BASE for a compatible server) and two fidelity columns are added:
+the share of the values sent in the prompt that appear verbatim in the HTML,
+and currency symbols in the HTML that the JSON does not contain.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_prompt_ab [--latency 0.3] [--prefill-ms 200] [--live]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+os.environ.setdefault("SINGLEFLIGHT_ENABLED", "false")
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
+
+from app import json_backend
+from app.layout_cache import describe, value_text
+from app.llm_service import llm_service
+from app.prompts import SYSTEM_PROMPTS, build_user_prompt
+from app.tokenizer import count_tokens
+from benchmarks.stub_llm import StubChatModel
+
+ROOT = Path(__file__).resolve().parents[2]
+PAYLOADS = [ROOT / "test_data.json"] + sorted((ROOT / "test_cases").glob("*.json"))
+USER_PROMPT = "Modern dashboard with KPI cards and charts"
+CURRENCY_SYMBOLS = ("$", "€", "£", "¥")
+
+
+class PrefixCacheStubChatModel(StubChatModel):
+    """
+    Stub LLM whose latency depends on how much of the prompt is not prefix-cached
+    
+    Remembers recent prompts and treats the longest common prefix with any of
+    them as cached, the way provider-side prompt caching does.
+    """
+    
+    prefill_ms_per_1k: float = 200.0
+    seen: List[str] = []
+    last_cached_tokens: int = 0
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any):
+        text = "".join(message.content for message in messages)
+        cached_chars = max((len(os.path.commonprefix([text, earlier])) for earlier in self.seen), default=0)
+        self.seen = (self.seen + [text])[-32:]
+        self.last_cached_tokens = count_tokens(text[:cached_chars])
+        uncached = count_tokens(text) - self.last_cached_tokens
+        await asyncio.sleep(uncached / 1000 * self.prefill_ms_per_1k / 1000)
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def use_variant(variant: str, llm) -> None:
+    """Point the service's default chain at a prompt variant and model"""
+    llm_service.prompt_variant = variant
+    llm_service.system_prompt = SYSTEM_PROMPTS[variant]
+    llm_service.prompt_template = ChatPromptTemplate.from_messages([
+        SystemMessage(content=llm_service.system_prompt),
+        HumanMessagePromptTemplate.from_template("{user_prompt}"),
+    ])
+    llm_service.chain = llm_service.prompt_template | llm | llm_service.output_parser
+    llm_service._system_tokens = None
+
+
+def share(values: list, haystack: str) -> float:
+    """Fraction of values found verbatim (raw or HTML-escaped) in haystack (1.0 when there are none)"""
+    found = sum((value if isinstance(value, str) else json.dumps(value)) in haystack or value_text(value) in haystack
+                for value in values)
+    return found / len(values) if values else 1.0
+
+
+async def main(latency: float, prefill_ms: float, live: bool) -> None:
+    llm = llm_service.llm if live else PrefixCacheStubChatModel(latency=latency, prefill_ms_per_1k=prefill_ms)
+    print("Model: " + (llm_service.model if live else f"stub ({latency * 1000:.0f}ms + {prefill_ms:.0f}ms per 1k uncached tokens)"))
+    header = f"{'variant':<7} | {'payload':<30} | {'system':>6} | {'user':>6} | {'cached':>6} | {'ms':>7} | {'in prompt':>9}"
+    if live:
+        header += f" | {'in HTML':>7} | {'added symbols':>13}"
+    print(header)
+    print("-" * len(header))
+    
+    for variant in SYSTEM_PROMPTS:
+        use_variant(variant, llm)
+        if not live:
+            llm.seen = []
+        for path in PAYLOADS:
+            json_data = path.read_text()
+            data = json_backend.loads(json_data)
+            values = [value for value in describe(data)[1] if value != ""]
+            user_prompt = build_user_prompt(data, USER_PROMPT)
+            sent = [value for value in values if share([value], user_prompt)]
+            
+            start = time.perf_counter()
+            result = await llm_service.agenerate_dashboard(json_data, USER_PROMPT, parsed_data=data)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            system_tokens = count_tokens(llm_service.system_prompt)
+            cached = "-" if live else f"{llm.last_cached_tokens:,}"
+            row = (f"{variant:<7} | {path.name[:30]:<30} | {system_tokens:>6,} | {count_tokens(user_prompt):>6,} | "
+                   f"{cached:>6} | {elapsed_ms:>7.0f} | {share(values, user_prompt):>8.0%}")
+            if live:
+                added = sum(result['html'].count(symbol) for symbol in CURRENCY_SYMBOLS if symbol not in json_data)
+                row += f" | {share(sent, result['html']):>6.0%} | {added:>13}"
+            print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM latency per call in seconds")
+    parser.add_argument("--prefill-ms", type=float, default=200.0, help="stub cost per 1k uncached prompt tokens, ms")
+    parser.add_argument("--live", action="store_true", help="call the configured Groq model and score fidelity")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.latency, args.prefill_ms, args.live))
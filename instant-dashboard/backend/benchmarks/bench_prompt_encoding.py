@@ -0,0 +1,45 @@
+"""
+DATA section size per encoding (pretty / minified / columnar)
+
+Token counts come from app.tokenizer, i.e. TOKENIZER_PATH / TIKTOKEN_ENCODING
+when configured, otherwise the offline heuristic counter.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_prompt_encoding
+"""
+import json
+from pathlib import Path
+
+from app.serialization import DATA_FORMATS, serialize_data
+from app.tokenizer import count_tokens, tokenizer_name
+
+ROOT = Path(__file__).resolve().parents[2]
+PAYLOADS = [
+    ROOT / "test_data.json",
+    ROOT / "test_cases" / "complex_sales_dashboard.json",
+    ROOT / "test_cases" / "ecommerce_analytics.json",
+]
+
+
+def synthetic_table(rows: int = 200) -> dict:
+    """Homogeneous rows, the best case for the columnar encoding"""
+    return {"report_title": "Orders", "orders": [
+        {"order_id": i, "customer": f"Customer {i % 37}", "status": ["paid", "shipped", "refunded"][i % 3],
+         "total": round(i * 7.25, 2)} for i in range(rows)]}
+
+
+def main() -> None:
+    cases = [(path.name, json.loads(path.read_text())) for path in PAYLOADS]
+    cases.append(("synthetic 200-row table", synthetic_table()))
+    
+    print(f"Tokenizer: {tokenizer_name()}")
+    print(f"{'payload':<32} | " + " | ".join(f"{name:>9}" for name in DATA_FORMATS) + " | saved")
+    print("-" * 80)
+    for name, data in cases:
+        tokens = [count_tokens(serialize_data(data, data_format)) for data_format in DATA_FORMATS]
+        saved = 1 - min(tokens) / tokens[0]
+        print(f"{name:<32} | " + " | ".join(f"{count:>9,}" for count in tokens) + f" | {saved:>5.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Response size and serialization cost of a generated dashboard, per response format and encoding
+
+Drives /generate-dashboard in-process (httpx ASGITransport) for each sample
+payload (test_cases/*.json and test_data.json) with RENDER_MODE=auto (the
+samples get template pages, so no LLM is needed).
+The response cache is on, so after the first request only serialization
+and compression differ between the rows:
+
+  bytes on the wire   body bytes of the JSON envelope and of the raw page
+                      (?format=html), uncompressed, gzip and brotli (when
+                      the `brotli` package is installed), and of the 304
+                      answered to If-None-Match with the envelope's ETag
+                      (which must not validate the raw page, nor the page's
+                      ETag the envelope)
+  serialization       microseconds to turn a result into response bytes:
+                      FastAPI's response_model path (jsonable_encoder +
+                      json.dumps, used before), pydantic's model_dump_json
+                      (used now), the raw page, and the compression and
+                      ETag hashing on top
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_response_size [--runs 200]
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import statistics
+import time
+import zlib
+from pathlib import Path
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("CACHE_ENABLED", "true")
+os.environ.setdefault("LOG_MODE", "structured")
+os.environ.setdefault("RENDER_MODE", "auto")
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.compression import ENCODINGS, brotli
+from app.main import app
+from app.models import DashboardResponse
+
+SAMPLES = sorted((Path(__file__).resolve().parents[2] / "test_cases").glob("*.json")) + [
+    Path(__file__).resolve().parents[2] / "test_data.json"]
+
+
+def timed(function, runs: int) -> float:
+    """Median microseconds per call of function()"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+async def wire_bytes(client: httpx.AsyncClient, body: dict) -> tuple:
+    """(row of body bytes per variant, the JSON response body) for one payload"""
+    row = {}
+    for response_format in ("json", "html"):
+        for encoding in ("identity",) + ENCODINGS:
+            response = await client.post(f"/generate-dashboard?format={response_format}", json=body,
+                                         headers={"Accept-Encoding": encoding})
+            response.raise_for_status()
+            row[f"{response_format} {encoding}"] = response.num_bytes_downloaded
+    response = await client.post("/generate-dashboard", json=body, headers={"Accept-Encoding": "identity"})
+    not_modified = await client.post("/generate-dashboard", json=body,
+                                     headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    row["304"] = not_modified.num_bytes_downloaded
+    # Each representation has its own ETag: weak for the envelope, strong for the raw page
+    page = await client.post("/generate-dashboard?format=html", json=body, headers={"Accept-Encoding": "identity"})
+    assert response.headers["etag"].startswith('W/"') and not page.headers["etag"].startswith("W/")
+    for sent, response_format in ((page.headers["etag"], "json"), (response.headers["etag"], "html")):
+        other = await client.post(f"/generate-dashboard?format={response_format}", json=body,
+                                  headers={"If-None-Match": sent})
+        assert other.status_code == 200
+    return row, response.json()
+
+
+def serialization_times(envelope: dict, runs: int) -> dict:
+    """Median microseconds of each serialization / compression step for one response"""
+    html = envelope["html_content"]
+    model = DashboardResponse(**envelope)
+    json_body = model.model_dump_json().encode()
+    times = {
+        'fastapi json': timed(lambda: JSONResponse(jsonable_encoder(model)).body, runs),
+        'model_dump_json': timed(lambda: model.model_dump_json().encode(), runs),
+        'raw html': timed(lambda: html.encode(), runs),
+        'gzip 6': timed(lambda: zlib.compress(json_body, 6), runs),
+        'etag': timed(lambda: hashlib.sha256(html.encode()).hexdigest(), runs),
+    }
+    if brotli is not None:
+        times['brotli 5'] = timed(lambda: brotli.compress(json_body, quality=5), runs)
+    return times
+
+
+async def main(runs: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    rows, times = {}, {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for sample in SAMPLES:
+            body = {"json_data": sample.read_text(), "user_prompt": "Modern dashboard with KPI cards and charts"}
+            rows[sample.name], envelope = await wire_bytes(client, body)
+            times[sample.name] = serialization_times(envelope, runs)
+    
+    if brotli is None:
+        print("brotli is not installed; only gzip is offered")
+    columns = list(next(iter(rows.values())))
+    print("Bytes on the wire (response body)")
+    print(f"{'payload':<30} | " + " | ".join(f"{column:>13}" for column in columns))
+    print("-" * (33 + 16 * len(columns)))
+    for name, row in rows.items():
+        print(f"{name:<30} | " + " | ".join(f"{row[column]:>13,}" for column in columns))
+    
+    columns = list(next(iter(times.values())))
+    print()
+    print(f"Serialization, median microseconds of {runs} runs")
+    print(f"{'payload':<30} | " + " | ".join(f"{column:>15}" for column in columns))
+    print("-" * (33 + 18 * len(columns)))
+    for name, row in times.items():
+        print(f"{name:<30} | " + " | ".join(f"{row[column]:>15.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="timed repetitions per serialization step")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.runs))
@@ -0,0 +1,80 @@
+"""
+Stampede benchmark: N simultaneous identical requests with and without coalescing
+
+Drives /generate-dashboard through the ASGI app in-process with a stub LLM
+(response cache off), and counts how many LLM calls the burst costs.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_singleflight [--latency 0.5] [--levels 1,10,50,100]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+# The "off" bursts send every request to the LLM at once: let them all queue
+os.environ.setdefault("LLM_QUEUE_MAX", "0")
+
+import httpx
+
+from app.main import app
+from app.llm_service import llm_service
+from app.singleflight import SingleFlight
+from benchmarks.stub_llm import install_stub
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "test_data.json"
+
+
+async def burst(client: httpx.AsyncClient, payload: dict, count: int) -> tuple:
+    """Fire `count` identical requests at once; returns (seconds, max coalesced_requests)"""
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post("/generate-dashboard", json=payload) for _ in range(count)
+    ])
+    elapsed = time.perf_counter() - start
+    shared = 0
+    for response in responses:
+        response.raise_for_status()
+        shared = max(shared, response.json()["metadata"]["coalesced_requests"])
+    return elapsed, shared
+
+
+async def main(latency: float, levels: list) -> None:
+    stub = install_stub(llm_service, latency=latency)
+    payload = {
+        "json_data": TEST_DATA.read_text(),
+        "user_prompt": "Modern dashboard with a bar chart of expenses",
+    }
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"Stub LLM latency: {latency * 1000:.0f}ms")
+        print(f"{'requests':>8} | {'LLM calls (off)':>15} | {'time (off)':>10} | {'LLM calls (on)':>14} | {'time (on)':>9} | {'shared by':>9}")
+        print("-" * 82)
+        for count in levels:
+            llm_service.flights = None
+            stub.calls = 0
+            off_time, _ = await burst(client, payload, count)
+            off_calls = stub.calls
+            
+            llm_service.flights = SingleFlight()
+            stub.calls = 0
+            on_time, shared = await burst(client, payload, count)
+            on_calls = stub.calls
+            
+            print(f"{count:>8} | {off_calls:>15} | {off_time:>9.2f}s | {on_calls:>14} | {on_time:>8.2f}s | {shared:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument("--levels", default="1,10,50,100", help="comma-separated burst sizes")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.latency, [int(level) for level in args.levels.split(",")]))
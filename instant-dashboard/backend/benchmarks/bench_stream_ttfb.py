@@ -0,0 +1,71 @@
+"""
+Time-to-first-byte benchmark: /generate-dashboard vs /generate-dashboard/stream
+
+The stub LLM emits a fenced HTML document in small chunks spread over the
+configured latency, which mimics token-by-token generation. Requests go
+over a real socket to an in-process uvicorn server so chunking is visible.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_stream_ttfb [--latency 2.0] [--runs 5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RENDER_MODE", "llm")
+
+import httpx
+
+from app.main import app
+from app.llm_service import llm_service
+from benchmarks.stub_llm import STUB_HTML, BackgroundServer, install_stub
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "test_data.json"
+
+
+async def measure(client: httpx.AsyncClient, url: str, payload: dict) -> tuple:
+    """Return (time to first body byte, total time) in milliseconds"""
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", url, json=payload) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_raw():
+            if first is None:
+                first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return first * 1000, total * 1000
+
+
+async def main(latency: float, runs: int) -> None:
+    install_stub(llm_service, latency=latency, response=f"```html\n{STUB_HTML}\n```")
+    payload = {
+        "json_data": TEST_DATA.read_text(),
+        "user_prompt": "Modern dashboard with a bar chart of expenses",
+    }
+    
+    with BackgroundServer(app) as base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            print(f"Stub LLM latency: {latency * 1000:.0f}ms, {runs} runs each")
+            print(f"{'endpoint':<28} | {'TTFB p50 ms':>11} | {'total p50 ms':>12}")
+            print("-" * 58)
+            for url in ("/generate-dashboard", "/generate-dashboard/stream"):
+                samples = [await measure(client, url, payload) for _ in range(runs)]
+                ttfb = statistics.median(sample[0] for sample in samples)
+                total = statistics.median(sample[1] for sample in samples)
+                print(f"{url:<28} | {ttfb:>11.1f} | {total:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=2.0, help="stub LLM latency in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="requests per endpoint")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.latency, args.runs))
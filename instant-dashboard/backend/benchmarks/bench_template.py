@@ -0,0 +1,68 @@
+"""
+Template fast path vs LLM path, per sample payload
+
+Calls the /generate-dashboard handler with render_mode 'template' and
+'llm' (stub LLM with a fixed latency standing in for Groq) for the sample
+files in the repository, and reports which shapes the templates matched.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_template [--latency 3.0] [--requests 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("SINGLEFLIGHT_ENABLED", "false")
+
+from app import json_backend
+from app.main import generate_dashboard
+from app.models import DashboardRequest
+from app.llm_service import llm_service
+from app.template_renderer import plan_dashboard
+from benchmarks.stub_llm import install_stub
+
+ROOT = Path(__file__).resolve().parents[2]
+SAMPLES = [ROOT / "test_data.json"] + sorted((ROOT / "test_cases").glob("*.json"))
+
+
+async def per_request_ms(request: DashboardRequest, count: int) -> float:
+    """Handle `count` requests one after another; returns milliseconds per request"""
+    start = time.perf_counter()
+    for _ in range(count):
+        await generate_dashboard(request, response_format="json", if_none_match=None)
+    return (time.perf_counter() - start) / count * 1000
+
+
+async def main(latency: float, count: int) -> None:
+    install_stub(llm_service, latency=latency)
+    print(f"Stub LLM latency: {latency * 1000:.0f}ms")
+    print(f"{'payload':<32} | {'sections':<44} | {'template ms':>11} | {'llm ms':>8} | {'speedup':>8}")
+    print("-" * 115)
+    for path in SAMPLES:
+        json_data = path.read_text()
+        plan = plan_dashboard(json_backend.loads(json_data))
+        kinds = ", ".join(section['kind'] for section in plan['sections']) if plan else "(no template)"
+        template_ms = llm_ms = None
+        if plan:
+            request = DashboardRequest(json_data=json_data, user_prompt="Modern dashboard", render_mode="template")
+            template_ms = await per_request_ms(request, count)
+        request = DashboardRequest(json_data=json_data, user_prompt="Modern dashboard", render_mode="llm")
+        llm_ms = await per_request_ms(request, 1)
+        speedup = f"{llm_ms / template_ms:>7.0f}x" if template_ms else f"{'-':>8}"
+        template_text = f"{template_ms:>11.2f}" if template_ms else f"{'-':>11}"
+        print(f"{path.name:<32} | {kinds[:44]:<44} | {template_text} | {llm_ms:>8.0f} | {speedup}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=3.0, help="stub LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=200, help="template-path requests per payload")
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.latency, args.requests))
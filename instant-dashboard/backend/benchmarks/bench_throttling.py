@@ -0,0 +1,228 @@
+"""
+Throttling check: the app against an upstream that enforces rate limits and fails now and then
+
+Starts benchmarks.stub_server with Groq-style --rpm/--tpm limits and an
+--error-rate of 503s, and `uvicorn app.main:app` with the groq backend
+pointed at it (GROQ_API_BASE). Four runs, each against a fresh stub:
+
+  naive     no client-side limits and LLM_MAX_RETRIES=0, i.e. every upstream
+            429 or 503 reaches the client
+  retrying  no client-side limits but retries on, with a few requests more
+            than the stub's --rpm: the stub's 429s and their retry-after
+            header drive the back-off, and every request still succeeds
+  limited   GROQ_RPM_LIMIT/GROQ_TPM_LIMIT set to the stub's limits and
+            retries on: requests wait for budget instead of failing
+  overload  MAX_CONCURRENT_GENERATIONS=2 and LLM_QUEUE_MAX=4 with a slow
+            upstream and a burst of --burst requests: the queue turns the
+            excess away at once with 429 and Retry-After
+
+Reports the client-side status codes, what the stub saw (requests, 429s
+sent, 503s sent), the app's retries (from /metrics) and latency
+percentiles. Before the runs, cancels waiters of an AdmissionQueue around
+slot handovers, as client disconnects and timeouts do.
+
+Exits with status 1 if the retrying or limited run has client errors, the
+retrying run never retried a 429, the limited run never waited for its
+budget, retried no 503 or saw no fewer upstream 429s than the naive one,
+the overload run rejects nothing or sends a 429 without a Retry-After
+header, or a cancelled waiter raised anything but CancelledError or lost
+a slot.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_throttling [--requests 30] [--concurrency 8] [--rpm 20] [--tpm 0]
+                                          [--error-rate 0.1] [--burst 16]
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from app.rate_limiter import AdmissionQueue
+from benchmarks.bench_load import PAYLOAD, free_port, start
+
+
+async def check_cancelled_waiters() -> list:
+    """
+    Cancel AdmissionQueue waiters around slot handovers
+    
+    Two cases: a waiter cancelled before release() reaches it (release pops
+    and skips it), and a waiter cancelled right after release() handed it
+    the slot (it must pass the slot on). Either way the cancellation has to
+    surface as CancelledError and the next waiter has to get the slot.
+    
+    Returns:
+        Descriptions of what went wrong (empty if nothing did)
+    """
+    failures = []
+    for case in ("cancel before handover", "cancel after handover"):
+        queue = AdmissionQueue(1)
+        await queue.acquire()
+        cancelled = asyncio.ensure_future(queue.acquire())
+        next_waiter = asyncio.ensure_future(queue.acquire())
+        await asyncio.sleep(0)
+        if case == "cancel before handover":
+            cancelled.cancel()
+            queue.release()
+        else:
+            queue.release()
+            cancelled.cancel()
+        try:
+            await cancelled
+            failures.append(f"{case}: the cancelled waiter got the slot")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            failures.append(f"{case}: {type(e).__name__}: {e}")
+        try:
+            await asyncio.wait_for(next_waiter, 1)
+        except asyncio.TimeoutError:
+            failures.append(f"{case}: the next waiter never got the slot")
+            continue
+        queue.release()
+        if queue.stats()['in_use'] or queue.waiting:
+            failures.append(f"{case}: queue left with {queue.stats()}")
+    return failures
+
+
+def counter_values(metrics_text: str, name: str) -> Counter:
+    """Values of a /metrics counter by its first label value ('' when unlabelled)"""
+    values = Counter()
+    for label, value in re.findall(rf'^{name}(?:{{\w+="([^"]*)"}})? (\S+)$', metrics_text, re.MULTILINE):
+        values[label] += float(value)
+    return values
+
+
+def request_body(index: int) -> dict:
+    """Request number `index`: same data, a distinct prompt, always through the LLM"""
+    return {"json_data": PAYLOAD, "user_prompt": f"Sales dashboard with KPI cards, variant {index}",
+            "render_mode": "llm"}
+
+
+async def send(base_url: str, requests: int, concurrency: int) -> dict:
+    """Closed-loop load; returns status counts, missing Retry-After headers, latency percentiles and duration"""
+    statuses = Counter()
+    latencies = []
+    missing_retry_after = 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        async def worker() -> None:
+            nonlocal missing_retry_after
+            for index in counter:
+                request_start = time.perf_counter()
+                response = await client.post("/generate-dashboard", json=request_body(index))
+                latencies.append((time.perf_counter() - request_start) * 1000)
+                statuses[response.status_code] += 1
+                if response.status_code == 429 and "retry-after" not in response.headers:
+                    missing_retry_after += 1
+        
+        start_time = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start_time
+    latencies.sort()
+    return {
+        'statuses': statuses,
+        'missing_retry_after': missing_retry_after,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'seconds': elapsed,
+    }
+
+
+async def run(stub_args: list, app_env: dict, requests: int, concurrency: int) -> dict:
+    """Start a fresh stub and app, send the load, and add the stub's and the app's counters to the result"""
+    stub_port = free_port()
+    port = free_port()
+    stub = start([sys.executable, "-m", "benchmarks.stub_server", "--port", str(stub_port), *stub_args],
+                 os.environ.copy(), f"http://127.0.0.1:{stub_port}/stats")
+    server = None
+    try:
+        env = {**os.environ, "LLM_BACKEND": "groq", "GROQ_API_KEY": "throttling-test-key",
+               "GROQ_API_BASE": f"http://127.0.0.1:{stub_port}", "RENDER_MODE": "llm", "CACHE_ENABLED": "false",
+               "SINGLEFLIGHT_ENABLED": "false", "LOG_MODE": "structured", "MAX_TOKENS": "1024",
+               "OUTPUT_TOKEN_BUDGET": "1024", "LLM_RETRY_BASE_DELAY": "0.2", "RATE_LIMIT_DB_PATH": "", **app_env}
+        server = start([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                        "--log-level", "warning"], env, f"http://127.0.0.1:{port}/health")
+        result = await send(f"http://127.0.0.1:{port}", requests, concurrency)
+        result['upstream'] = httpx.get(f"http://127.0.0.1:{stub_port}/stats").json()
+        metrics_text = httpx.get(f"http://127.0.0.1:{port}/metrics").text
+        result['retries'] = counter_values(metrics_text, "dashboard_llm_retries_total")
+        result['budget_waits'] = counter_values(metrics_text, "dashboard_rate_limit_waits_total")['']
+        return result
+    finally:
+        for process in (server, stub):
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+async def main(requests: int, concurrency: int, rpm: float, tpm: float, error_rate: float, burst: int) -> int:
+    failures = await check_cancelled_waiters()
+    # Seed 1 draws a 503 within the first ten requests at the default --error-rate (seed 0 does not)
+    limit_args = ["--latency", "0.05", "--rpm", str(rpm), "--tpm", str(tpm), "--error-rate", str(error_rate),
+                  "--seed", "1"]
+    retrying_requests = int(rpm) + 4 if rpm else requests
+    runs = {
+        'naive': await run(limit_args, {"LLM_MAX_RETRIES": "0"}, requests, concurrency),
+        'retrying': await run(["--latency", "0.05", "--rpm", str(rpm)], {"LLM_MAX_RETRIES": "8"},
+                              retrying_requests, 4),
+        'limited': await run(limit_args, {"LLM_MAX_RETRIES": "4", "GROQ_RPM_LIMIT": str(int(rpm)),
+                                          "GROQ_TPM_LIMIT": str(int(tpm))}, requests, concurrency),
+        'overload': await run(["--latency", "1"], {"MAX_CONCURRENT_GENERATIONS": "2", "LLM_QUEUE_MAX": "4"},
+                              burst, burst),
+    }
+    
+    print(f"Stub limits: {rpm:.0f} requests/min, {f'{tpm:.0f}' if tpm else 'no'} tokens/min, {error_rate:.0%} 503s; "
+          f"{requests} requests at concurrency {concurrency} (retrying: {retrying_requests} at 4, "
+          f"no 503s; overload: burst of {burst})")
+    print(f"{'run':<8} | {'200':>4} | {'429':>4} | {'5xx':>4} | {'upstream':>8} | {'up 429':>6} | {'up 503':>6} | "
+          f"{'retries':>7} | {'waits':>5} | {'p50 ms':>8} | {'p99 ms':>8} | {'seconds':>7}")
+    print("-" * 110)
+    for name, result in runs.items():
+        statuses = result['statuses']
+        server_errors = sum(count for status, count in statuses.items() if status >= 500)
+        upstream = result['upstream']
+        print(f"{name:<8} | {statuses[200]:>4} | {statuses[429]:>4} | {server_errors:>4} | {upstream['requests']:>8} | "
+              f"{upstream['throttled']:>6} | {upstream['failed']:>6} | {sum(result['retries'].values()):>7.0f} | "
+              f"{result['budget_waits']:>5.0f} | {result['p50']:>8.1f} | {result['p99']:>8.1f} | "
+              f"{result['seconds']:>7.1f}")
+    
+    limited, naive, retrying, overload = runs['limited'], runs['naive'], runs['retrying'], runs['overload']
+    if retrying['statuses'][200] != retrying_requests:
+        failures.append(f"retrying run: {retrying_requests - retrying['statuses'][200]} requests failed")
+    if retrying['upstream']['throttled'] and not retrying['retries']['rate_limited']:
+        failures.append("retrying run: upstream 429s were not retried")
+    if limited['statuses'][200] != requests:
+        failures.append(f"limited run: {requests - limited['statuses'][200]} requests failed")
+    if naive['upstream']['throttled'] and limited['upstream']['throttled'] >= naive['upstream']['throttled']:
+        failures.append("limited run: no fewer upstream 429s than the naive run")
+    if (rpm or tpm) and not limited['budget_waits']:
+        failures.append("limited run: no call ever waited for the RPM/TPM budget")
+    if error_rate and not limited['retries']['server_error']:
+        failures.append("limited run: no upstream 503 was retried")
+    if not overload['statuses'][429]:
+        failures.append("overload run: nothing was turned away")
+    if overload['missing_retry_after'] or naive['missing_retry_after']:
+        failures.append("429 responses without a Retry-After header")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30, help="requests in the naive and limited runs")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients sending requests back to back")
+    parser.add_argument("--rpm", type=float, default=20, help="stub (and client) requests per minute")
+    parser.add_argument("--tpm", type=float, default=0, help="stub (and client) tokens per minute; 0 = no limit")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of stub responses that are 503s")
+    parser.add_argument("--burst", type=int, default=16, help="simultaneous requests in the overload run")
+    args = parser.parse_args()
+    
+    sys.exit(asyncio.run(main(args.requests, args.concurrency, args.rpm, args.tpm, args.error_rate, args.burst)))
@@ -0,0 +1,126 @@
+"""
+Upload memory benchmark: peak RSS of buffered vs streamed ingestion of large JSON files
+
+Writes synthetic exports (a few header fields plus one big array of rows)
+straight to disk, then turns each into a prompt in a fresh subprocess so
+peak RSS is measured per run:
+
+  buffered: read the file into a str, validate it as a DashboardRequest
+            and build the prompt (what /generate-dashboard does)
+  streamed: feed the file in 64KB chunks through parse_upload and build
+            the prompt (what /generate-dashboard/upload does past
+            UPLOAD_STREAM_THRESHOLD)
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_upload_memory [--sizes 20,100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub-key")
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+from app.config import settings
+from app.json_stream import parse_upload
+from app.models import DashboardRequest
+from app.prompts import build_user_prompt
+
+CHUNK_SIZE = 64 * 1024
+USER_PROMPT = "Modern dashboard with revenue by region"
+
+
+def write_export(path: Path, target_mb: int) -> int:
+    """Write a synthetic sales export of about target_mb megabytes; returns the row count"""
+    regions = ["North America", "Europe", "Asia Pacific", "Latin America"]
+    target = target_mb * 1024 * 1024
+    rows = 0
+    with open(path, "w") as out:
+        written = out.write('{"report_title": "Synthetic Sales Export", "currency": "USD", "rows": [\n')
+        while written < target:
+            row = {"date": f"2025-{rows % 12 + 1:02d}-{rows % 28 + 1:02d}", "region": regions[rows % 4],
+                   "orders": rows % 97, "revenue": round(rows * 13.37, 2), "note": f"order batch {rows}"}
+            written += out.write(("" if rows == 0 else ",\n") + json.dumps(row))
+            rows += 1
+        out.write("\n]}\n")
+    return rows
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def file_chunks(path: Path):
+    with open(path, "rb") as source:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def run_child(mode: str, path: Path) -> dict:
+    """Build the prompt for one file in this process and report time and peak RSS"""
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "buffered":
+        request = DashboardRequest(json_data=path.read_text(), user_prompt=USER_PROMPT)
+        data = request.parsed_data
+    else:
+        data, _ = asyncio.run(parse_upload(
+            file_chunks(path), max_bytes=float("inf"), stream_threshold=0,
+            array_threshold=settings.PROFILE_ARRAY_THRESHOLD,
+            sample_rows=settings.PROFILE_SAMPLE_ROWS, top_k=settings.PROFILE_TOP_K,
+        ))
+    prompt = build_user_prompt(data, USER_PROMPT)
+    return {
+        "seconds": time.perf_counter() - start,
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "prompt_chars": len(prompt),
+    }
+
+
+def measure(mode: str, path: Path) -> dict:
+    """Run one mode in a fresh interpreter so peak RSS is not shared between runs"""
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_upload_memory", "--child", mode, str(path)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(sizes: list) -> None:
+    print(f"{'file MB':>7} | {'rows':>9} | {'mode':>8} | {'seconds':>7} | {'peak RSS MB':>11} | {'over baseline MB':>16} | {'prompt chars':>12}")
+    print("-" * 91)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"export_{size}mb.json"
+            rows = write_export(path, size)
+            file_mb = path.stat().st_size / (1024 * 1024)
+            for mode in ("buffered", "streamed"):
+                result = measure(mode, path)
+                print(f"{file_mb:>7.0f} | {rows:>9,} | {mode:>8} | {result['seconds']:>7.2f} | "
+                      f"{result['peak_mb']:>11.0f} | {result['peak_mb'] - result['baseline_mb']:>16.0f} | "
+                      f"{result['prompt_chars']:>12,}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100", help="comma-separated file sizes in MB")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(run_child(args.child[0], Path(args.child[1]))))
+    else:
+        main([int(size) for size in args.sizes.split(",")])
@@ -0,0 +1,123 @@
+"""
+Worker scaling benchmark: throughput of 1, 2, 4 ... workers sharing one SQLite file
+
+For each worker count, starts `uvicorn app.main:app --workers N` with the
+fake LLM backend and CACHE_DB_PATH / RATE_LIMIT_DB_PATH pointing at a
+fresh SQLite file, which is what `WORKERS=N python -m app.main` does.
+Then:
+
+  1. --concurrency clients send --requests requests with distinct prompts
+     (all cache misses), measuring requests/s and latency percentiles
+  2. the first --repeat of those requests are sent again, each on a new
+     connection so they land on arbitrary workers; "repeat hits" is the
+     share served from cache, which needs the cache to be shared
+
+With --no-shared the SQLite file is left out, so each worker keeps its own
+cache and repeat hits drop to about 1 in N.
+
+The work per request is mostly CPU in this process (parsing, prompt
+building, token counting, HTML extraction), so throughput only scales
+with workers up to the number of free CPU cores.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--concurrency 32] [--requests 600]
+                                       [--latency 0.05] [--repeat 40] [--no-shared]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_load import PAYLOAD, free_port, start
+
+
+def request_body(index: int) -> dict:
+    """Request number `index`: same data, a distinct prompt (so a distinct cache key)"""
+    return {"json_data": PAYLOAD, "user_prompt": f"Sales dashboard with KPI cards, variant {index}",
+            "render_mode": "llm"}
+
+
+async def throughput(base_url: str, concurrency: int, requests: int) -> dict:
+    """Closed-loop load with distinct prompts; returns rps and latency percentiles"""
+    latencies = []
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        async def worker() -> None:
+            for index in counter:
+                request_start = time.perf_counter()
+                response = await client.post("/generate-dashboard", json=request_body(index))
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - request_start) * 1000)
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start_time
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+async def repeat_hits(base_url: str, repeat: int) -> float:
+    """Send the first `repeat` requests again on fresh connections; returns the cache-hit share"""
+    hits = 0
+    for index in range(repeat):
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            response = await client.post("/generate-dashboard", json=request_body(index))
+            response.raise_for_status()
+            hits += response.json()["metadata"]["cache_hit"]
+    return hits / repeat if repeat else 0.0
+
+
+async def main(levels: list, concurrency: int, requests: int, latency: float, repeat: int, shared: bool) -> None:
+    print(f"Fake LLM latency {latency * 1000:.0f}ms, concurrency {concurrency}, {requests} requests per level, "
+          f"{os.cpu_count()} CPU cores, cache {'shared via SQLite' if shared else 'per worker'}")
+    print(f"{'workers':>7} | {'rps':>8} | {'speedup':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'repeat hits':>11}")
+    print("-" * 65)
+    baseline = None
+    for workers in levels:
+        with tempfile.TemporaryDirectory() as state_dir:
+            port = free_port()
+            env = {**os.environ, "LLM_BACKEND": "fake", "FAKE_LLM_LATENCY": str(latency), "RENDER_MODE": "llm",
+                   "CACHE_ENABLED": "true", "LOG_MODE": "structured", "LLM_WARMUP": "true",
+                   "CACHE_DB_PATH": "", "RATE_LIMIT_DB_PATH": ""}
+            if shared:
+                env["CACHE_DB_PATH"] = env["RATE_LIMIT_DB_PATH"] = str(Path(state_dir) / "shared.sqlite3")
+            server = start([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                            "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+                           env, f"http://127.0.0.1:{port}/health")
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                # Let every worker finish its background warm-up before measuring
+                await asyncio.sleep(2 + workers)
+                result = await throughput(base_url, concurrency, requests)
+                hit_share = await repeat_hits(base_url, repeat)
+            finally:
+                server.terminate()
+                server.wait()
+        baseline = baseline or result['rps']
+        print(f"{workers:>7} | {result['rps']:>8.1f} | {result['rps'] / baseline:>6.2f}x | {result['p50']:>8.1f} | "
+              f"{result['p99']:>8.1f} | {hit_share:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients sending requests back to back")
+    parser.add_argument("--requests", type=int, default=600, help="measured requests per worker count")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake LLM latency in seconds")
+    parser.add_argument("--repeat", type=int, default=40, help="requests resent to check the shared cache")
+    parser.add_argument("--no-shared", action="store_true", help="give each worker its own cache")
+    args = parser.parse_args()
+
+    asyncio.run(main([int(level) for level in args.workers.split(",")], args.concurrency, args.requests,
+                     args.latency, args.repeat, not args.no_shared))
@@ -0,0 +1,132 @@
+"""Local stub LLM for offline benchmarks (no network, no API key)"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+STUB_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Stub Dashboard</title>
+<style>body { font-family: system-ui, sans-serif; margin: 2rem; }</style>
+</head>
+<body>
+<h1>Stub Dashboard</h1>
+<p>Generated locally by the benchmark stub LLM.</p>
+</body>
+</html>"""
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that sleeps for a fixed latency and returns canned HTML
+    
+    The async methods use asyncio.sleep so concurrent calls overlap the way
+    real network-bound LLM calls do; the sync methods use time.sleep and block.
+    """
+    
+    response: str = STUB_HTML
+    latency: float = 0.5
+    chunk_size: int = 32
+    calls: int = 0
+    
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-model"
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+    
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        chunks = self._chunks()
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+    
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        chunks = self._chunks()
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+    
+    def _chunks(self) -> List[str]:
+        """Split the canned response into stream chunks"""
+        return [self.response[i:i + self.chunk_size]
+                for i in range(0, len(self.response), self.chunk_size)] or [""]
+
+
+def install_stub(service, latency: float = 0.5, response: str = STUB_HTML) -> StubChatModel:
+    """
+    Swap the service's default chain for one backed by StubChatModel
+    
+    Args:
+        service: LLMService instance to patch
+        latency: Simulated LLM latency in seconds
+        response: Canned LLM output
+    
+    Returns:
+        The installed StubChatModel
+    """
+    stub = StubChatModel(latency=latency, response=response)
+    service.llm = stub
+    service.chain = service.prompt_template | stub | service.output_parser
+    return stub
+
+
+class BackgroundServer:
+    """
+    Run a uvicorn server for an ASGI app on a background thread
+    
+    httpx.ASGITransport buffers whole responses, so anything that measures
+    bytes on a real socket (streaming, compression) goes through this.
+    
+    Usage:
+        with BackgroundServer(app) as base_url:
+            httpx.get(f"{base_url}/health")
+    """
+    
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        import socket
+        
+        if port == 0:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        self._config = {"app": app, "host": host, "port": port, "log_level": "warning"}
+        self._server = None
+        self._thread = None
+    
+    def __enter__(self) -> str:
+        import threading
+        import uvicorn
+        
+        self._server = uvicorn.Server(uvicorn.Config(**self._config))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self.base_url
+    
+    def __exit__(self, *exc_info) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
@@ -0,0 +1,187 @@
+"""
+Local Groq/OpenAI-compatible chat completions server for offline load tests
+
+Serves POST /openai/v1/chat/completions (the path the Groq SDK calls) with
+canned HTML after a configurable latency, streaming or not. Like Groq, it
+stops at the request's max_tokens (about 4 characters per token) with
+finish_reason "length". GET /stats
+reports how many requests were served over how many TCP connections, which
+shows whether clients reuse keep-alive connections.
+
+It can also misbehave like a busy upstream:
+
+  --rpm / --tpm     Groq-style per-minute limits (token buckets holding one
+                    minute of the limit; a request costs its prompt tokens plus
+                    max_tokens); requests over the limit get a 429 with a
+                    retry-after header and Groq's error body
+  --error-rate      share of requests answered with a 503
+  --stall-rate      share of requests that stall for --stall-seconds before
+                    answering, to trip client timeouts
+
+Point the backend at it with GROQ_API_BASE=http://127.0.0.1:<port>.
+
+Usage (from instant-dashboard/backend):
+    python -m benchmarks.stub_server [--port 9000] [--latency 0.5] [--tokens-per-second 0]
+                                     [--rpm 0] [--tpm 0] [--error-rate 0] [--stall-rate 0] [--stall-seconds 30]
+                                     [--seed 0]
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stub_llm import STUB_HTML
+
+
+def create_stub_app(latency: float = 0.5, tokens_per_second: float = 0, response: str = STUB_HTML,
+                    rpm: float = 0, tpm: float = 0, error_rate: float = 0, stall_rate: float = 0,
+                    stall_seconds: float = 30, seed: int = 0) -> FastAPI:
+    """
+    Build the stub server app
+    
+    Args:
+        latency: Seconds before the first token (or the whole response)
+        tokens_per_second: Streaming/generation rate after the first token; 0 = instant
+        response: Canned completion text
+        rpm: Requests per minute before answering 429; 0 = no limit
+        tpm: Tokens (prompt + max_tokens) per minute before answering 429; 0 = no limit
+        error_rate: Share of requests answered with a 503
+        stall_rate: Share of requests held for stall_seconds before answering
+        stall_seconds: How long a stalled request is held
+        seed: Seed of the error and stall draws, so runs are reproducible
+    
+    Returns:
+        FastAPI app
+    """
+    app = FastAPI(title="Stub chat completions")
+    app.state.latency = latency
+    app.state.tokens_per_second = tokens_per_second
+    app.state.response = response
+    app.state.requests = 0
+    app.state.connections = set()
+    app.state.throttled = 0
+    app.state.failed = 0
+    app.state.stalled = 0
+    limits = {name: limit for name, limit in (("requests", rpm), ("tokens", tpm)) if limit > 0}
+    buckets = {name: [limit, time.monotonic()] for name, limit in limits.items()}  # name -> [level, updated]
+    draws = random.Random(seed)
+    
+    def throttle(costs: dict) -> tuple:
+        """Spend costs from the buckets; returns (limit type, seconds until it would fit) if one is short"""
+        now = time.monotonic()
+        for name, limit in limits.items():
+            bucket = buckets[name]
+            bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit / 60)
+            bucket[1] = now
+        for name, limit in limits.items():
+            if buckets[name][0] < costs[name]:
+                return name, (costs[name] - buckets[name][0]) * 60 / limit
+        for name in limits:
+            buckets[name][0] -= costs[name]
+        return None, 0.0
+    
+    def completion_tokens() -> list:
+        # ~4 characters per token, like real BPE output for HTML
+        text = app.state.response
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+    
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        app.state.connections.add(request.scope.get("client"))
+        
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+        tokens = completion_tokens()
+        finish_reason = "stop"
+        if body.get("max_tokens") and len(tokens) > body["max_tokens"]:
+            tokens = tokens[:body["max_tokens"]]
+            finish_reason = "length"
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        delay = 1 / app.state.tokens_per_second if app.state.tokens_per_second else 0
+        
+        limit_type, retry_after = throttle({"requests": 1, "tokens": prompt_tokens + (body.get("max_tokens") or 0)})
+        if limit_type is not None:
+            app.state.throttled += 1
+            return JSONResponse(status_code=429, headers={"retry-after": str(math.ceil(retry_after))}, content={
+                "error": {"message": f"Rate limit reached for model `{model}` on {limit_type} per minute. "
+                                     f"Please try again in {retry_after:.2f}s.",
+                          "type": limit_type, "code": "rate_limit_exceeded"}})
+        draw = draws.random()
+        if draw < error_rate:
+            app.state.failed += 1
+            return JSONResponse(status_code=503, content={
+                "error": {"message": "Service Unavailable", "type": "internal_server_error"}})
+        if draw < error_rate + stall_rate:
+            app.state.stalled += 1
+            await asyncio.sleep(stall_seconds)
+        
+        await asyncio.sleep(app.state.latency)
+        
+        if not body.get("stream"):
+            await asyncio.sleep(delay * len(tokens))
+            return JSONResponse({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": finish_reason,
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": usage,
+            })
+        
+        async def events():
+            for token in tokens:
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if delay:
+                    await asyncio.sleep(delay)
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                     "x_groq": {"usage": usage}}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "connections": len(app.state.connections),
+                "throttled": app.state.throttled, "failed": app.state.failed, "stalled": app.state.stalled}
+    
+    @app.post("/stats/reset")
+    async def reset_stats():
+        app.state.requests = 0
+        app.state.connections = set()
+        app.state.throttled = app.state.failed = app.state.stalled = 0
+        return await stats()
+    
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="generation rate; 0 = instant")
+    parser.add_argument("--rpm", type=float, default=0, help="requests per minute before 429s; 0 = no limit")
+    parser.add_argument("--tpm", type=float, default=0, help="tokens per minute before 429s; 0 = no limit")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with a 503")
+    parser.add_argument("--stall-rate", type=float, default=0, help="share of requests that stall")
+    parser.add_argument("--stall-seconds", type=float, default=30, help="how long a stalled request is held")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the error and stall draws")
+    args = parser.parse_args()
+    
+    uvicorn.run(create_stub_app(args.latency, args.tokens_per_second, rpm=args.rpm, tpm=args.tpm,
+                                error_rate=args.error_rate, stall_rate=args.stall_rate,
+                                stall_seconds=args.stall_seconds, seed=args.seed), host="127.0.0.1", port=args.port)
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import './App.css';
 import JsonInput from './components/JsonInput';
 import PromptInput from './components/PromptInput';
@@ -27,6 +27,8 @@ function App() {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState(false);
+  // ETag of the dashboard on screen; an identical new one comes back as an empty 304
+  const shownEtag = useRef(null);
 
   const handleGenerate = async () => {
     // Reset states
@@ -52,6 +54,7 @@ function App() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(shownEtag.current && generatedHtml ? { 'If-None-Match': shownEtag.current } : {}),
         },
         body: JSON.stringify({
           json_data: jsonData,
@@ -60,6 +63,13 @@ function App() {
         }),
       });
 
+      if (response.status === 304) {
+        // Same dashboard as the one already shown
+        setSuccess(true);
+        setTimeout(() => setSuccess(false), 3000);
+        return;
+      }
+
       const data = await response.json();
 
       if (!response.ok) {
@@ -68,6 +78,7 @@ function App() {
 
       if (data.success) {
         setGeneratedHtml(data.html_content);
+        shownEtag.current = response.headers.get('ETag');
         setSuccess(true);
         setTimeout(() => setSuccess(false), 3000);
       } else {